@@ -0,0 +1,10 @@
+import time
+from typing import Callable
+
+def time_ms(fn: Callable[[], object], repeats: int) -> float:
+    """Mean wall time of fn() in milliseconds over `repeats` calls, after one warm-up call."""
+    fn() # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000.0
@@ -0,0 +1,68 @@
+"""
+SymbiOS Benchmark: synchronous vs. asynchronous actor-learner training throughput
+
+Trains TransformerMAPPO on the same park for --updates PPO updates of --ticks ticks x --parks parks each:
+- sync: MARLTrainer, collect_rollouts then model.update, strictly alternating
+- async: AsyncMARLTrainer, --workers rollout processes feeding a V-trace learner
+
+Reports wall time, park-ticks per second consumed by the learner and the mean reward of the last updates.
+
+Run from backend/:  python -m benchmarks.async_training --agents 10 --workers 4 --updates 20
+"""
+import argparse
+import functools
+import tempfile
+import time
+
+import numpy as np
+
+from simulation.scenarios import generate_industrial_park
+from marl.mappo import TransformerMAPPO
+from marl.trainer import MARLTrainer
+from marl.async_trainer import AsyncMARLTrainer
+from simulation.vector_env import VectorIndustrialParkEnv
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--parks", type=int, default=2, help="parks per rollout (per worker in async mode)")
+    parser.add_argument("--ticks", type=int, default=128)
+    parser.add_argument("--updates", type=int, default=20)
+    parser.add_argument("--epochs", type=int, default=4)
+    args = parser.parse_args()
+
+    env_fn = functools.partial(generate_industrial_park, args.agents, seed=0)
+    probe = env_fn()
+    obs_dim = probe.park_state.obs_dim
+    action_dim = probe.action_space(probe.possible_agents[0]).shape[0]
+
+    def new_model() -> TransformerMAPPO:
+        return TransformerMAPPO(probe.possible_agents, obs_dim, obs_dim * args.agents, action_dim)
+
+    print("=" * 60)
+    print(f"{args.updates} updates of {args.ticks} ticks x {args.parks} parks, {args.agents} agents")
+    print("=" * 60)
+
+    model = new_model()
+    env = VectorIndustrialParkEnv([env_fn] * args.parks)
+    with tempfile.TemporaryDirectory() as save_dir:
+        trainer = MARLTrainer(env, model, buffer_size=args.ticks, ppo_epochs=args.epochs, save_dir=save_dir)
+        rewards = []
+        start = time.perf_counter()
+        for _ in range(args.updates):
+            trainer.collect_rollouts(args.ticks)
+            rewards.append(float(np.mean([b.rewards[:b.step].mean() for b in trainer.buffers.values()])))
+            model.update(trainer.buffers, trainer.batch_size, args.epochs, trainer.global_states)
+        sync_s = time.perf_counter() - start
+    ticks = args.updates * args.ticks * args.parks
+    print(f"  sync:  {sync_s:>7.1f} s | {ticks / sync_s:>8.0f} park-ticks/s | reward {np.mean(rewards[-5:]):.3f}")
+
+    model = new_model()
+    with AsyncMARLTrainer(env_fn, model, num_workers=args.workers, parks_per_worker=args.parks,
+                          rollout_steps=args.ticks, ppo_epochs=args.epochs, seed=0) as trainer:
+        start = time.perf_counter()
+        history = trainer.train(args.updates, log_every=args.updates)
+        async_s = time.perf_counter() - start
+    print(f"  async: {async_s:>7.1f} s | {ticks / async_s:>8.0f} park-ticks/s | reward {np.mean([h['mean_reward'] for h in history[-5:]]):.3f} "
+          f"| {sync_s / async_s:.1f}x")
@@ -0,0 +1,39 @@
+"""
+SymbiOS Benchmark: snapshot/restore fork rate and what-if branch throughput
+
+Run from backend/:  python -m benchmarks.branching --sizes 3 100 1000
+"""
+import argparse
+import time
+
+from simulation.scenarios import generate_industrial_park
+from simulation.what_if import evaluate_branches, disrupt
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 100, 1000])
+    parser.add_argument("--forks", type=int, default=2000)
+    parser.add_argument("--branches", type=int, default=200)
+    parser.add_argument("--horizon", type=int, default=30)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"{'factories':>10} | {'blob size':>10} | {'forks/s':>10} | {'branches/s (' + str(args.horizon) + ' ticks)':>22}")
+    print("=" * 72)
+    for n in args.sizes:
+        env = generate_industrial_park(n, seed=0)
+        env.reset(seed=0)
+        blob = env.snapshot()
+
+        start = time.perf_counter()
+        for _ in range(args.forks):
+            env.restore(blob)
+        forks_per_s = args.forks / (time.perf_counter() - start)
+
+        first = env.possible_agents[0]
+        branches = [{t % args.horizon: disrupt(first)} for t in range(args.branches)]
+        start = time.perf_counter()
+        evaluate_branches(env, branches, horizon=args.horizon)
+        branches_per_s = args.branches / (time.perf_counter() - start)
+
+        print(f"{n:>10d} | {len(blob):>8d} B | {forks_per_s:>10.0f} | {branches_per_s:>22.0f}")
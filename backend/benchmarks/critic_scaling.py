@@ -0,0 +1,42 @@
+"""
+SymbiOS Benchmark: centralized critic cost vs. park size
+
+Forward + backward latency and parameter count of:
+- flat: CriticNetwork over the concatenated global observation
+- full / local / clustered: AgentTokenCritic with the matching attention mode
+
+Run from backend/:  python -m benchmarks.critic_scaling --agents 100 1000 4000 --batch 8
+"""
+import argparse
+
+import torch
+
+from marl.networks import AgentTokenCritic, CriticNetwork
+from benchmarks._timing import time_ms
+
+OBS_DIM = 12
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, nargs="+", default=[100, 1000, 4000])
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-full", type=int, default=1000, help="largest park for O(N^2) full attention")
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print(f"{'agents':>7} | {'critic':>9} | {'params':>10} | {'fwd+bwd':>10}")
+    print("=" * 78)
+    for n in args.agents:
+        x = torch.randn(args.batch, n * OBS_DIM)
+        critics = {
+            "flat": CriticNetwork(n * OBS_DIM),
+            "full": AgentTokenCritic(OBS_DIM, attention="full"),
+            "local": AgentTokenCritic(OBS_DIM, attention="local"),
+            "clustered": AgentTokenCritic(OBS_DIM, attention="clustered"),
+        }
+        for name, net in critics.items():
+            if name == "full" and n > args.max_full:
+                continue
+            params = sum(p.numel() for p in net.parameters())
+            print(f"{n:>7d} | {name:>9} | {params:>10d} | {time_ms(lambda: net(x).sum().backward(), args.repeats):>7.1f} ms")
@@ -0,0 +1,42 @@
+"""
+SymbiOS Benchmark: env.step loop vs. env.advance fast-forward (simulated ticks per second)
+
+Run from backend/:  python -m benchmarks.fast_forward --ticks 1000 --sizes 3 100 1000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from simulation.scenarios import generate_industrial_park
+
+def bench_step_loop(num_factories: int, ticks: int, actions: np.ndarray) -> float:
+    env = generate_industrial_park(num_factories, max_steps=ticks + 1, seed=0)
+    env.reset(seed=0)
+    action_dict = {a: actions[i] for i, a in enumerate(env.possible_agents)}
+    start = time.perf_counter()
+    for _ in range(ticks):
+        env.step(action_dict)
+    return ticks / (time.perf_counter() - start)
+
+def bench_advance(num_factories: int, ticks: int, actions: np.ndarray) -> float:
+    env = generate_industrial_park(num_factories, max_steps=ticks + 1, seed=0)
+    env.reset(seed=0)
+    start = time.perf_counter()
+    env.advance(ticks, policy=actions)
+    return ticks / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 100, 1000])
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Fixed-policy fast-forward: simulated ticks / second")
+    print("=" * 60)
+    for n in args.sizes:
+        actions = np.random.default_rng(0).uniform(-1, 1, size=(n, 6))
+        step_tps = bench_step_loop(n, args.ticks, actions)
+        advance_tps = bench_advance(n, args.ticks, actions)
+        print(f"  {n:>5d} factories | step loop: {step_tps:>9.0f} | advance: {advance_tps:>9.0f} | {advance_tps / step_tps:.1f}x")
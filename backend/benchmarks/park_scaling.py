@@ -0,0 +1,80 @@
+"""
+SymbiOS Benchmark: park size scaling (10 → 10,000 factories)
+
+Reports per scale:
+- env step latency (dict API, random actions)
+- policy inference latency: one ActorNetwork over all agents in a single batch, and the
+  per-agent TransformerMAPPO.get_actions_batch for parks up to --max-per-agent-actors
+- memory per agent for building the park (tracemalloc, includes NumPy buffers)
+
+Run from backend/:  python -m benchmarks.park_scaling --sizes 10 100 1000 10000
+"""
+import argparse
+import tracemalloc
+
+import numpy as np
+import torch
+
+from simulation.scenarios import generate_industrial_park
+from marl.networks import ActorNetwork
+from marl.mappo import TransformerMAPPO
+from benchmarks._timing import time_ms
+
+def bench_scale(num_factories: int, repeats: int, max_per_agent_actors: int) -> dict:
+    tracemalloc.start()
+    env = generate_industrial_park(num_factories, seed=0)
+    obs, _ = env.reset(seed=0)
+    bytes_per_agent = tracemalloc.get_traced_memory()[0] / num_factories
+    tracemalloc.stop()
+
+    obs_dim = env.observation_space(env.possible_agents[0]).shape[0]
+    action_dim = env.action_space(env.possible_agents[0]).shape[0]
+
+    rng = np.random.default_rng(0)
+    actions = {a: rng.uniform(-1, 1, action_dim).astype(np.float32) for a in env.possible_agents}
+
+    def env_step():
+        if not env.agents:
+            env.reset()
+        env.step(actions)
+
+    step_ms = time_ms(env_step, repeats)
+
+    # Shared policy: every agent's observation in one forward pass
+    actor = ActorNetwork(obs_dim, action_dim).eval()
+    obs_batch = torch.as_tensor(np.stack([obs[a] for a in env.possible_agents]))
+
+    def shared_forward():
+        with torch.no_grad():
+            actor(obs_batch)
+
+    shared_ms = time_ms(shared_forward, repeats)
+
+    # Per-agent actors (one network per factory) only fit in memory for small parks
+    per_agent_ms = None
+    if num_factories <= max_per_agent_actors:
+        model = TransformerMAPPO(env.possible_agents, obs_dim, obs_dim * num_factories, action_dim)
+        obs_array = obs_batch.numpy()[None]
+        per_agent_ms = time_ms(lambda: model.get_actions_batch(obs_array), repeats)
+
+    return {
+        "step_ms": step_ms,
+        "shared_ms": shared_ms,
+        "per_agent_ms": per_agent_ms,
+        "bytes_per_agent": bytes_per_agent,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--max-per-agent-actors", type=int, default=100)
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print(f"{'factories':>10} | {'env step':>10} | {'shared policy':>13} | {'per-agent policy':>16} | {'mem/agent':>10}")
+    print("=" * 78)
+    for n in args.sizes:
+        r = bench_scale(n, args.repeats, args.max_per_agent_actors)
+        per_agent = f"{r['per_agent_ms']:.2f} ms" if r["per_agent_ms"] is not None else "skipped"
+        print(f"{n:>10d} | {r['step_ms']:>7.2f} ms | {r['shared_ms']:>10.2f} ms | {per_agent:>16} | {r['bytes_per_agent']:>7.0f} B")
@@ -0,0 +1,65 @@
+"""
+SymbiOS Benchmark: serving latency of exported policies vs. the training model
+
+Times one deterministic action call for a single park (the /api/simulation/step path):
+- train: TransformerMAPPO.get_actions_batch (sampling, values, attention capture)
+- torchscript / torchscript-int8: frozen traced actors, fp32 and dynamic int8 Linear layers
+- onnx / onnx-int8: onnxruntime sessions (only when onnx and onnxruntime are installed)
+Max abs error is against the fp32 eval-mode policy means.
+
+Run from backend/:  python -m benchmarks.policy_export --agents 3 10 --threads 1
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import torch
+
+from marl.mappo import TransformerMAPPO
+from marl.export import build_inference_policy, export_policy, load_policy
+from benchmarks._timing import time_ms
+
+OBS_DIM = 12
+ACTION_DIM = 6
+
+def _has_onnx() -> bool:
+    try:
+        import onnx, onnxruntime # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, nargs="+", default=[3, 10])
+    parser.add_argument("--share-actor", action="store_true")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+
+    variants = [("torchscript", False), ("torchscript", True)]
+    if _has_onnx():
+        variants += [("onnx", False), ("onnx", True)]
+
+    print("=" * 60)
+    print(f"Exported policy latency, 1 park, {args.threads} thread(s)")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.agents:
+            agents = [f"agent_{i}" for i in range(n)]
+            model = TransformerMAPPO(agents, OBS_DIM, OBS_DIM * n, ACTION_DIM, share_actor=args.share_actor)
+            obs = np.random.default_rng(0).standard_normal((1, n, OBS_DIM)).astype(np.float32)
+            with torch.no_grad():
+                reference = build_inference_policy(model)(torch.from_numpy(obs)).numpy()
+
+            train_ms = time_ms(lambda: model.get_actions_batch(obs), args.repeats)
+            print(f"  {n:>4d} agents | {'train':<16s} {train_ms:>7.3f} ms")
+            for file_format, quantize in variants:
+                name = file_format + ("-int8" if quantize else "")
+                path = export_policy(model, os.path.join(tmp, f"{n}_{name}"), file_format, quantize)
+                policy = load_policy(path, args.threads)
+                error = np.abs(policy.get_actions_batch(obs)[0] - reference).max()
+                ms = time_ms(lambda: policy.get_actions_batch(obs), args.repeats)
+                print(f"  {n:>4d} agents | {name:<16s} {ms:>7.3f} ms | {train_ms / ms:>4.1f}x | max err {error:.1e}")
@@ -0,0 +1,46 @@
+"""
+SymbiOS Benchmark: per-tick policy latency, one actor call per agent vs. stacked actors
+
+Times TransformerMAPPO action selection for every agent of --parks parks at once:
+- loop: one ActorNetwork forward per agent (the pre-batching path)
+- stacked: get_actions_batch, all actors in one StackedActors pass
+
+Run from backend/:  python -m benchmarks.policy_inference --agents 3 10 30 100 --parks 8
+"""
+import argparse
+
+import numpy as np
+import torch
+
+from marl.mappo import TransformerMAPPO
+from benchmarks._timing import time_ms
+
+OBS_DIM = 12
+ACTION_DIM = 6
+
+def per_agent_loop(model: TransformerMAPPO, obs: np.ndarray) -> None:
+    obs_t = torch.as_tensor(obs)
+    with torch.no_grad():
+        model.critic(obs_t.reshape(obs_t.shape[0], -1))
+        for i, agent in enumerate(model.agents):
+            mean, std = model.actors[agent](obs_t[:, i])
+            torch.distributions.Normal(mean, std).sample()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, nargs="+", default=[3, 10, 30, 100])
+    parser.add_argument("--parks", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Policy latency per tick, {args.parks} parks")
+    print("=" * 60)
+    for n in args.agents:
+        agents = [f"agent_{i}" for i in range(n)]
+        model = TransformerMAPPO(agents, OBS_DIM, OBS_DIM * n, ACTION_DIM)
+        obs = np.random.default_rng(0).standard_normal((args.parks, n, OBS_DIM)).astype(np.float32)
+
+        loop_ms = time_ms(lambda: per_agent_loop(model, obs), args.repeats)
+        stacked_ms = time_ms(lambda: model.get_actions_batch(obs), args.repeats)
+        print(f"  {n:>4d} agents | loop: {loop_ms:>8.2f} ms | stacked: {stacked_ms:>8.2f} ms | {loop_ms / stacked_ms:.1f}x")
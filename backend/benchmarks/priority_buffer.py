@@ -0,0 +1,57 @@
+"""
+SymbiOS Benchmark: prioritized rollout buffer cost vs. capacity
+
+Per-operation latency of PriorityRolloutBuffer on the sum-tree backend:
+- add: one tick for --parks parks (max-priority insert)
+- sample: one prioritized draw of --batch indices with importance weights
+- update: one batched priority write of --batch TD errors
+
+Run from backend/:  python -m benchmarks.priority_buffer --ticks 1000 100000 1000000 --parks 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from marl.buffer import PriorityRolloutBuffer, importance_weights
+
+OBS_DIM = 12
+ACTION_DIM = 6
+
+def _time_us(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--parks", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    obs = rng.standard_normal((args.parks, OBS_DIM)).astype(np.float32)
+    action = rng.standard_normal((args.parks, ACTION_DIM)).astype(np.float32)
+    zeros = np.zeros(args.parks, dtype=np.float32)
+
+    print("=" * 72)
+    print(f"{'transitions':>12} | {'add (us)':>10} | {'sample (us)':>12} | {'update (us)':>12}")
+    print("=" * 72)
+    for ticks in args.ticks:
+        buffer = PriorityRolloutBuffer(ticks, OBS_DIM, ACTION_DIM, num_envs=args.parks)
+        # Fill most of the buffer cheaply, then time inserts near the end
+        buffer.step = ticks - args.repeats - 1
+        buffer.priorities.update(np.arange(buffer.step * args.parks), rng.random(buffer.step * args.parks))
+        add_us = _time_us(lambda: buffer.add(obs, action, zeros, zeros, zeros, zeros), args.repeats)
+
+        size = buffer.step * args.parks
+        def sample():
+            idx = buffer.priorities.sample(args.batch)
+            importance_weights(buffer.priorities.get(idx) / buffer.priorities.total, size, buffer.is_beta)
+        sample_us = _time_us(sample, args.repeats)
+
+        update_us = _time_us(lambda: buffer.update_priorities(rng.integers(0, size, args.batch), rng.random(args.batch)), args.repeats)
+        print(f"{size:>12d} | {add_us:>10.1f} | {sample_us:>12.1f} | {update_us:>12.1f}")
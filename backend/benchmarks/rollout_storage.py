@@ -0,0 +1,59 @@
+"""
+SymbiOS Benchmark: rollout writes and minibatch gathers
+
+Per-tick cost of storing one transition per agent and park:
+- per-agent add: one PriorityRolloutBuffer.add call per agent
+- add_batch: RolloutStorage.add_batch, one slice assignment per field for the whole tick
+and the cost of one full pass of get_generator minibatches over the filled buffers.
+
+Run from backend/:  python -m benchmarks.rollout_storage --agents 3 10 50 --parks 8 --ticks 512
+"""
+import argparse
+import time
+
+import numpy as np
+
+from marl.buffer import RolloutStorage
+
+OBS_DIM = 12
+ACTION_DIM = 6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, nargs="+", default=[3, 10, 50])
+    parser.add_argument("--parks", type=int, default=8)
+    parser.add_argument("--ticks", type=int, default=512)
+    parser.add_argument("--batch", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print("=" * 72)
+    print(f"{args.ticks} ticks x {args.parks} parks")
+    print("=" * 72)
+    for n in args.agents:
+        agents = [f"agent_{i}" for i in range(n)]
+        obs = rng.standard_normal((args.parks, n, OBS_DIM)).astype(np.float32)
+        actions = rng.standard_normal((args.parks, n, ACTION_DIM)).astype(np.float32)
+        scalars = rng.standard_normal((args.parks, n)).astype(np.float32)
+
+        storage = RolloutStorage(agents, args.ticks, OBS_DIM, ACTION_DIM, num_envs=args.parks)
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            for i, agent in enumerate(agents):
+                storage.buffers[agent].add(obs[:, i], actions[:, i], scalars[:, i], scalars[:, i], scalars[:, i], scalars[:, i])
+        add_us = (time.perf_counter() - start) / args.ticks * 1e6
+
+        storage = RolloutStorage(agents, args.ticks, OBS_DIM, ACTION_DIM, num_envs=args.parks)
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            storage.add_batch(obs, actions, scalars, scalars, scalars, scalars)
+        batch_us = (time.perf_counter() - start) / args.ticks * 1e6
+
+        start = time.perf_counter()
+        for buffer in storage.buffers.values():
+            for _ in buffer.get_generator(args.batch, "cpu"):
+                pass
+        gather_ms = (time.perf_counter() - start) * 1000.0
+
+        print(f"  {n:>4d} agents | per-agent add: {add_us:>8.1f} us/tick | add_batch: {batch_us:>7.1f} us/tick | "
+              f"{add_us / batch_us:>5.1f}x | minibatch pass: {gather_ms:>7.1f} ms")
@@ -0,0 +1,45 @@
+"""
+SymbiOS Benchmark: shared-memory subprocess env scaling with worker count
+
+Run from backend/:  python -m benchmarks.subproc_env --num-envs 256 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from simulation.scenarios import setup_guindy_industrial_park
+from simulation.vector_env import VectorIndustrialParkEnv
+from simulation.subproc_env import SubprocVectorIndustrialParkEnv
+
+def bench(env, ticks: int) -> float:
+    """Park-steps per second with random actions."""
+    env.reset(seed=0)
+    rng = np.random.default_rng(0)
+    actions = rng.uniform(-1, 1, size=(env.num_envs, env.num_agents, env.action_dim)).astype(np.float32)
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        env.step(actions)
+    elapsed = time.perf_counter() - start
+    return ticks * env.num_envs / elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--num-envs", type=int, default=256)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    env_fns = [setup_guindy_industrial_park for _ in range(args.num_envs)]
+
+    print("=" * 60)
+    print(f"Subprocess env scaling: {args.num_envs} parks, {os.cpu_count()} CPUs")
+    print("=" * 60)
+    base = bench(VectorIndustrialParkEnv(env_fns), args.ticks)
+    print(f"  in-process        : {base:>10.0f} steps/s")
+    for workers in sorted(set(args.workers)):
+        with SubprocVectorIndustrialParkEnv(env_fns, num_workers=workers) as env:
+            sps = bench(env, args.ticks)
+        print(f"  {workers:>3d} worker(s)     : {sps:>10.0f} steps/s ({sps / base:.1f}x)")
@@ -0,0 +1,62 @@
+"""
+SymbiOS Benchmark: single park vs. vectorized parks (steps per second)
+
+Run from backend/:  python -m benchmarks.vector_env
+"""
+import argparse
+import time
+
+import numpy as np
+
+from simulation.scenarios import setup_guindy_industrial_park
+from simulation.vector_env import VectorIndustrialParkEnv
+from marl.mappo import TransformerMAPPO
+
+def _make_vector_env(num_envs: int) -> VectorIndustrialParkEnv:
+    return VectorIndustrialParkEnv([setup_guindy_industrial_park for _ in range(num_envs)])
+
+def bench_env_only(num_envs: int, ticks: int) -> float:
+    """Park-steps per second with random actions (no policy)."""
+    env = _make_vector_env(num_envs)
+    env.reset(seed=0)
+    rng = np.random.default_rng(0)
+    actions = rng.uniform(-1, 1, size=(ticks, num_envs, env.num_agents, env.action_dim)).astype(np.float32)
+
+    start = time.perf_counter()
+    for t in range(ticks):
+        env.step(actions[t])
+    elapsed = time.perf_counter() - start
+    return ticks * num_envs / elapsed
+
+def bench_with_policy(num_envs: int, ticks: int) -> float:
+    """Park-steps per second with one batched policy forward per tick, as in MARLTrainer.collect_rollouts."""
+    env = _make_vector_env(num_envs)
+    model = TransformerMAPPO(env.possible_agents, env.obs_dim, env.obs_dim * env.num_agents, env.action_dim)
+    obs, _ = env.reset(seed=0)
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        actions, _, _ = model.get_actions_batch(obs)
+        obs, _, _, _, _ = env.step(actions)
+    elapsed = time.perf_counter() - start
+    return ticks * num_envs / elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--num-envs", type=int, nargs="+", default=[1, 64])
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Vectorized Industrial Park: park-steps / second")
+    print("=" * 60)
+    results = {}
+    for k in args.num_envs:
+        env_sps = bench_env_only(k, args.ticks)
+        policy_sps = bench_with_policy(k, args.ticks)
+        results[k] = policy_sps
+        print(f"  K={k:<4d} env only: {env_sps:>10.0f} steps/s | env + policy: {policy_sps:>10.0f} steps/s")
+
+    base = results[args.num_envs[0]]
+    for k in args.num_envs[1:]:
+        print(f"  Speedup K={k} vs K={args.num_envs[0]} (env + policy): {results[k] / base:.1f}x")
@@ -25,6 +25,10 @@ class Settings(BaseModel):
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     CEREBRAS_API_KEY: str = os.getenv("CEREBRAS_API_KEY", "")
     
+    # Serving: path of an export_policy artifact; empty = fresh in-process TransformerMAPPO
+    POLICY_PATH: str = os.getenv("SYMBIOS_POLICY_PATH", "")
+    POLICY_THREADS: int = int(os.getenv("SYMBIOS_POLICY_THREADS", "0"))
+    
     # Legacy
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     LLM_MODEL: str = "groq/llama-3.3-70b-versatile"
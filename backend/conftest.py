@@ -0,0 +1 @@
+# Makes backend/ importable (simulation, economics, marl) when pytest is run from here
@@ -58,6 +58,52 @@ class DoubleAuction:
                 
         return matches
 
+def match_orders_batched(bid_price: np.ndarray, bid_quantity: np.ndarray,
+                         ask_price: np.ndarray, ask_quantity: np.ndarray,
+                         arrival: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """
+    Array version of DoubleAuction.match_orders for many independent order books at once
+    (e.g. one book per resource). Inputs are (books, orders): column j is order j of every book,
+    a zero quantity means no order. Buys rank by price high->low, sells low->high, ties by
+    `arrival` (earlier first, default column order). Top of book is matched against top of book
+    at the midpoint price until the best bid drops below the best ask, exactly as DoubleAuction does.
+    Returns flat trade arrays: book, buyer, seller (column indices), quantity, price.
+    """
+    books, n = bid_price.shape
+    arrival = np.broadcast_to(np.arange(n) if arrival is None else arrival, (books, n))
+    
+    buy_rank = np.lexsort((arrival, -bid_price), axis=-1)
+    sell_rank = np.lexsort((arrival, ask_price), axis=-1)
+    buy_cum = np.cumsum(np.take_along_axis(bid_quantity, buy_rank, axis=1), axis=1)
+    sell_cum = np.cumsum(np.take_along_axis(ask_quantity, sell_rank, axis=1), axis=1)
+    
+    # Greedy matching fills the quantity axis in segments bounded by the cumulative order sizes
+    # of both sides; each segment is one match between the orders covering it
+    merged = np.concatenate([buy_cum, sell_cum], axis=1)
+    order = np.argsort(merged, axis=1, kind="stable")
+    zeros = np.zeros((books, 1), dtype=np.int64)
+    points = np.concatenate([np.zeros((books, 1)), np.take_along_axis(merged, order, axis=1)], axis=1)
+    buy_pos = np.concatenate([zeros, np.cumsum(order < n, axis=1)], axis=1)[:, :-1]
+    sell_pos = np.concatenate([zeros, np.cumsum(order >= n, axis=1)], axis=1)[:, :-1]
+    start, end = points[:, :-1], points[:, 1:]
+    
+    live = (end > start) & (buy_pos < n) & (sell_pos < n)
+    book = np.broadcast_to(np.arange(books)[:, None], live.shape)[live]
+    buyer = buy_rank[book, buy_pos[live]]
+    seller = sell_rank[book, sell_pos[live]]
+    best_bid = bid_price[book, buyer]
+    best_ask = ask_price[book, seller]
+    
+    # Bid minus ask only falls along the book, so the crossed segments form a prefix
+    crossed = best_bid >= best_ask
+    return {
+        "book": book[crossed],
+        "buyer": buyer[crossed],
+        "seller": seller[crossed],
+        "quantity": (end - start)[live][crossed],
+        "price": (best_bid[crossed] + best_ask[crossed]) / 2.0,
+    }
+
 class MarketMakerAgent:
     """
     An algorithmic entity that ensures the market always has liquidity.
@@ -11,6 +11,7 @@ from config import settings
 from simulation.scenarios import setup_guindy_industrial_park
 from simulation.resource_types import ResourceType
 from marl.mappo import TransformerMAPPO
+from marl.export import load_policy
 from genai.suggestion_engine import SuggestionEngine
 from genai.log_analyzer import analyze_simulation_log
 
@@ -24,7 +25,7 @@ async def lifespan(app: FastAPI):
     
     # 1. Init Simulation
     env = setup_guindy_industrial_park()
-    obs, info = env.reset()
+    obs, info = env.reset_array()
     app_state["env"] = env
     app_state["obs"] = obs
     app_state["step_count"] = 0
@@ -38,7 +39,11 @@ async def lifespan(app: FastAPI):
     obs_dim = env.observation_space(env.possible_agents[0]).shape[0]
     action_dim = env.action_space(env.possible_agents[0]).shape[0]
     global_obs_dim = obs_dim * len(env.possible_agents)
-    model = TransformerMAPPO(env.possible_agents, obs_dim, global_obs_dim, action_dim)
+    if settings.POLICY_PATH:
+        # Exported inference-only policy (TorchScript / ONNX, optionally int8)
+        model = load_policy(settings.POLICY_PATH, settings.POLICY_THREADS or None)
+    else:
+        model = TransformerMAPPO(env.possible_agents, obs_dim, global_obs_dim, action_dim)
     app_state["model"] = model
     
     # 3. Init GenAI
@@ -111,26 +116,27 @@ async def simulation_step():
     
     # Check if episode is done
     if getattr(env, "agents", []) == [] or not env.agents:
-        obs, info = env.reset()
+        obs, info = env.reset_array()
         app_state["obs"] = obs
         # Seamlessly continue to the next episode without resetting global step count
     
-    # Get MARL actions
-    actions, log_probs, values = model.get_actions(obs)
+    # Get MARL actions: obs is an (agents, obs_dim) array in env.possible_agents order
+    actions, log_probs, values = model.get_actions_batch(obs[None])
     
     # Step environment
-    next_obs, rewards, dones, truncs, infos = env.step(actions)
+    next_obs, rewards, dones, truncs, infos = env.step_array(actions[0])
     
     app_state["obs"] = next_obs
     app_state["step_count"] += 1
     
     # Build response
+    agents = env.possible_agents
     step_data = {
         "step": app_state["step_count"],
-        "rewards": {k: round(v, 4) for k, v in rewards.items()},
-        "disruptions": {k: v.get("disrupted", False) for k, v in infos.items()},
-        "done": any(dones.values()),
-        "actions": {k: v.tolist() for k, v in actions.items()}
+        "rewards": {a: round(float(r), 4) for a, r in zip(agents, rewards)},
+        "disruptions": {a: bool(d) for a, d in zip(agents, infos["disrupted"])},
+        "done": bool(dones.any()),
+        "actions": {a: act.tolist() for a, act in zip(agents, actions[0])}
     }
     
     return step_data
@@ -161,9 +167,13 @@ async def get_simulation_state():
 async def get_attention_weights():
     """Get Transformer attention weights for visualization."""
     model = app_state["model"]
+    env = app_state["env"]
     obs = app_state["obs"]
     
-    weights = model.get_attention_weights(obs)
+    # Maps cached by the policy forward of the last simulation step; computed once if no step ran yet
+    weights = model.get_attention_weights()
+    if not weights:
+        weights = model.get_attention_weights(dict(zip(env.possible_agents, obs)))
     
     # Convert tensors to lists for JSON serialization
     serialized = {}
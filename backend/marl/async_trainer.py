@@ -0,0 +1,223 @@
+import os
+import queue
+import time
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from typing import Callable, Dict, List, Optional
+
+from simulation.environment import IndustrialParkEnv
+from simulation.vector_env import VectorIndustrialParkEnv
+from marl.mappo import TransformerMAPPO
+from marl.buffer import RolloutStorage, GlobalStateBuffer, compute_vtrace
+
+def _copy_params(params: List[torch.Tensor], flat: torch.Tensor, to_flat: bool) -> None:
+    offset = 0
+    with torch.no_grad():
+        for p in params:
+            n = p.numel()
+            if to_flat:
+                flat[offset:offset + n].copy_(p.reshape(-1))
+            else:
+                p.copy_(flat[offset:offset + n].view_as(p))
+            offset += n
+
+def _rollout_worker(index: int, env_fn: Callable[[], IndustrialParkEnv], parks: int, model: TransformerMAPPO,
+                    shared_params: torch.Tensor, version, lock, trajectories, stop, rollout_steps: int, seed: Optional[int]) -> None:
+    # Workers are many small processes; one intra-op thread each keeps them from oversubscribing the cores
+    torch.set_num_threads(1)
+    if seed is not None:
+        torch.manual_seed(int(np.random.SeedSequence(seed, spawn_key=(index,)).generate_state(1)[0]))
+    env = VectorIndustrialParkEnv([env_fn] * parks, park_offset=index * parks)
+    params = model.actor_parameters()
+
+    num_agents, obs_dim, action_dim = env.num_agents, env.obs_dim, env.action_dim
+    local_version = -1
+    obs, _ = env.reset(seed=seed)
+    try:
+        while not stop.is_set():
+            # Pick up the learner's newest weights, if any, between rollouts
+            if version.value != local_version:
+                with lock:
+                    _copy_params(params, shared_params, to_flat=False)
+                    local_version = version.value
+                model.invalidate_stacked_actors()
+
+            traj = {
+                "obs": np.empty((rollout_steps, parks, num_agents, obs_dim), dtype=np.float32),
+                "actions": np.empty((rollout_steps, parks, num_agents, action_dim), dtype=np.float32),
+                "rewards": np.empty((rollout_steps, parks, num_agents), dtype=np.float32),
+                "dones": np.empty((rollout_steps, parks, num_agents), dtype=np.bool_),
+                "log_probs": np.empty((rollout_steps, parks, num_agents), dtype=np.float32),
+            }
+            for t in range(rollout_steps):
+                # Values come from the learner's own critic pass (see learn), so workers only run the actors
+                actions, log_probs = model.act_batch(obs)
+                next_obs, rewards, dones, truncs, _ = env.step(actions)
+                traj["obs"][t] = obs
+                traj["actions"][t] = actions
+                traj["rewards"][t] = rewards
+                traj["dones"][t] = dones | truncs
+                traj["log_probs"][t] = log_probs
+                obs = next_obs
+            traj["last_obs"] = obs.copy()
+            traj["version"] = local_version
+            traj["worker"] = index
+
+            # Bounded queue: a worker that gets too far ahead waits instead of piling up stale data
+            while not stop.is_set():
+                try:
+                    trajectories.put(traj, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        env.close()
+
+class AsyncMARLTrainer:
+    """
+    Asynchronous actor-learner training (IMPALA-style) for TransformerMAPPO.
+    num_workers rollout processes each run `parks_per_worker` parks with their own copy of the actors and
+    keep pushing rollout_steps-tick trajectories into a bounded queue. The learner (this process) consumes
+    them, corrects for the workers' slightly stale weights with V-trace (truncation rho_bar / c_bar), runs
+    the usual PPO update on the corrected advantages and publishes the new actor weights to a shared-memory
+    vector that workers poll between rollouts. queue_size bounds how many trajectories can wait, and so
+    how stale the data gets.
+    """
+    def __init__(self,
+                 env_fn: Callable[[], IndustrialParkEnv],
+                 model: TransformerMAPPO,
+                 num_workers: Optional[int] = None,
+                 parks_per_worker: int = 1,
+                 rollout_steps: int = 128,
+                 batch_size: int = 64,
+                 ppo_epochs: int = 4,
+                 queue_size: Optional[int] = None,
+                 gamma: float = 0.99,
+                 rho_bar: float = 1.0,
+                 c_bar: float = 1.0,
+                 seed: Optional[int] = None,
+                 context: Optional[str] = None):
+        self.model = model
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.rollout_steps = rollout_steps
+        self.batch_size = batch_size
+        self.ppo_epochs = ppo_epochs
+        self.gamma = gamma
+        self.rho_bar = rho_bar
+        self.c_bar = c_bar
+
+        probe = env_fn()
+        self.agents = probe.possible_agents[:]
+        obs_dim = probe.observation_space(self.agents[0]).shape[0]
+        action_dim = probe.action_space(self.agents[0]).shape[0]
+        del probe
+
+        # Learner-side storage for one trajectory; model.update reads it exactly as in MARLTrainer
+        self.storage = RolloutStorage(self.agents, rollout_steps, obs_dim, action_dim, num_envs=parks_per_worker)
+        self.buffers = self.storage.buffers
+        self.global_states = GlobalStateBuffer(rollout_steps, obs_dim * len(self.agents), num_envs=parks_per_worker)
+
+        # Published policy: one flat float32 vector in shared memory plus a version counter
+        ctx = mp.get_context(context)
+        self._params = model.actor_parameters()
+        self.shared_params = torch.zeros(sum(p.numel() for p in self._params)).share_memory_()
+        _copy_params(self._params, self.shared_params, to_flat=True)
+        self.version = ctx.Value("l", 0)
+        self.lock = ctx.Lock()
+        self.trajectories = ctx.Queue(maxsize=queue_size or 2 * self.num_workers)
+        self.stop = ctx.Event()
+
+        self.processes = []
+        for i in range(self.num_workers):
+            process = ctx.Process(
+                target=_rollout_worker,
+                args=(i, env_fn, parks_per_worker, model, self.shared_params, self.version, self.lock,
+                      self.trajectories, self.stop, rollout_steps, seed),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        self.closed = False
+
+    def publish(self) -> None:
+        """Makes the learner's current actor weights visible to the workers."""
+        with self.lock:
+            _copy_params(self._params, self.shared_params, to_flat=True)
+            self.version.value += 1
+
+    def learn(self, traj: Dict[str, np.ndarray]) -> Dict[str, float]:
+        """One V-trace corrected PPO update from a worker trajectory."""
+        steps, parks, num_agents = traj["rewards"].shape
+        flat_obs = traj["obs"].reshape(steps * parks, num_agents, -1)
+        flat_actions = traj["actions"].reshape(steps * parks, num_agents, -1)
+
+        # Learner policy vs. the behaviour policy that produced the actions
+        target_log_probs, values = self.model.evaluate_actions_batch(flat_obs, flat_actions)
+        target_log_probs = target_log_probs.reshape(steps, parks, num_agents).cpu()
+        values = values.reshape(steps, parks, num_agents).cpu()
+        _, _, last_values = self.model.get_actions_batch(traj["last_obs"])
+
+        log_rhos = target_log_probs - torch.from_numpy(traj["log_probs"])
+        vs, pg_advantages = compute_vtrace(
+            torch.from_numpy(traj["rewards"]), values, torch.from_numpy(traj["dones"]).float(),
+            torch.from_numpy(last_values), log_rhos, self.gamma, self.rho_bar, self.c_bar
+        )
+
+        # The PPO ratio is then taken against the learner's own pre-update policy
+        for t in range(steps):
+            self.global_states.add(traj["obs"][t])
+            self.storage.add_batch(traj["obs"][t], traj["actions"][t], traj["rewards"][t], traj["dones"][t], target_log_probs[t], values[t])
+        self.storage.views["advantages"][:steps, ..., 0] = pg_advantages.numpy()
+        self.storage.views["returns"][:steps, ..., 0] = vs.numpy()
+
+        self.model.update(self.buffers, self.batch_size, self.ppo_epochs, self.global_states)
+        self.publish()
+        return {
+            "staleness": float(self.version.value - 1 - traj["version"]),
+            "mean_reward": float(traj["rewards"].mean()),
+            "mean_rho": float(torch.exp(log_rhos).mean()),
+        }
+
+    def train(self, num_updates: int, log_every: int = 10) -> List[Dict[str, float]]:
+        """Runs num_updates learner steps while the workers keep collecting; returns per-update stats."""
+        history = []
+        ticks = 0
+        start = time.perf_counter()
+        for update in range(1, num_updates + 1):
+            traj = self.trajectories.get()
+            stats = self.learn(traj)
+            ticks += traj["rewards"].shape[0] * traj["rewards"].shape[1]
+            stats["ticks_per_sec"] = ticks / (time.perf_counter() - start)
+            history.append(stats)
+
+            if update % log_every == 0 or update == num_updates:
+                print(f"Update {update}/{num_updates} | reward {stats['mean_reward']:.3f} | "
+                      f"staleness {stats['staleness']:.0f} | rho {stats['mean_rho']:.2f} | {stats['ticks_per_sec']:.0f} park-ticks/s")
+        return history
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.stop.set()
+        # Drain so no worker stays blocked on a full queue
+        while any(p.is_alive() for p in self.processes):
+            try:
+                self.trajectories.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        if not getattr(self, "closed", True):
+            self.close()
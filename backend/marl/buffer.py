@@ -1,26 +1,140 @@
 import torch
 import numpy as np
+from typing import Dict, List, Optional
+
+from marl.sum_tree import SumTree
+
+def compute_gae_batched(rewards: torch.Tensor, values: torch.Tensor, dones: torch.Tensor,
+                        last_value: torch.Tensor, last_done: torch.Tensor,
+                        gamma: float = 0.99, gae_lambda: float = 0.95) -> torch.Tensor:
+    """
+    Generalized Advantage Estimation over (T, ...) tensors, e.g. (T, envs, agents), in one reverse scan.
+    dones[t] flags that transition t ended its episode, so episodes may end anywhere in the buffer.
+    last_value / last_done have the trailing shape and describe the observation after the final tick.
+    """
+    next_values = torch.cat([values[1:], last_value.unsqueeze(0)])
+    next_non_terminal = 1.0 - torch.cat([dones[:-1], last_done.unsqueeze(0)])
+    
+    # All TD errors and discounts at once; only the recurrence itself walks over time
+    deltas = rewards + gamma * next_values * next_non_terminal - values
+    discounts = gamma * gae_lambda * next_non_terminal
+    
+    advantages = torch.empty_like(deltas)
+    last_gae_lam = torch.zeros_like(deltas[0])
+    for step in range(deltas.shape[0] - 1, -1, -1):
+        last_gae_lam = deltas[step] + discounts[step] * last_gae_lam
+        advantages[step] = last_gae_lam
+    return advantages
+
+def compute_vtrace(rewards: torch.Tensor, values: torch.Tensor, dones: torch.Tensor, last_value: torch.Tensor,
+                   log_rhos: torch.Tensor, gamma: float = 0.99, rho_bar: float = 1.0, c_bar: float = 1.0):
+    """
+    V-trace targets (Espeholt et al., 2018) for trajectories collected by a stale behaviour policy, over (T, ...) tensors.
+    log_rhos = log pi(a|s) - log mu(a|s) of the learner vs. behaviour policy; rho_bar / c_bar truncate the
+    importance ratios of the TD errors and of the trace. Returns (value targets vs, policy-gradient advantages).
+    """
+    rhos = torch.exp(log_rhos)
+    clipped_rhos = rhos.clamp(max=rho_bar)
+    cs = rhos.clamp(max=c_bar)
+    non_terminal = 1.0 - dones
+    
+    next_values = torch.cat([values[1:], last_value.unsqueeze(0)])
+    deltas = clipped_rhos * (rewards + gamma * non_terminal * next_values - values)
+    
+    vs_minus_v = torch.empty_like(deltas)
+    acc = torch.zeros_like(deltas[0])
+    for step in range(deltas.shape[0] - 1, -1, -1):
+        acc = deltas[step] + gamma * non_terminal[step] * cs[step] * acc
+        vs_minus_v[step] = acc
+    vs = values + vs_minus_v
+    
+    next_vs = torch.cat([vs[1:], last_value.unsqueeze(0)])
+    pg_advantages = clipped_rhos * (rewards + gamma * non_terminal * next_vs - values)
+    return vs, pg_advantages
+
+def compute_gae_joint(buffers: List["PriorityRolloutBuffer"], last_values: np.ndarray, last_dones: np.ndarray):
+    """
+    GAE for several agents' buffers in one pass over (T, envs, agents) tensors.
+    last_values / last_dones: (envs, agents), in the order of `buffers`.
+    """
+    first = buffers[0]
+    steps = first.step
+    
+    def stack(field: str) -> torch.Tensor:
+        return torch.cat([getattr(b, field)[:steps] for b in buffers], dim=-1)
+    
+    advantages = compute_gae_batched(
+        stack("rewards"), stack("values"), stack("dones"),
+        torch.as_tensor(last_values, dtype=torch.float32).reshape(first.num_envs, len(buffers)),
+        torch.as_tensor(np.asarray(last_dones, dtype=np.float32)).reshape(first.num_envs, len(buffers)),
+        first.gamma, first.gae_lambda
+    )
+    for i, b in enumerate(buffers):
+        b.advantages[:steps] = advantages[..., i:i + 1]
+        torch.add(b.advantages, b.values, out=b.returns)
+
+def importance_weights(probs: np.ndarray, size: int, beta: float) -> torch.Tensor:
+    """(size * P(i)) ** -beta per sampled transition, scaled so the largest is 1, as a (n, 1) tensor."""
+    weights = (size * np.maximum(probs, 1e-12)) ** -beta
+    return torch.as_tensor(weights / weights.max(), dtype=torch.float32).reshape(-1, 1)
+
+# Columns of the packed per-transition row, in storage order (obs and action widths are set per buffer)
+ROLLOUT_FIELDS = ("observations", "actions", "rewards", "dones", "log_probs", "values", "advantages", "returns")
+# What the minibatch generators hand to the PPO update, in yield order
+BATCH_FIELDS = ("observations", "actions", "values", "log_probs", "advantages", "returns")
+
+def rollout_columns(obs_dim: int, action_dim: int) -> Dict[str, slice]:
+    """Column slice of every rollout field within one packed transition row."""
+    widths = {"observations": obs_dim, "actions": action_dim}
+    columns, offset = {}, 0
+    for name in ROLLOUT_FIELDS:
+        width = widths.get(name, 1)
+        columns[name] = slice(offset, offset + width)
+        offset += width
+    return columns
+
+def _batches(packed: torch.Tensor, columns: Dict[str, slice], order: np.ndarray, weights: torch.Tensor, batch_size: int, device: torch.device):
+    """One row gather and one device transfer per minibatch; the fields are then column views of that batch."""
+    for start in range(0, len(order), batch_size):
+        batch = packed[torch.from_numpy(order[start:start + batch_size])].to(device)
+        yield tuple(batch[:, columns[name]] for name in BATCH_FIELDS) + (weights[start:start + batch_size].to(device),)
 
 class PriorityRolloutBuffer:
-    def __init__(self, buffer_size: int, obs_dim: int, action_dim: int, gamma: float = 0.99, gae_lambda: float = 0.95):
+    """
+    Rollout storage for one agent. Every field is laid out as (buffer_size, num_envs, dim)
+    so a vectorized env can write the transitions of all its parks for one tick at once.
+    All fields are column views of one preallocated float32 array `data` (buffer_size, num_envs, row width),
+    exposed to torch through torch.from_numpy, so adding a tick allocates nothing and a minibatch is
+    a single contiguous row gather. `data` may be passed in to share memory with a RolloutStorage.
+    Priorities live in a SumTree over the flat (step * num_envs + env) positions; is_beta is the
+    exponent of the importance-sampling weights that undo the prioritized sampling bias in the loss.
+    """
+    def __init__(self, buffer_size: int, obs_dim: int, action_dim: int, gamma: float = 0.99, gae_lambda: float = 0.95, num_envs: int = 1,
+                 is_beta: float = 0.4, data: Optional[np.ndarray] = None):
         self.buffer_size = buffer_size
         self.obs_dim = obs_dim
         self.action_dim = action_dim
         self.gamma = gamma
         self.gae_lambda = gae_lambda
+        self.num_envs = num_envs
+        self.is_beta = is_beta
         
-        self.observations = torch.zeros((buffer_size, obs_dim), dtype=torch.float32)
-        self.actions = torch.zeros((buffer_size, action_dim), dtype=torch.float32)
-        self.rewards = torch.zeros((buffer_size, 1), dtype=torch.float32)
-        self.dones = torch.zeros((buffer_size, 1), dtype=torch.float32)
-        self.log_probs = torch.zeros((buffer_size, 1), dtype=torch.float32)
-        self.values = torch.zeros((buffer_size, 1), dtype=torch.float32)
+        self.columns = rollout_columns(obs_dim, action_dim)
+        row_width = self.columns["returns"].stop
+        if data is None:
+            data = np.zeros((buffer_size, num_envs, row_width), dtype=np.float32)
+        self.data = data
+        self.packed = torch.from_numpy(data)
         
-        self.advantages = torch.zeros((buffer_size, 1), dtype=torch.float32)
-        self.returns = torch.zeros((buffer_size, 1), dtype=torch.float32)
+        # observations, actions, rewards, ... as zero-copy tensor views of their columns
+        self.arrays = {name: data[..., cols] for name, cols in self.columns.items()}
+        for name, cols in self.columns.items():
+            setattr(self, name, self.packed[..., cols])
         
         # Priority weights based on TD-Error
-        self.priorities = np.zeros((buffer_size,), dtype=np.float32)
+        self.priorities = SumTree(buffer_size * num_envs)
+        # New ticks get the running max priority lazily, from this step on (see sync_priorities)
+        self._unprioritized = 0
         
         self.step = 0
         self.full = False
@@ -28,70 +142,187 @@ class PriorityRolloutBuffer:
     def reset(self):
         self.step = 0
         self.full = False
-        
-    def add(self, obs: np.ndarray, action: np.ndarray, reward: float, done: bool, log_prob: float, value: float):
+        self.priorities.clear()
+        self._unprioritized = 0
+
+    def _rows(self, x, width: int) -> torch.Tensor:
+        # Scalars broadcast for single-env buffers; arrays carry one row per env
+        return torch.as_tensor(np.asarray(x, dtype=np.float32).reshape(self.num_envs, width))
+
+    def claim_step(self) -> int:
+        """Index the next tick is written to; wraps (dropping the old rollout) once the buffer is full."""
         if self.step >= self.buffer_size:
             # Drop old transitions if buffer overflows in an episode
             self.step = 0
             self.full = True
-            
-        self.observations[self.step] = torch.tensor(obs, dtype=torch.float32)
-        self.actions[self.step] = torch.tensor(action, dtype=torch.float32)
-        self.rewards[self.step] = torch.tensor(reward, dtype=torch.float32)
-        self.dones[self.step] = torch.tensor(done, dtype=torch.float32)
-        self.log_probs[self.step] = torch.tensor(log_prob, dtype=torch.float32)
-        self.values[self.step] = torch.tensor(value, dtype=torch.float32)
-        
-        # Set initial max priority for new transitions to ensure they are sampled
-        max_p = np.max(self.priorities) if self.step > 0 else 1.0
-        self.priorities[self.step] = max_p
-        
+            self.priorities.clear()
+            self._unprioritized = 0
         self.step += 1
+        return self.step - 1
+        
+    def add(self, obs: np.ndarray, action: np.ndarray, reward, done, log_prob, value):
+        """Stores one tick: obs (num_envs, obs_dim), action (num_envs, action_dim), others (num_envs,)"""
+        step = self.claim_step()
+        a = self.arrays
+        a["observations"][step] = np.reshape(obs, (self.num_envs, self.obs_dim))
+        a["actions"][step] = np.reshape(action, (self.num_envs, self.action_dim))
+        a["rewards"][step] = np.reshape(reward, (self.num_envs, 1))
+        a["dones"][step] = np.reshape(done, (self.num_envs, 1))
+        a["log_probs"][step] = np.reshape(log_prob, (self.num_envs, 1))
+        a["values"][step] = np.reshape(value, (self.num_envs, 1))
 
-    def compute_gae(self, last_value: torch.Tensor, last_done: bool):
-        """Generalized Advantage Estimation"""
-        last_gae_lam = 0
-        for step in reversed(range(self.step)):
-            if step == self.step - 1:
-                next_non_terminal = 1.0 - last_done
-                next_values = last_value
-            else:
-                next_non_terminal = 1.0 - self.dones[step + 1].item()
-                next_values = self.values[step + 1]
-                
-            delta = self.rewards[step] + self.gamma * next_values * next_non_terminal - self.values[step]
-            last_gae_lam = delta + self.gamma * self.gae_lambda * next_non_terminal * last_gae_lam
-            
-            self.advantages[step] = last_gae_lam
-            
+    def sync_priorities(self):
+        """
+        Gives the ticks added since the last sync the max priority seen so far, so new transitions are
+        sampled. Priorities only change in update_priorities, so batching this is the same as per-add inserts.
+        """
+        if self._unprioritized < self.step:
+            max_p = self.priorities.max if self.priorities.total > 0 else 1.0
+            self.priorities.update(np.arange(self._unprioritized * self.num_envs, self.step * self.num_envs), max_p)
+            self._unprioritized = self.step
+
+    def compute_gae(self, last_value: torch.Tensor, last_done):
+        """
+        Generalized Advantage Estimation.
+        dones[t] flags that transition t ended its episode, so the bootstrap from t + 1 is cut there.
+        last_value / last_done (scalar or per env) describe the observation following the final stored tick.
+        """
+        last_value = torch.as_tensor(last_value, dtype=torch.float32).reshape(self.num_envs, 1)
+        last_done = self._rows(last_done, 1)
+        
+        advantages = compute_gae_batched(
+            self.rewards[:self.step], self.values[:self.step], self.dones[:self.step],
+            last_value, last_done, self.gamma, self.gae_lambda
+        )
+        self.advantages[:self.step] = advantages
+        
         # Returns = Advantages + Values
-        self.returns = self.advantages + self.values
+        torch.add(self.advantages, self.values, out=self.returns)
 
     def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray):
-        for idx, td_error in zip(indices, td_errors):
-            self.priorities[idx] = (np.abs(td_error) + 1e-6) ** 0.6  # proportional priority
+        # Indices are flat (step * num_envs + env) positions as yielded by get_generator
+        self.sync_priorities()
+        self.priorities.update(indices, (np.abs(np.ravel(td_errors)) + 1e-6) ** 0.6)  # proportional priority
 
     def get_generator(self, batch_size: int, device: torch.device):
-        """Yields mini-batches based on priority weighting"""
-        size = self.step
-        indices = np.arange(size)
+        """
+        Yields mini-batches based on priority weighting, each with its importance-sampling weights
+        (batch, 1) normalized so the largest weight of the pass is 1.
+        """
+        self.sync_priorities()
+        size = self.step * self.num_envs
         
-        # Prioritized Sampling probabilities
-        probs = self.priorities[:size] / np.sum(self.priorities[:size])
+        # Prioritized Sampling: one proportional draw per stored transition
+        sampled_indices = self.priorities.sample(size)
+        probs = self.priorities.get(sampled_indices) / self.priorities.total
+        weights = importance_weights(probs, size, self.is_beta)
         
-        # We can shuffle if needed
-        sampled_indices = np.random.choice(indices, size=size, p=probs, replace=True)
+        # Flatten (step, env) into one transition axis; a view, since each tick's rows are contiguous
+        packed = self.packed[:self.step].reshape(size, -1)
+        for start, batch in zip(range(0, size, batch_size), _batches(packed, self.columns, sampled_indices, weights, batch_size, device)):
+            yield batch + (sampled_indices[start:start + batch_size],)
+
+class RolloutStorage:
+    """
+    Joint rollout storage for every agent: one preallocated float32 array (agents, buffer_size, num_envs, row width)
+    in which buffers[agent] is a PriorityRolloutBuffer over the contiguous [agent] block.
+    add_batch writes a whole tick for all agents and parks with one slice assignment per field.
+    """
+    def __init__(self, agents: List[str], buffer_size: int, obs_dim: int, action_dim: int, num_envs: int = 1, **buffer_kwargs):
+        self.agents = list(agents)
+        self.num_envs = num_envs
+        self.columns = rollout_columns(obs_dim, action_dim)
+        self.data = np.zeros((len(self.agents), buffer_size, num_envs, self.columns["returns"].stop), dtype=np.float32)
+        self.buffers = {
+            a: PriorityRolloutBuffer(buffer_size, obs_dim, action_dim, num_envs=num_envs, data=self.data[i], **buffer_kwargs)
+            for i, a in enumerate(self.agents)
+        }
+        # (tick, env, agent, width) views of each field, the layout the vector env produces
+        self.views = {name: self.data[..., cols].transpose(1, 2, 0, 3) for name, cols in self.columns.items()}
+
+    def add_batch(self, obs: np.ndarray, actions: np.ndarray, rewards: np.ndarray, dones: np.ndarray, log_probs: np.ndarray, values: np.ndarray):
+        """Stores one tick for all parks and agents: obs (envs, agents, obs_dim), actions (envs, agents, action_dim), others (envs, agents)."""
+        step = None
+        for buffer in self.buffers.values():
+            step = buffer.claim_step()
+        v = self.views
+        v["observations"][step] = obs
+        v["actions"][step] = actions
+        v["rewards"][step, ..., 0] = rewards
+        v["dones"][step, ..., 0] = dones
+        v["log_probs"][step, ..., 0] = log_probs
+        v["values"][step, ..., 0] = values
+
+def pooled_generator(buffers: List["PriorityRolloutBuffer"], batch_size: int, device: torch.device):
+    """
+    Priority-weighted mini-batches drawn from the transitions of several agents' buffers at once
+    (for a shared actor). Yields the same tensors as get_generator plus the index of the source
+    buffer per sample; batch indices are flat positions within that buffer.
+    """
+    for b in buffers:
+        b.sync_priorities()
+    sizes = [b.step * b.num_envs for b in buffers]
+    total = sum(sizes)
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    
+    # Stratified draw over the buffers' combined priority mass: pick the owning tree, then descend it
+    masses = np.array([b.priorities.total for b in buffers])
+    bounds = np.cumsum(masses)
+    draws = np.random.permutation((np.arange(total) + np.random.random(total)) * (bounds[-1] / total))
+    sampled_owner = np.minimum(np.searchsorted(bounds, draws, side="right"), np.flatnonzero(masses)[-1])
+    sampled_local = np.empty(total, dtype=np.int64)
+    probs = np.empty(total)
+    for i, b in enumerate(buffers):
+        mask = sampled_owner == i
+        if mask.any():
+            sampled_local[mask] = b.priorities.find(draws[mask] - (bounds[i] - masses[i]))
+            probs[mask] = b.priorities.get(sampled_local[mask]) / bounds[-1]
+    sampled = offsets[sampled_owner] + sampled_local
+    weights = importance_weights(probs, total, buffers[0].is_beta)
+    
+    packed = torch.cat([b.packed[:b.step].reshape(-1, b.packed.shape[-1]) for b in buffers])
+    for start, batch in zip(range(0, total, batch_size), _batches(packed, buffers[0].columns, sampled, weights, batch_size, device)):
+        yield batch + (sampled_owner[start:start + batch_size], sampled_local[start:start + batch_size])
+
+class GlobalStateBuffer:
+    """
+    Per-tick global observations (buffer_size, num_envs, global_obs_dim) for the centralized critic.
+    Recorded once per tick for the whole park; value targets come from the agents' buffers after GAE.
+    """
+    def __init__(self, buffer_size: int, global_obs_dim: int, num_envs: int = 1):
+        self.buffer_size = buffer_size
+        self.global_obs_dim = global_obs_dim
+        self.num_envs = num_envs
+        self.data = np.zeros((buffer_size, num_envs, global_obs_dim), dtype=np.float32)
+        self.global_observations = torch.from_numpy(self.data)
+        self.step = 0
+
+    def reset(self):
+        self.step = 0
+
+    def add(self, global_obs: np.ndarray):
+        """Stores one tick: global_obs (num_envs, global_obs_dim)"""
+        if self.step >= self.buffer_size:
+            self.step = 0
+        self.data[self.step] = np.reshape(global_obs, (self.num_envs, self.global_obs_dim))
+        self.step += 1
+
+    def get_generator(self, agent_buffers: List["PriorityRolloutBuffer"], batch_size: int, device: torch.device):
+        """Shuffled mini-batches of (global_obs (B, global_obs_dim), returns (B, agents)) over every stored (tick, env)."""
+        size = self.step * self.num_envs
+        global_obs = self.global_observations[:self.step].reshape(size, self.global_obs_dim)
+        returns = torch.cat([b.returns[:self.step].reshape(size, 1) for b in agent_buffers], dim=1)
         
+        order = np.random.permutation(size)
         for start in range(0, size, batch_size):
-            end = start + batch_size
-            batch_indices = sampled_indices[start:end]
-            
-            yield (
-                self.observations[batch_indices].to(device),
-                self.actions[batch_indices].to(device),
-                self.values[batch_indices].to(device),
-                self.log_probs[batch_indices].to(device),
-                self.advantages[batch_indices].to(device),
-                self.returns[batch_indices].to(device),
-                batch_indices
-            )
+            batch = order[start:start + batch_size]
+            yield global_obs[batch].to(device), returns[batch].to(device)
+
+    @classmethod
+    def from_agent_buffers(cls, agent_buffers: List["PriorityRolloutBuffer"]) -> "GlobalStateBuffer":
+        """Global state rebuilt as the concatenated local observations, for callers that didn't record one."""
+        first = agent_buffers[0]
+        buffer = cls(first.buffer_size, first.obs_dim * len(agent_buffers), first.num_envs)
+        buffer.global_observations[:first.step] = torch.cat([b.observations[:first.step] for b in agent_buffers], dim=-1)
+        buffer.step = first.step
+        return buffer
@@ -0,0 +1,115 @@
+import glob
+import os
+import queue
+import threading
+import numpy as np
+import torch
+from typing import Any, Dict, List, Optional
+
+def cpu_copy(obj: Any) -> Any:
+    """Deep copy of a nested dict / list / tuple with every tensor detached and copied to the CPU."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: cpu_copy(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(cpu_copy(v) for v in obj)
+    return obj
+
+def rng_state() -> Dict:
+    """Global torch and NumPy RNG states (action sampling, minibatch order, prioritized draws) as tensors."""
+    np_state = np.random.get_state(legacy=False)
+    return {
+        "torch": torch.get_rng_state(),
+        "numpy": {
+            "key": torch.from_numpy(np_state["state"]["key"].astype(np.int64)),
+            "pos": np_state["state"]["pos"],
+            "has_gauss": np_state["has_gauss"],
+            "gauss": np_state["gauss"],
+        },
+    }
+
+def set_rng_state(state: Dict) -> None:
+    torch.set_rng_state(state["torch"])
+    np_state = state["numpy"]
+    np.random.set_state({
+        "bit_generator": "MT19937",
+        "state": {"key": np_state["key"].numpy().astype(np.uint32), "pos": np_state["pos"]},
+        "has_gauss": np_state["has_gauss"],
+        "gauss": np_state["gauss"],
+    })
+
+def blobs_to_tensors(blobs: List[bytes]) -> List[torch.Tensor]:
+    # uint8 tensors keep env snapshots loadable with weights_only and memory-mapped like the weights
+    return [torch.frombuffer(bytearray(blob), dtype=torch.uint8) for blob in blobs]
+
+def tensors_to_blobs(tensors: List[torch.Tensor]) -> List[bytes]:
+    return [t.numpy().tobytes() for t in tensors]
+
+def load_checkpoint_file(path: str, map_location=None) -> Dict:
+    """
+    Memory-mapped load: tensors are paged in from the file on first use instead of read up front,
+    so even large checkpoints open immediately.
+    """
+    return torch.load(path, map_location=map_location, mmap=True, weights_only=True)
+
+class AsyncCheckpointer:
+    """
+    Writes checkpoints on a background thread so training never waits on disk I/O.
+    save() only takes a CPU copy of the state (the live tensors keep changing) and queues it; the writer
+    thread serializes it to `<file>.tmp` and renames it into place, so a crash mid-write never leaves a
+    truncated checkpoint behind. After each write only the newest keep_last files matching `pattern`
+    are kept (keep_last=0 keeps everything). A failed write is re-raised by the next save() / wait().
+    """
+    def __init__(self, save_dir: str, keep_last: int = 3, pattern: str = "*.pt"):
+        self.save_dir = save_dir
+        self.keep_last = keep_last
+        self.pattern = pattern
+        os.makedirs(save_dir, exist_ok=True)
+
+        # Unbounded: snapshots are small next to a rollout, and a bounded queue would block the trainer
+        self._queue = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, state: Dict, filename: str) -> str:
+        """Queues state for writing to save_dir/filename and returns that path right away."""
+        self._raise_error()
+        path = os.path.join(self.save_dir, filename)
+        self._queue.put((cpu_copy(state), path))
+        return path
+
+    def wait(self) -> None:
+        """Blocks until every queued checkpoint is on disk."""
+        self._queue.join()
+        self._raise_error()
+
+    def latest(self) -> Optional[str]:
+        """Newest checkpoint file in save_dir matching pattern, or None."""
+        paths = self._checkpoints()
+        return paths[-1] if paths else None
+
+    def _checkpoints(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.save_dir, self.pattern)), key=os.path.getmtime)
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Background checkpoint write failed") from error
+
+    def _write_loop(self) -> None:
+        while True:
+            state, path = self._queue.get()
+            try:
+                tmp = path + ".tmp"
+                torch.save(state, tmp)
+                os.replace(tmp, path)
+                print(f"Saved: {path}")
+                if self.keep_last:
+                    for old in self._checkpoints()[:-self.keep_last]:
+                        os.remove(old)
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
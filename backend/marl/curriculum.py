@@ -0,0 +1,97 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+@dataclass
+class CurriculumStage:
+    """
+    One curriculum stage. disruption_prob and max_steps (episode length, None keeps the park's) are set
+    on every park when the stage starts. env_fn optionally swaps in a different vector env for the stage
+    (e.g. harsher capacities or cash); it should seed its parks for reproducible runs. Park size is not a
+    stage setting: actors, critic and rollout storage are sized by the agent roster, so env_fn must keep
+    the model's agents and the trainer's park count.
+    max_episodes is the stage's budget, min_episodes the least it runs before a plateau can end it.
+    """
+    name: str
+    disruption_prob: float = 0.0
+    max_steps: Optional[int] = None
+    env_fn: Optional[Callable] = None
+    max_episodes: int = 200
+    min_episodes: int = 1
+
+# Clean learning phase, mild complexity, full chaos testing
+DEFAULT_STAGES = [
+    CurriculumStage("clean", disruption_prob=0.0),
+    CurriculumStage("mild", disruption_prob=0.05),
+    CurriculumStage("chaos", disruption_prob=0.15),
+]
+
+class CurriculumScheduler:
+    """
+    Plateau-based curriculum over `stages`. Every eval_every episodes the trainer runs eval_episodes
+    deterministic evaluation episodes and report()s their mean return. The stage has plateaued once the
+    rolling mean of the last `window` returns has failed to beat its best value by min_delta (relative to
+    that best's magnitude) for `patience` evaluations in a row: the trainer then advances, or, in the last
+    stage with early_stop, stops. patience=None disables evaluation, so every stage runs max_episodes.
+    """
+    def __init__(self,
+                 stages: Optional[List[CurriculumStage]] = None,
+                 window: int = 5,
+                 patience: Optional[int] = 3,
+                 min_delta: float = 0.01,
+                 eval_every: int = 5,
+                 eval_episodes: int = 1,
+                 early_stop: bool = True):
+        self.stages = stages if stages is not None else list(DEFAULT_STAGES)
+        self.window = window
+        self.patience = patience
+        self.min_delta = min_delta
+        self.eval_every = eval_every
+        self.eval_episodes = eval_episodes
+        self.early_stop = early_stop
+        self.start_stage()
+
+    @classmethod
+    def fixed(cls, episodes_per_stage: List[int]) -> "CurriculumScheduler":
+        """The original fixed schedule: DEFAULT_STAGES' disruption levels (the last repeated) with fixed budgets."""
+        stages = [
+            CurriculumStage(DEFAULT_STAGES[min(i, len(DEFAULT_STAGES) - 1)].name,
+                            DEFAULT_STAGES[min(i, len(DEFAULT_STAGES) - 1)].disruption_prob, max_episodes=n)
+            for i, n in enumerate(episodes_per_stage)
+        ]
+        return cls(stages, patience=None)
+
+    @property
+    def adaptive(self) -> bool:
+        return self.patience is not None
+
+    def start_stage(self) -> None:
+        """Forgets the previous stage's returns; harder stages score on a different scale."""
+        self.returns: List[float] = []
+        self.best: Optional[float] = None
+        self.stale = 0
+
+    def report(self, eval_return: float) -> bool:
+        """Records one evaluation return; True once the current stage has plateaued."""
+        self.returns.append(float(eval_return))
+        if len(self.returns) < self.window:
+            return False
+        rolling = float(np.mean(self.returns[-self.window:]))
+        if self.best is None or rolling > self.best + self.min_delta * max(abs(self.best), 1e-8):
+            self.best = rolling
+            self.stale = 0
+        else:
+            self.stale += 1
+        return self.stale >= self.patience
+
+    @property
+    def rolling_return(self) -> Optional[float]:
+        return float(np.mean(self.returns[-self.window:])) if self.returns else None
+
+    def state_dict(self) -> Dict:
+        return {"returns": list(self.returns), "best": self.best, "stale": self.stale}
+
+    def load_state_dict(self, state: Dict) -> None:
+        self.returns = list(state["returns"])
+        self.best = state["best"]
+        self.stale = state["stale"]
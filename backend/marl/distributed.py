@@ -0,0 +1,177 @@
+"""
+Data-parallel MARL training on CPU with torch.distributed (gloo).
+
+Every rank runs its own parks and collects its own rollouts; gradients of the actors and the critic are
+averaged across ranks before each optimizer step, so all ranks keep identical weights. Only rank 0 writes
+checkpoints.
+
+Local run (several processes on one machine), from backend/:
+    python -m marl.distributed --world-size 4 --agents 10 --parks 2 --episodes 5 5 5
+Multi-node: start one process per rank with torchrun (or set RANK / WORLD_SIZE / MASTER_ADDR / MASTER_PORT)
+and pass --world-size 0 so the process group is taken from the environment.
+"""
+import argparse
+import functools
+import os
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from typing import Callable, Dict, List, Optional
+
+from simulation.environment import IndustrialParkEnv
+from simulation.scenarios import generate_industrial_park
+from simulation.vector_env import VectorIndustrialParkEnv
+from marl.mappo import TransformerMAPPO
+from marl.trainer import MARLTrainer
+
+def init_process_group(rank: Optional[int] = None, world_size: Optional[int] = None,
+                       master_addr: str = "127.0.0.1", master_port: int = 29500, backend: str = "gloo") -> None:
+    """Joins the process group; without rank / world_size everything comes from the env:// variables."""
+    if rank is None:
+        dist.init_process_group(backend, init_method="env://")
+    else:
+        dist.init_process_group(backend, init_method=f"tcp://{master_addr}:{master_port}", rank=rank, world_size=world_size)
+
+def seed_rank(seed: Optional[int], rank: int) -> None:
+    """Independent NumPy / torch global streams per rank (action sampling, prioritized minibatches)."""
+    if seed is None:
+        return
+    state = np.random.SeedSequence(seed, spawn_key=(rank,)).generate_state(2)
+    np.random.seed(int(state[0]))
+    torch.manual_seed(int(state[1]))
+
+def allreduce_gradients(params: List[torch.nn.Parameter]) -> None:
+    """Averages the gradients of params over all ranks with one all-reduce of a flat buffer."""
+    grads = [p.grad if p.grad is not None else torch.zeros_like(p) for p in params]
+    flat = torch.cat([g.reshape(-1) for g in grads])
+    dist.all_reduce(flat)
+    flat /= dist.get_world_size()
+    offset = 0
+    for p, g in zip(params, grads):
+        n = g.numel()
+        if p.grad is None:
+            p.grad = g
+        p.grad.copy_(flat[offset:offset + n].view_as(g))
+        offset += n
+
+def broadcast_parameters(model: TransformerMAPPO, src: int = 0) -> None:
+    """Copies rank src's actor and critic weights to every rank, so all start from the same policy."""
+    with torch.no_grad():
+        for p in model.actor_parameters() + list(model.critic.parameters()):
+            dist.broadcast(p.data, src)
+    model.invalidate_stacked_actors()
+
+def rank_env(env_fn: Callable[[], IndustrialParkEnv], parks_per_rank: int, rank: int) -> VectorIndustrialParkEnv:
+    """This rank's share of the parks; park_offset keeps per-park seeds distinct across ranks."""
+    return VectorIndustrialParkEnv([env_fn] * parks_per_rank, park_offset=rank * parks_per_rank)
+
+class DistributedMARLTrainer(MARLTrainer):
+    """
+    MARLTrainer for one rank of a data-parallel run. The process group must already be initialized.
+    Each rank collects rollouts from its own parks (seeded from seed and the rank), gradients are
+    all-reduced inside model.update through model.grad_sync, and only rank 0 writes checkpoints.
+    All ranks must use the same buffer_size / batch_size / ppo_epochs and park count so their
+    minibatch loops stay in lockstep. Checkpoints hold every rank's RNG state and park snapshots, so a
+    resumed run with the same world size continues each rank's own streams; otherwise the ranks reseed.
+    save_checkpoint gathers across ranks, so every rank must call it.
+    """
+    def __init__(self, env: VectorIndustrialParkEnv, model: TransformerMAPPO, seed: Optional[int] = None, **kwargs):
+        self.rank = dist.get_rank()
+        self.world_size = dist.get_world_size()
+        # Every rank logs its own throughput and losses, to metrics_file with the rank before the extension
+        if kwargs.get("metrics_file"):
+            root, ext = os.path.splitext(kwargs["metrics_file"])
+            kwargs["metrics_file"] = f"{root}_rank{self.rank}{ext}"
+        super().__init__(env, model, **kwargs)
+
+        self.seed = seed
+        seed_rank(seed, self.rank)
+        if seed is not None:
+            # Seeds every park's streams once; later resets continue them
+            self.env.reset(seed=seed)
+        broadcast_parameters(model)
+        model.grad_sync = allreduce_gradients
+
+    def evaluate(self, episodes: int = 1) -> float:
+        # Mean over all ranks' parks, so every rank takes the same curriculum decisions and stays in lockstep
+        score = torch.tensor([super().evaluate(episodes)], dtype=torch.float64)
+        dist.all_reduce(score)
+        return float(score) / self.world_size
+
+    def checkpoint_state(self) -> Dict:
+        # Rank 0's streams stay at the top level, so a single-process MARLTrainer can load the file too
+        state = super().checkpoint_state()
+        ranks = [None] * self.world_size
+        dist.all_gather_object(ranks, self.stream_state())
+        state["ranks"] = ranks
+        return state
+
+    def save_checkpoint(self, filename: str):
+        state = self.checkpoint_state()
+        if self.rank == 0:
+            return self.checkpointer.save(state, filename)
+
+    def load_stream_state(self, state_dicts: Dict) -> Optional[List[bytes]]:
+        ranks = state_dicts.get("ranks")
+        if ranks is not None and len(ranks) == self.world_size:
+            return super().load_stream_state(ranks[self.rank])
+        # Saved by a different world size (or a single process): restoring rank 0's streams on every rank
+        # would make all ranks collect identical rollouts, so each reseeds its own instead
+        seed_rank(self.seed, self.rank)
+        self.env.reset(seed=self.seed)
+        return None
+
+def _train_rank(rank: int, world_size: int, args: argparse.Namespace) -> None:
+    if world_size > 0:
+        init_process_group(rank, world_size, master_port=args.port)
+    else:
+        init_process_group()
+        rank, world_size = dist.get_rank(), dist.get_world_size()
+    # Ranks share the machine; one intra-op thread each avoids oversubscription
+    torch.set_num_threads(args.threads)
+    try:
+        env_fn = functools.partial(generate_industrial_park, args.agents, seed=args.seed)
+        env = rank_env(env_fn, args.parks, rank)
+        obs_dim = env.obs_dim
+        model = TransformerMAPPO(env.possible_agents, obs_dim, obs_dim * env.num_agents, env.action_dim, share_actor=args.share_actor)
+        trainer = DistributedMARLTrainer(env, model, seed=args.seed, buffer_size=args.buffer_size,
+                                         batch_size=args.batch_size, ppo_epochs=args.ppo_epochs, save_dir=args.save_dir,
+                                         metrics_file=args.metrics_file)
+        trainer.train(args.episodes)
+
+        # Weights must agree exactly across ranks after data-parallel updates
+        with torch.no_grad():
+            checksum = torch.stack([p.double().sum() for p in model.actor_parameters()]).sum().reshape(1)
+        gathered = [torch.zeros_like(checksum) for _ in range(world_size)]
+        dist.all_gather(gathered, checksum)
+        if rank == 0:
+            print(f"Actor weight checksums per rank: {[round(float(c), 6) for c in gathered]}")
+    finally:
+        dist.destroy_process_group()
+
+def launch(fn: Callable, world_size: int, *args) -> None:
+    """Runs fn(rank, world_size, *args) in world_size local processes."""
+    mp.spawn(fn, args=(world_size,) + args, nprocs=world_size, join=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--world-size", type=int, default=2, help="local processes to spawn; 0 = take the group from env://")
+    parser.add_argument("--port", type=int, default=29500)
+    parser.add_argument("--agents", type=int, default=10)
+    parser.add_argument("--parks", type=int, default=2, help="parks per rank")
+    parser.add_argument("--episodes", type=int, nargs="+", default=[5, 5, 5], help="episodes per curriculum stage")
+    parser.add_argument("--buffer-size", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--ppo-epochs", type=int, default=4)
+    parser.add_argument("--share-actor", action="store_true")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-dir", default="checkpoints")
+    parser.add_argument("--metrics-file", default=None, help="JSONL training metrics under --save-dir, one file per rank")
+    args = parser.parse_args()
+
+    if args.world_size > 0:
+        launch(_train_rank, args.world_size, args)
+    else:
+        _train_rank(int(os.environ["RANK"]), 0, args)
@@ -0,0 +1,200 @@
+import argparse
+import copy
+import json
+import os
+import numpy as np
+import torch
+import torch.nn as nn
+from typing import Dict, Optional
+
+from marl.mappo import TransformerMAPPO
+from marl.networks import StackedActors, TransformerEncoder
+
+EXPORT_FORMATS = ("torchscript", "onnx")
+
+def _require_onnx() -> None:
+    # ONNX export / serving are optional; torch alone covers the TorchScript path
+    try:
+        import onnx # noqa: F401
+        import onnxruntime # noqa: F401
+    except ImportError as e:
+        raise ImportError("ONNX policy export needs onnx and onnxruntime (pip install onnx onnxruntime)") from e
+
+class StackedPolicy(nn.Module):
+    """Deterministic policy of per-agent actors: every actor in one eval-mode StackedActors pass."""
+    def __init__(self, model: TransformerMAPPO):
+        super().__init__()
+        actors = [copy.deepcopy(model.actors[a]).eval() for a in model.agents]
+        self.stacked = StackedActors(actors)
+
+    def forward(self, obs):
+        # obs: (parks, agents, obs_dim) -> mean actions (parks, agents, action_dim)
+        mean, _ = self.stacked(obs.transpose(0, 1))
+        return mean.transpose(0, 1)
+
+class PerAgentPolicy(nn.Module):
+    """Deterministic policy of per-agent actors kept as separate modules (so their Linear layers can be quantized)."""
+    def __init__(self, model: TransformerMAPPO):
+        super().__init__()
+        self.actors = nn.ModuleList([copy.deepcopy(model.actors[a]) for a in model.agents])
+
+    def forward(self, obs):
+        return torch.stack([actor(obs[:, i])[0] for i, actor in enumerate(self.actors)], dim=1)
+
+class SharedPolicy(nn.Module):
+    """Deterministic policy of a SharedActorNetwork over every (park, agent) pair at once."""
+    def __init__(self, model: TransformerMAPPO):
+        super().__init__()
+        self.shared_actor = copy.deepcopy(model.shared_actor)
+        self.register_buffer("agent_ids", model.agent_ids.clone())
+        self.register_buffer("agent_types", model.agent_types.clone())
+
+    def forward(self, obs):
+        parks, agents, obs_dim = obs.shape
+        ids = self.agent_ids.expand(parks, agents).reshape(-1)
+        mean, _ = self.shared_actor(obs.reshape(parks * agents, obs_dim), ids, self.agent_types[ids])
+        return mean.reshape(parks, agents, -1)
+
+def build_inference_policy(model: TransformerMAPPO, quantize: bool = False) -> nn.Module:
+    """
+    Inference-only copy of the model's actors: eval mode (no dropout), no autograd, deterministic
+    (mean) actions for (parks, agents, obs_dim) observations. quantize applies dynamic int8 quantization
+    to the Linear layers; per-agent actors are then kept as separate modules instead of stacked.
+    """
+    if model.share_actor:
+        policy = SharedPolicy(model)
+    elif quantize:
+        policy = PerAgentPolicy(model)
+    else:
+        policy = StackedPolicy(model)
+    policy.eval()
+    for p in policy.parameters():
+        p.requires_grad_(False)
+    if quantize:
+        policy = torch.ao.quantization.quantize_dynamic(policy, {nn.Linear}, dtype=torch.qint8)
+    return policy
+
+def export_policy(model: TransformerMAPPO, path: str, file_format: str = "torchscript", quantize: bool = False) -> str:
+    """
+    Writes the model's actors as an inference-only artifact at path, plus `path + ".json"` metadata for load_policy.
+    - "torchscript": traced and frozen TorchScript module; quantize uses torch dynamic int8 quantization
+    - "onnx": ONNX graph with a dynamic park axis; quantize runs onnxruntime's dynamic int8 quantization on it
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown policy export format {file_format!r}, expected one of {list(EXPORT_FORMATS)}")
+    obs_dim = model.obs_dim
+    example = torch.zeros(1, len(model.agents), obs_dim)
+
+    if file_format == "torchscript":
+        policy = build_inference_policy(model, quantize)
+        with torch.no_grad():
+            traced = torch.jit.freeze(torch.jit.trace(policy, example))
+        traced.save(path)
+    else:
+        _require_onnx()
+        policy = build_inference_policy(model)
+        for module in policy.modules():
+            # The explicit attention path lowers to plain ONNX ops; the fused MHA kernel has no ONNX export
+            if isinstance(module, TransformerEncoder):
+                module.capture_attention = True
+        target = path + ".fp32" if quantize else path
+        torch.onnx.export(policy, (example,), target, input_names=["obs"], output_names=["actions"],
+                          dynamic_axes={"obs": {0: "parks"}, "actions": {0: "parks"}}, dynamo=False)
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(target, path, weight_type=QuantType.QInt8)
+            os.remove(target)
+
+    meta = {
+        "format": file_format,
+        "agents": list(model.agents),
+        "obs_dim": obs_dim,
+        "action_dim": model.action_dim,
+        "quantized": quantize,
+    }
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return path
+
+class ExportedPolicy:
+    """
+    Serving stand-in for TransformerMAPPO loaded from an export_policy artifact. Only the action path
+    exists: actions are the deterministic policy means, there are no log-probs, values or attention maps.
+    """
+    def __init__(self, path: str, num_threads: Optional[int] = None):
+        with open(path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.path = path
+        self.format = meta["format"]
+        self.agents = meta["agents"]
+        self.obs_dim = meta["obs_dim"]
+        self.action_dim = meta["action_dim"]
+        self.quantized = meta["quantized"]
+
+        if self.format == "torchscript":
+            self.module = torch.jit.load(path)
+            self._run = self._run_torchscript
+        else:
+            _require_onnx()
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+            self._run = lambda obs: self.session.run(None, {"obs": obs})[0]
+
+    def _run_torchscript(self, obs: np.ndarray) -> np.ndarray:
+        with torch.inference_mode():
+            return self.module(torch.from_numpy(obs)).numpy()
+
+    def get_actions_batch(self, obs: np.ndarray, deterministic: bool = True):
+        """Same call shape as TransformerMAPPO.get_actions_batch; log_probs and values are None."""
+        actions = self._run(np.ascontiguousarray(obs, dtype=np.float32))
+        return actions, None, None
+
+    def get_actions(self, obs_dict: Dict[str, np.ndarray], deterministic: bool = True):
+        obs = np.stack([obs_dict[a] for a in self.agents])[None]
+        actions, _, _ = self.get_actions_batch(obs)
+        return {a: actions[0, i] for i, a in enumerate(self.agents)}, None, None
+
+    def get_attention_weights(self, obs_dict: Optional[Dict[str, np.ndarray]] = None, env_index: int = 0):
+        # Exported graphs carry no attention capture
+        return {}
+
+def load_policy(path: str, num_threads: Optional[int] = None) -> ExportedPolicy:
+    return ExportedPolicy(path, num_threads)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a training checkpoint's actors for serving (set SYMBIOS_POLICY_PATH to the output)")
+    parser.add_argument("checkpoint", help="file written by MARLTrainer.save_checkpoint")
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="torchscript")
+    parser.add_argument("--quantize", action="store_true", help="dynamic int8 Linear weights")
+    parser.add_argument("--num-factories", type=int, default=None,
+                        help="park the checkpoint was trained on: generate_industrial_park(N, seed=--seed) instead of the Guindy preset")
+    parser.add_argument("--seed", type=int, default=None, help="generator seed of the --num-factories park")
+    args = parser.parse_args()
+
+    from marl.checkpoint import load_checkpoint_file
+    from simulation.scenarios import generate_industrial_park, setup_guindy_industrial_park
+    if args.num_factories is not None:
+        env = generate_industrial_park(args.num_factories, seed=args.seed)
+    else:
+        env = setup_guindy_industrial_park()
+    obs_dim = env.observation_space(env.possible_agents[0]).shape[0]
+    action_dim = env.action_space(env.possible_agents[0]).shape[0]
+
+    state_dicts = load_checkpoint_file(args.checkpoint, map_location="cpu")
+    share_actor = "shared_actor" in state_dicts
+    if share_actor:
+        trained_agents = state_dicts["shared_actor"]["agent_embedding.weight"].shape[0]
+        if trained_agents != len(env.possible_agents):
+            parser.error(f"checkpoint's shared actor has {trained_agents} agents, the park has {len(env.possible_agents)}; "
+                         "pass the training park's --num-factories / --seed")
+    elif list(state_dicts["actors"]) != env.possible_agents:
+        parser.error(f"checkpoint actors {list(state_dicts['actors'])[:3]}... don't match the park's agents "
+                     f"{env.possible_agents[:3]}...; pass the training park's --num-factories / --seed")
+
+    model = TransformerMAPPO(env.possible_agents, obs_dim, obs_dim * len(env.possible_agents), action_dim, share_actor=share_actor)
+    model.load_actor_state_dict(state_dicts)
+    print(f"Exported: {export_policy(model, args.output, args.format, args.quantize)}")
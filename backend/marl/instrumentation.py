@@ -0,0 +1,87 @@
+import contextlib
+import json
+import os
+import time
+import torch
+from typing import Dict, Optional
+
+class PhaseTimer:
+    """
+    Accumulates wall time per named phase of a training iteration. Each phase is also a
+    torch.profiler.record_function range, so profiler traces show the same breakdown.
+    """
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        with torch.profiler.record_function(name):
+            yield
+        self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+
+    def pop(self) -> Dict[str, float]:
+        """Milliseconds per phase since the last pop()"""
+        totals = {name: seconds * 1000.0 for name, seconds in self.totals.items()}
+        self.totals = {}
+        return totals
+
+class MetricsWriter:
+    """Appends one JSON object per line to path, flushed per record so the file can be tailed while training runs."""
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict) -> None:
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+class ProfilerWindow:
+    """
+    torch.profiler over a window of training iterations. trigger(n) arms it; the next begin() starts
+    profiling CPU (and CUDA, when available) activity, and after n iterations the window closes and a
+    Chrome trace (chrome://tracing, Perfetto) is written to trace_dir. Every op becomes an event held
+    in memory until the window closes (a full PPO iteration easily reaches a million), so keep windows short.
+    """
+    def __init__(self, trace_dir: str):
+        self.trace_dir = trace_dir
+        self.pending = 0
+        self.remaining = 0
+        self.profiler: Optional[torch.profiler.profile] = None
+        self.first_iteration = 0
+
+    def trigger(self, iterations: int) -> None:
+        self.pending = iterations
+
+    def begin(self, iteration: int) -> None:
+        if self.profiler is not None or not self.pending:
+            return
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        self.profiler = torch.profiler.profile(activities=activities, record_shapes=False)
+        self.profiler.__enter__()
+        self.remaining, self.pending = self.pending, 0
+        self.first_iteration = iteration
+
+    def end(self, iteration: int, final: bool = False) -> Optional[str]:
+        """
+        Closes the window after its last iteration (or on the run's final one, with final);
+        returns the trace path when one was written.
+        """
+        if self.profiler is None:
+            return None
+        self.profiler.step()
+        self.remaining -= 1
+        if self.remaining > 0 and not final:
+            return None
+        self.profiler.__exit__(None, None, None)
+        os.makedirs(self.trace_dir, exist_ok=True)
+        path = os.path.join(self.trace_dir, f"trace_iter_{self.first_iteration}-{iteration}.json")
+        self.profiler.export_chrome_trace(path)
+        self.profiler = None
+        return path
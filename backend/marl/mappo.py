@@ -1,11 +1,28 @@
+import contextlib
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
 import numpy as np
 
-from marl.networks import ActorNetwork, CriticNetwork
-from marl.buffer import PriorityRolloutBuffer
+from marl.networks import ActorNetwork, CriticNetwork, AgentTokenCritic, StackedActors, SharedActorNetwork, AgentActorView
+from marl.buffer import PriorityRolloutBuffer, GlobalStateBuffer, pooled_generator
+
+def bf16_supported() -> bool:
+    """Whether this CPU has native bfloat16 matmul support (AVX512-BF16 / AMX) for oneDNN"""
+    check = getattr(torch.ops.mkldnn, "_is_mkldnn_bf16_supported", None)
+    return bool(check()) if check is not None else False
+
+def _fused(optimizer: optim.Optimizer) -> optim.Optimizer:
+    """Same optimizer and state, rebuilt with the fused implementation"""
+    groups = [{"params": group["params"]} for group in optimizer.param_groups]
+    fused = type(optimizer)(groups, **{**optimizer.defaults, "foreach": None, "fused": True})
+    fused.load_state_dict(optimizer.state_dict())
+    # load_state_dict restores the saved group options, including the old fused flag
+    for group in fused.param_groups:
+        group["foreach"], group["fused"] = None, True
+    return fused
 
 class TransformerMAPPO:
     def __init__(self, 
@@ -19,21 +36,47 @@ class TransformerMAPPO:
                  entropy_coef: float = 0.01,
                  entropy_decay: float = 0.999,
                  max_grad_norm: float = 0.5,
-                 device: str = "cpu"):
+                 device: str = "cpu",
+                 share_actor: bool = False,
+                 agent_types: Optional[List[int]] = None,
+                 critic_type: str = "flat",
+                 critic_attention: str = "full"):
         
         self.device = torch.device(device)
         self.agents = agents
+        self.obs_dim = obs_dim
+        self.action_dim = action_dim
         
         # MAPPO Framework: Decentralized Actors, Centralized Critic
-        # Each agent has its own policy, but shares the global value function estimator
-        self.actors = {
-            a: ActorNetwork(obs_dim, action_dim).to(self.device) for a in agents
-        }
-        self.critic = CriticNetwork(global_obs_dim).to(self.device)
-        
-        self.actor_optimizers = {
-            a: optim.Adam(self.actors[a].parameters(), lr=lr_actor) for a in agents
-        }
+        # Each agent has its own policy, but shares the global value function estimator.
+        # With share_actor, one SharedActorNetwork serves every agent, conditioned on agent / factory type
+        # embeddings (agent_types: per-agent type codes, e.g. ParkState.agent_type), so memory no longer
+        # grows with park size and all agents train together on pooled minibatches.
+        self.share_actor = share_actor
+        if share_actor:
+            types = agent_types if agent_types is not None else [0] * len(agents)
+            self.shared_actor = SharedActorNetwork(obs_dim, action_dim, num_agents=len(agents)).to(self.device)
+            self.shared_actor_optimizer = optim.Adam(self.shared_actor.parameters(), lr=lr_actor)
+            self.agent_ids = torch.arange(len(agents), device=self.device)
+            self.agent_types = torch.as_tensor(np.asarray(types), dtype=torch.long, device=self.device)
+            self.actors = {a: AgentActorView(self.shared_actor, i, int(types[i])) for i, a in enumerate(agents)}
+            self.actor_optimizers = {}
+        else:
+            self.actors = {
+                a: ActorNetwork(obs_dim, action_dim).to(self.device) for a in agents
+            }
+            self.actor_optimizers = {
+                a: optim.Adam(self.actors[a].parameters(), lr=lr_actor) for a in agents
+            }
+        # "flat": one projection of the concatenated global observation (input grows with park size);
+        # "tokens": AgentTokenCritic, attention across per-agent tokens ("full", "local" or "clustered"),
+        # whose weights don't depend on the number of agents
+        if critic_type == "tokens":
+            self.critic = AgentTokenCritic(obs_dim, attention=critic_attention).to(self.device)
+        elif critic_type == "flat":
+            self.critic = CriticNetwork(global_obs_dim).to(self.device)
+        else:
+            raise ValueError(f"Unknown critic_type {critic_type!r}, expected 'flat' or 'tokens'")
         self.critic_optimizer = optim.Adam(self.critic.parameters(), lr=lr_critic)
         
         self.clip_epsilon = clip_epsilon
@@ -41,47 +84,290 @@ class TransformerMAPPO:
         self.entropy_decay = entropy_decay
         self.max_grad_norm = max_grad_norm
         
-    def get_actions(self, obs_dict: Dict[str, np.ndarray], deterministic: bool = False):
-        """Used during interaction with the environment"""
-        actions = {}
-        log_probs = {}
-        values = {}
+        # Stacked copy of every actor for batched inference, rebuilt on next use once marked dirty
+        # (optimizer steps, weight loads, train()/eval() and invalidate_stacked_actors())
+        self._stacked_actors = None
+        self._stacked_dirty = True
+        
+        # Optional hook run on each module's parameters between backward() and the optimizer step,
+        # e.g. the gradient all-reduce of data-parallel training (marl.distributed)
+        self.grad_sync: Optional[Callable[[List[nn.Parameter]], None]] = None
+        
+        # See enable_performance_mode; update_steps counts optimizer steps for per-step timings
+        self.performance_mode = False
+        self.autocast_dtype: Optional[torch.dtype] = None
+        # Compiled wrappers of the eager modules (which keep owning the parameters), used by the update loops
+        self._compiled: Dict[nn.Module, nn.Module] = {}
+        self.update_steps = 0
+        
+        # Training statistics of the latest update() (see update_stats) and actor samples consumed so far
+        self._stats: Dict[str, tuple] = {}
+        self.samples_seen = 0
         
-        # Centralized State for Critic (Concatenated local observations)
-        # Assuming standard MAPPO where global state is concatenation of local states
-        global_obs = np.concatenate([obs_dict[a] for a in self.agents])
-        global_obs_tensor = torch.tensor(global_obs, dtype=torch.float32).unsqueeze(0).to(self.device)
+        # Actor attention maps from the latest get_actions / get_actions_batch call
+        self._attention_cache: Optional[List[torch.Tensor]] = None
+        
+    def get_actions(self, obs_dict: Dict[str, np.ndarray], deterministic: bool = False):
+        """
+        Used during interaction with the environment; dict wrapper over get_actions_batch.
+        Only agents present in obs_dict get actions; finished agents' rows are zero-filled for the
+        batched pass (the critic input keeps its fixed width) and dropped from the result.
+        """
+        present = [(i, a) for i, a in enumerate(self.agents) if a in obs_dict]
+        if not present:
+            return {}, {}, {}
+        first = obs_dict[present[0][1]]
+        obs = np.zeros((1, len(self.agents), *np.shape(first)), dtype=np.float32)
+        for i, a in present:
+            obs[0, i] = obs_dict[a]
+        actions, log_probs, values = self.get_actions_batch(obs, deterministic)
+        return (
+            {a: actions[0, i] for i, a in present},
+            {a: float(log_probs[0, i]) for i, a in present},
+            {a: float(values[0, i]) for i, a in present},
+        )
+
+    def get_actions_batch(self, obs: np.ndarray, deterministic: bool = False):
+        """
+        Batched interaction path for vectorized envs.
+        obs: (num_envs, num_agents, obs_dim) in `self.agents` order.
+        Returns actions (num_envs, num_agents, action_dim), log_probs and values (num_envs, num_agents).
+        All actors run in one stacked forward pass over every agent of every park.
+        """
+        obs_t = torch.as_tensor(obs, dtype=torch.float32, device=self.device)
+        num_envs, num_agents, _ = obs_t.shape
         
         with torch.no_grad():
-            global_value = self.critic(global_obs_tensor).squeeze().item()
-            
-            for agent in self.agents:
-                if agent not in obs_dict:
-                    continue # Agent died/finished
-                    
-                obs_t = torch.tensor(obs_dict[agent], dtype=torch.float32).unsqueeze(0).to(self.device)
-                mean, std = self.actors[agent](obs_t)
+            dist, global_values = self._policy(obs_t, capture_attention=True)
+            actions = dist.mean if deterministic else dist.sample()
+            log_probs = dist.log_prob(actions).sum(dim=-1)
                 
-                dist = torch.distributions.Normal(mean, std)
-                
-                if deterministic:
-                    action = mean
-                else:
-                    action = dist.sample()
-                
-                # Squeeze to get 1D vectors
-                action = action.squeeze(0)
-                
-                actions[agent] = action.cpu().numpy()
-                log_probs[agent] = dist.log_prob(action).sum(dim=-1).item()
-                values[agent] = global_value # Store global value per agent for buffer tracking
+        return (
+            actions.cpu().numpy(),
+            log_probs.cpu().numpy(),
+            global_values.expand(num_envs, num_agents).cpu().numpy(),
+        )
+
+    def act_batch(self, obs: np.ndarray, deterministic: bool = False):
+        """
+        Actor-only get_actions_batch, skipping the critic: actions (num_envs, num_agents, action_dim) and
+        log_probs (num_envs, num_agents). For rollout workers whose values would be recomputed by the learner.
+        """
+        obs_t = torch.as_tensor(obs, dtype=torch.float32, device=self.device)
+        with torch.no_grad():
+            dist = self._actor_distribution(obs_t)
+            actions = dist.mean if deterministic else dist.sample()
+            log_probs = dist.log_prob(actions).sum(dim=-1)
+        return actions.cpu().numpy(), log_probs.cpu().numpy()
+
+    def evaluate_actions_batch(self, obs: np.ndarray, actions: np.ndarray):
+        """
+        Log-probabilities of given actions under the current policy, for off-policy corrections.
+        obs: (num_envs, num_agents, obs_dim), actions: (num_envs, num_agents, action_dim).
+        Returns log_probs and values (num_envs, num_agents) as tensors.
+        """
+        obs_t = torch.as_tensor(obs, dtype=torch.float32, device=self.device)
+        actions_t = torch.as_tensor(actions, dtype=torch.float32, device=self.device)
+        with torch.no_grad():
+            dist, global_values = self._policy(obs_t)
+            log_probs = dist.log_prob(actions_t).sum(dim=-1)
+        return log_probs, global_values.expand_as(log_probs)
+
+    def _policy(self, obs_t: torch.Tensor, capture_attention: bool = False):
+        """
+        Action distribution (num_envs, num_agents, action_dim) and critic values (num_envs, 1).
+        With capture_attention the actors' per-layer attention maps from this same forward are cached
+        as (num_envs, num_agents, heads, seq, seq) tensors for get_attention_weights.
+        """
+        num_envs = obs_t.shape[0]
+        
+        # Centralized critic sees the concatenated local observations of each park
+        global_values = self.critic(obs_t.reshape(num_envs, -1)).reshape(num_envs, 1)
+        return self._actor_distribution(obs_t, capture_attention), global_values
+
+    def _actor_distribution(self, obs_t: torch.Tensor, capture_attention: bool = False):
+        """Action distribution (num_envs, num_agents, action_dim) of the actors alone; see _policy."""
+        num_envs, num_agents, _ = obs_t.shape
+        
+        if self.share_actor:
+            # One forward over every (park, agent) pair
+            ids = self.agent_ids.expand(num_envs, num_agents).reshape(-1)
+            encoder = self.shared_actor.actor.encoder
+            encoder.capture_attention = capture_attention
+            try:
+                mean, std = self.shared_actor(obs_t.reshape(num_envs * num_agents, -1), ids, self.agent_types[ids])
+            finally:
+                encoder.capture_attention = False
+            mean, std = mean.reshape(num_envs, num_agents, -1), std.reshape(num_envs, num_agents, -1)
+            if capture_attention:
+                self._attention_cache = [w.reshape(num_envs, num_agents, *w.shape[1:]) for w in encoder.get_attention_weights()]
+        else:
+            stacked = self.stacked_actors()
+            stacked.capture_attention = capture_attention
+            mean, std = stacked(obs_t.transpose(0, 1))
+            stacked.capture_attention = False
+            mean, std = mean.transpose(0, 1), std.transpose(0, 1)
+            if capture_attention:
+                self._attention_cache = [w.transpose(0, 1) for w in stacked.attention_weights]
+        return torch.distributions.Normal(mean, std)
+
+    def stacked_actors(self) -> StackedActors:
+        """Every actor's parameters stacked for batched inference; rebuilt after optimizer steps or checkpoint loads."""
+        if self._stacked_dirty:
+            self._stacked_actors = StackedActors([self.actors[a] for a in self.agents])
+            self._stacked_dirty = False
+        return self._stacked_actors
+
+    def invalidate_stacked_actors(self) -> None:
+        """Marks the stacked inference copy stale; call after changing actor weights outside this class."""
+        self._stacked_dirty = True
+
+    def train(self, mode: bool = True) -> "TransformerMAPPO":
+        """Sets the actors' and the critic's train / eval mode (dropout in the stacked inference pass follows it)."""
+        modules = [self.shared_actor] if self.share_actor else [self.actors[a] for a in self.agents]
+        for module in modules + [self.critic]:
+            module.train(mode)
+        self._stacked_dirty = True
+        return self
+
+    def eval(self) -> "TransformerMAPPO":
+        return self.train(False)
+
+    def _actor_loss(self, mean, std, b_actions, b_old_log_probs, b_advs, b_weights):
+        """Clipped surrogate PPO objective with entropy bonus, importance-weighted against prioritized sampling"""
+        # Normalize advantages
+        b_advs = (b_advs - b_advs.mean()) / (b_advs.std() + 1e-8)
+        
+        dist = torch.distributions.Normal(mean.float(), std.float())
+        log_probs = dist.log_prob(b_actions).sum(dim=-1, keepdim=True)
+        entropy = dist.entropy().mean()
+        
+        # Ratio
+        ratio = torch.exp(log_probs - b_old_log_probs)
+        
+        # Actor Loss (Clipped Surrogate Objective)
+        surr1 = ratio * b_advs
+        surr2 = torch.clamp(ratio, 1.0 - self.clip_epsilon, 1.0 + self.clip_epsilon) * b_advs
+        actor_loss = -(b_weights * torch.min(surr1, surr2)).mean() - self.entropy_coef * entropy
+        
+        with torch.no_grad():
+            log_ratio = log_probs - b_old_log_probs
+            self._record(
+                actor_loss=actor_loss,
+                entropy=entropy,
+                # k3 estimator of KL(old || new), unbiased and never negative
+                approx_kl=((ratio - 1.0) - log_ratio).mean(),
+                clip_fraction=((ratio - 1.0).abs() > self.clip_epsilon).float().mean(),
+            )
+        self.samples_seen += b_actions.shape[0]
+        return actor_loss
+
+    def _record(self, **values):
+        # Detached running sums; nothing is read back until update_stats(), so no per-step host sync
+        for name, value in values.items():
+            total, count = self._stats.get(name, (0.0, 0))
+            self._stats[name] = (total + value.detach(), count + 1)
+
+    def update_stats(self) -> Dict[str, float]:
+        """Means over the last update()'s minibatches: actor/critic loss, entropy, approximate KL, clip fraction"""
+        return {name: float(total) / count for name, (total, count) in self._stats.items()}
+
+    def _optimizer_step(self, module: nn.Module, optimizer: optim.Optimizer):
+        """Gradient sync (if any), clipping and one optimizer step for module"""
+        params = list(module.parameters())
+        if self.grad_sync is not None:
+            self.grad_sync(params)
+        nn.utils.clip_grad_norm_(params, self.max_grad_norm, foreach=True)
+        optimizer.step()
+        self.update_steps += 1
+        if module is not self.critic:
+            self._stacked_dirty = True
+
+    def _autocast(self):
+        # bf16 autocast for forward passes in performance mode; losses are still computed in float32
+        if self.autocast_dtype is None:
+            return contextlib.nullcontext()
+        return torch.autocast(self.device.type, dtype=self.autocast_dtype)
+
+    def enable_performance_mode(self, compile: Optional[bool] = None, fused_optimizers: bool = True, bf16: Optional[bool] = None):
+        """
+        Opt-in training speedups for the small actor / critic transformers, where Python and kernel
+        dispatch overhead dominates:
+        - compile: torch.compile the training forward of every actor and the critic (forward and backward graphs)
+        - fused_optimizers: rebuild the Adam optimizers with fused kernels, keeping their state
+        - bf16: autocast forward passes to bfloat16
+        None (the default) turns compile on only for the shared actor, and bf16 only for the shared actor on
+        CPUs with native bf16: per-agent actors train one small minibatch at a time, where both measured
+        slower than eager float32. disable_performance_mode undoes them.
+        """
+        if compile is None:
+            compile = self.share_actor
+        if bf16 is None:
+            bf16 = self.share_actor and self.device.type == "cpu" and bf16_supported()
+        self.autocast_dtype = torch.bfloat16 if bf16 else None
+        
+        if fused_optimizers:
+            self.critic_optimizer = _fused(self.critic_optimizer)
+            if self.share_actor:
+                self.shared_actor_optimizer = _fused(self.shared_actor_optimizer)
+            else:
+                self.actor_optimizers = {a: _fused(opt) for a, opt in self.actor_optimizers.items()}
+        
+        if compile:
+            # The wrappers share the eager modules' parameters, so optimizers, state dicts, views and
+            # StackedActors keep using the eager modules unchanged
+            modules = [self.shared_actor] if self.share_actor else [self.actors[a] for a in self.agents]
+            self._compiled = {module: torch.compile(module) for module in modules + [self.critic]}
+        self.performance_mode = True
+
+    def disable_performance_mode(self) -> None:
+        """Back to eager float32 forward passes; fused optimizers are plain eager kernels and stay."""
+        self.autocast_dtype = None
+        self._compiled = {}
+        self.performance_mode = False
+
+    def _training_forward(self, module: nn.Module) -> nn.Module:
+        """The module the update loops call: its compiled wrapper in performance mode, else the module itself."""
+        return self._compiled.get(module, module)
+
+    def _update_critic(self, agent_buffers: List[PriorityRolloutBuffer], global_states: GlobalStateBuffer, batch_size: int, ppo_epochs: int):
+        """
+        Joint centralized critic update: one optimizer step per minibatch of (tick, park) global states,
+        regressing the shared value onto every agent's return at that state.
+        """
+        for _ in range(ppo_epochs):
+            for b_global_obs, b_returns in global_states.get_generator(agent_buffers, batch_size, self.device):
+                with self._autocast():
+                    predicted_values = self._training_forward(self.critic)(b_global_obs)
+                critic_loss = F.mse_loss(predicted_values.float().expand_as(b_returns), b_returns)
+                self._record(critic_loss=critic_loss)
                 
-        return actions, log_probs, values
+                self.critic_optimizer.zero_grad()
+                critic_loss.backward()
+                self._optimizer_step(self.critic, self.critic_optimizer)
 
-    def update(self, buffers: Dict[str, PriorityRolloutBuffer], batch_size: int = 64, ppo_epochs: int = 10):
-        """PPO Update phase using gathered rollout buffers"""
+    def update(self, buffers: Dict[str, PriorityRolloutBuffer], batch_size: int = 64, ppo_epochs: int = 10,
+               global_states: Optional[GlobalStateBuffer] = None):
+        """
+        PPO Update phase using gathered rollout buffers.
+        global_states: the global observations recorded during the rollout; rebuilt from the agents'
+        local observations when not given.
+        """
         
         self.entropy_coef = max(0.001, self.entropy_coef * self.entropy_decay)
+        self._stats = {}
+        
+        # Critic first, on the joint batch, while the buffers still hold this rollout
+        agent_buffers = [buffers[a] for a in self.agents]
+        if agent_buffers[0].step > 0:
+            if global_states is None:
+                global_states = GlobalStateBuffer.from_agent_buffers(agent_buffers)
+            self._update_critic(agent_buffers, global_states, batch_size, ppo_epochs)
+            global_states.reset()
+        
+        if self.share_actor:
+            self._update_shared(buffers, batch_size, ppo_epochs)
+            return
         
         for agent in self.agents:
             if buffers[agent].step == 0:
@@ -89,46 +375,22 @@ class TransformerMAPPO:
                 
             buffer = buffers[agent]
             actor = self.actors[agent]
+            forward = self._training_forward(actor)
             optimizer = self.actor_optimizers[agent]
             
             # PPO Epochs
             for _ in range(ppo_epochs):
-                for (b_obs, b_actions, b_values, b_old_log_probs, b_advs, b_returns, batch_idx) in buffer.get_generator(batch_size, self.device):
-                    
-                    # Normalize advantages
-                    b_advs = (b_advs - b_advs.mean()) / (b_advs.std() + 1e-8)
+                for (b_obs, b_actions, b_values, b_old_log_probs, b_advs, b_returns, b_weights, batch_idx) in buffer.get_generator(batch_size, self.device):
                     
                     # Evaluate Actions
-                    mean, std = actor(b_obs)
-                    dist = torch.distributions.Normal(mean, std)
-                    log_probs = dist.log_prob(b_actions).sum(dim=-1, keepdim=True)
-                    entropy = dist.entropy().mean()
-                    
-                    # Ratio
-                    ratio = torch.exp(log_probs - b_old_log_probs)
-                    
-                    # Actor Loss (Clipped Surrogate Objective)
-                    surr1 = ratio * b_advs
-                    surr2 = torch.clamp(ratio, 1.0 - self.clip_epsilon, 1.0 + self.clip_epsilon) * b_advs
-                    actor_loss = -torch.min(surr1, surr2).mean() - self.entropy_coef * entropy
+                    with self._autocast():
+                        mean, std = forward(b_obs)
+                    actor_loss = self._actor_loss(mean, std, b_actions, b_old_log_probs, b_advs, b_weights)
                     
                     # Backprop Actor
                     optimizer.zero_grad()
                     actor_loss.backward()
-                    nn.utils.clip_grad_norm_(actor.parameters(), self.max_grad_norm)
-                    optimizer.step()
-                    
-                    # Centralized Critic Loss calculation happens separately since it uses all states
-                    # (Simplified here to train per agent's return estimates for demo speed,
-                    #  ideally trained jointly on global states).
-                    global_obs_train_batch = b_obs.repeat(1, len(self.agents)) # Hack for single agent buffer shape mismatch
-                    predicted_values = self.critic(global_obs_train_batch)
-                    critic_loss = F.mse_loss(predicted_values, b_returns)
-                    
-                    self.critic_optimizer.zero_grad()
-                    critic_loss.backward()
-                    nn.utils.clip_grad_norm_(self.critic.parameters(), self.max_grad_norm)
-                    self.critic_optimizer.step()
+                    self._optimizer_step(actor, optimizer)
                     
                     # Priority TD Error Update (Absolute error between returned and predicted)
                     td_errors = torch.abs(b_returns - b_values).detach().cpu().numpy()
@@ -136,13 +398,92 @@ class TransformerMAPPO:
                     
             # Clear buffer after usage
             buffer.reset()
-            
-    def get_attention_weights(self, obs_dict: Dict[str, np.ndarray]):
-        """For visualization in Dashboard"""
-        weights = {}
-        with torch.no_grad():
-            for agent in self.agents:
-                obs_t = torch.tensor(obs_dict[agent], dtype=torch.float32).unsqueeze(0).to(self.device)
-                _ = self.actors[agent](obs_t)
-                weights[agent] = self.actors[agent].get_attention()
-        return weights
+
+    def _update_shared(self, buffers: Dict[str, PriorityRolloutBuffer], batch_size: int, ppo_epochs: int):
+        """
+        Shared-actor PPO: the transitions of all agents are pooled and sampled together, so each
+        minibatch holds batch_size samples per agent and the whole park trains in one backward pass.
+        """
+        agent_buffers = [buffers[a] for a in self.agents]
+        if all(b.step == 0 for b in agent_buffers):
+            return
+        
+        for _ in range(ppo_epochs):
+            for (b_obs, b_actions, b_values, b_old_log_probs, b_advs, b_returns, b_weights, b_agents, batch_idx) in pooled_generator(agent_buffers, batch_size * len(self.agents), self.device):
+                
+                ids = torch.as_tensor(b_agents, dtype=torch.long, device=self.device)
+                with self._autocast():
+                    mean, std = self._training_forward(self.shared_actor)(b_obs, ids, self.agent_types[ids])
+                actor_loss = self._actor_loss(mean, std, b_actions, b_old_log_probs, b_advs, b_weights)
+                
+                self.shared_actor_optimizer.zero_grad()
+                actor_loss.backward()
+                self._optimizer_step(self.shared_actor, self.shared_actor_optimizer)
+                
+                td_errors = torch.abs(b_returns - b_values).detach().cpu().numpy().reshape(-1)
+                for i in np.unique(b_agents):
+                    mask = b_agents == i
+                    agent_buffers[i].update_priorities(batch_idx[mask], td_errors[mask])
+        
+        for buffer in agent_buffers:
+            buffer.reset()
+
+    def actor_parameters(self) -> List[torch.Tensor]:
+        """Every policy parameter in a fixed order (the shared actor's, or each agent's actor in `self.agents` order)"""
+        if self.share_actor:
+            return list(self.shared_actor.parameters())
+        return [p for a in self.agents for p in self.actors[a].parameters()]
+
+    def actor_state_dict(self) -> Dict:
+        """Actor weights for checkpoints: per-agent state dicts, or the shared actor's"""
+        if self.share_actor:
+            return {"shared_actor": self.shared_actor.state_dict()}
+        return {"actors": {a: self.actors[a].state_dict() for a in self.agents}}
+
+    def load_actor_state_dict(self, state_dicts: Dict) -> None:
+        if self.share_actor:
+            self.shared_actor.load_state_dict(state_dicts["shared_actor"])
+        else:
+            for a in self.agents:
+                self.actors[a].load_state_dict(state_dicts["actors"][a])
+        self._stacked_dirty = True
+
+    def training_state_dict(self) -> Dict:
+        """Everything besides the weights that a resumed run needs: optimizer moments, entropy schedule, step count"""
+        if self.share_actor:
+            actor_optimizers = {"shared_actor": self.shared_actor_optimizer.state_dict()}
+        else:
+            actor_optimizers = {a: opt.state_dict() for a, opt in self.actor_optimizers.items()}
+        return {
+            "actor_optimizers": actor_optimizers,
+            "critic_optimizer": self.critic_optimizer.state_dict(),
+            "entropy_coef": self.entropy_coef,
+            "update_steps": self.update_steps,
+        }
+
+    def load_training_state_dict(self, state: Dict) -> None:
+        if self.share_actor:
+            self.shared_actor_optimizer.load_state_dict(state["actor_optimizers"]["shared_actor"])
+        else:
+            for a, opt in self.actor_optimizers.items():
+                opt.load_state_dict(state["actor_optimizers"][a])
+        self.critic_optimizer.load_state_dict(state["critic_optimizer"])
+        self.entropy_coef = state["entropy_coef"]
+        self.update_steps = state["update_steps"]
+
+    def get_attention_weights(self, obs_dict: Optional[Dict[str, np.ndarray]] = None, env_index: int = 0):
+        """
+        For visualization in Dashboard: {agent: [per-layer (1, heads, seq, seq) attention map]}.
+        Without obs_dict this reads the maps cached by the last get_actions / get_actions_batch call
+        (park env_index), so it costs nothing per step; with obs_dict one batched forward refreshes the
+        cache first. Returns {} before any action has been taken.
+        """
+        if obs_dict is not None:
+            self.get_actions(obs_dict, deterministic=True)
+            env_index = 0
+        if self._attention_cache is None:
+            return {}
+        return {
+            agent: [layer[env_index, i].unsqueeze(0).cpu() for layer in self._attention_cache]
+            for i, agent in enumerate(self.agents)
+        }
@@ -1,4 +1,5 @@
 import torch
+import math
 import torch.nn as nn
 import torch.nn.functional as F
 
@@ -17,6 +18,42 @@ class PositionalEncoding(nn.Module):
         seq_len = x.size(1)
         return x + self.encoding[:, :seq_len, :].to(x.device)
 
+class AttentionEncoderLayer(nn.TransformerEncoderLayer):
+    """
+    nn.TransformerEncoderLayer that can also hand back its attention maps: with need_weights the
+    self-attention is computed explicitly and the per-head softmax (batch, heads, seq, seq), before
+    attention dropout, is kept in `attention_weights`. Otherwise it runs the stock attention block.
+    Always takes the Python path (never the fused fast path), so it also runs with quantized Linear layers.
+    """
+    def forward(self, src, src_mask=None, src_key_padding_mask=None, is_causal=False, need_weights=False):
+        self.attention_weights = None
+        if need_weights:
+            sa_block = lambda x: self._sa_block_weights(x)
+        else:
+            sa_block = lambda x: self._sa_block(x, src_mask, src_key_padding_mask, is_causal=is_causal)
+        
+        x = src
+        if self.norm_first:
+            x = x + sa_block(self.norm1(x))
+            x = x + self._ff_block(self.norm2(x))
+        else:
+            x = self.norm1(x + sa_block(x))
+            x = self.norm2(x + self._ff_block(x))
+        return x
+
+    def _sa_block_weights(self, x):
+        attn = self.self_attn
+        batch, seq, hidden = x.shape
+        head_dim = hidden // attn.num_heads
+        
+        q, k, v = F.linear(x, attn.in_proj_weight, attn.in_proj_bias).reshape(batch, seq, 3, attn.num_heads, head_dim).unbind(2)
+        scores = torch.einsum("bqhd,bkhd->bhqk", q, k) / math.sqrt(head_dim)
+        weights = torch.softmax(scores, dim=-1)
+        self.attention_weights = weights.detach()
+        
+        context = torch.einsum("bhqk,bkhd->bqhd", F.dropout(weights, attn.dropout, self.training), v).reshape(batch, seq, hidden)
+        return self.dropout1(attn.out_proj(context))
+
 class TransformerEncoder(nn.Module):
     def __init__(self, input_dim: int, hidden_dim: int = 128, num_layers: int = 2, num_heads: int = 4):
         super(TransformerEncoder, self).__init__()
@@ -24,21 +61,24 @@ class TransformerEncoder(nn.Module):
         self.input_projection = nn.Linear(input_dim, hidden_dim)
         self.pos_encoder = PositionalEncoding(hidden_dim)
         
-        # Self-Attention Layer
-        encoder_layer = nn.TransformerEncoderLayer(
-            d_model=hidden_dim, 
-            nhead=num_heads, 
-            dim_feedforward=hidden_dim * 4,
-            dropout=0.1,
-            activation="gelu",
-            batch_first=True
-        )
-        # Store individual layers to easily access attention weights later without torch hooks
-        self.layers = nn.ModuleList([encoder_layer for _ in range(num_layers)])
+        # Self-Attention Layers, each with its own weights; they can return their attention maps
+        self.layers = nn.ModuleList([
+            AttentionEncoderLayer(
+                d_model=hidden_dim, 
+                nhead=num_heads, 
+                dim_feedforward=hidden_dim * 4,
+                dropout=0.1,
+                activation="gelu",
+                batch_first=True
+            )
+            for _ in range(num_layers)
+        ])
         
         # We need a learnable CLS token, similar to BERT, to aggregate features
         self.cls_token = nn.Parameter(torch.randn(1, 1, hidden_dim))
         
+        # With capture_attention set, forward() keeps each layer's (batch, heads, seq, seq) attention maps
+        self.capture_attention = False
         self._attention_weights = []
 
     def forward(self, x):
@@ -58,23 +98,18 @@ class TransformerEncoder(nn.Module):
         x = torch.cat((cls_tokens, x), dim=1)
         
         self._attention_weights = []
-        
-        # We process manually to extract attention weights for Demo visualizations
         for layer in self.layers:
-            # nn.TransformerEncoderLayer doesn't natively return attention weights in PyTorch, 
-            # so we either use hooks or custom layers. For simplicity, we just run the standard 
-            # self-attention block if we want to extract it manually, but for now we'll just run it.
-            # In a production hackathon demo we'd use a custom layer to return weights.
-            x = layer(x)
+            x = layer(x, need_weights=self.capture_attention)
+            if self.capture_attention:
+                self._attention_weights.append(layer.attention_weights)
             
         # Extract features from CLS token
         cls_features = x[:, 0, :]
         return cls_features
         
     def get_attention_weights(self):
-        """Mock method for hackathon demo visualizations."""
-        # For demo purposes, returning dummy attention heatmap weights focused randomly
-        return [torch.softmax(torch.randn(1, 4, 10, 10), dim=-1)]
+        """Per-layer (batch, heads, seq, seq) attention maps of the last forward run with capture_attention."""
+        return self._attention_weights
 
 class ActorNetwork(nn.Module):
     """Outputs action distribution based on local observation"""
@@ -106,6 +141,41 @@ class ActorNetwork(nn.Module):
     def get_attention(self):
         return self.encoder.get_attention_weights()
 
+class SharedActorNetwork(nn.Module):
+    """
+    One actor for every agent of a park. Each observation is tagged with a learned embedding of the agent's
+    identity plus one of its factory type, so a single set of weights can still specialise per factory.
+    """
+    def __init__(self, obs_dim: int, action_dim: int, num_agents: int, num_types: int = 3, embed_dim: int = 16, hidden_dim: int = 128):
+        super(SharedActorNetwork, self).__init__()
+        
+        self.agent_embedding = nn.Embedding(num_agents, embed_dim)
+        self.type_embedding = nn.Embedding(num_types, embed_dim)
+        self.actor = ActorNetwork(obs_dim + embed_dim, action_dim, hidden_dim=hidden_dim)
+
+    def forward(self, obs, agent_ids, agent_types):
+        # obs: (batch, obs_dim); agent_ids / agent_types: (batch,) long
+        identity = self.agent_embedding(agent_ids) + self.type_embedding(agent_types)
+        return self.actor(torch.cat((obs, identity), dim=-1))
+    
+    def get_attention(self):
+        return self.actor.get_attention()
+
+class AgentActorView:
+    """ActorNetwork-style handle (obs -> mean, std) for one agent of a SharedActorNetwork."""
+    def __init__(self, shared: SharedActorNetwork, agent_id: int, agent_type: int):
+        self.shared = shared
+        self.agent_id = agent_id
+        self.agent_type = agent_type
+
+    def __call__(self, obs):
+        ids = torch.full(obs.shape[:-1], self.agent_id, dtype=torch.long, device=obs.device)
+        types = torch.full(obs.shape[:-1], self.agent_type, dtype=torch.long, device=obs.device)
+        return self.shared(obs, ids, types)
+    
+    def get_attention(self):
+        return self.shared.get_attention()
+
 class CriticNetwork(nn.Module):
     """Outputs state value estimation based on global state"""
     def __init__(self, global_obs_dim: int, hidden_dim: int = 128):
@@ -123,3 +193,200 @@ class CriticNetwork(nn.Module):
     def forward(self, global_obs):
         features = self.encoder(global_obs)
         return self.value_head(features)
+
+class AgentAttentionBlock(nn.Module):
+    """
+    Post-norm transformer block over agent tokens (batch, agents, hidden) with a choice of attention:
+    - "full": every agent attends to every agent, O(N^2)
+    - "local": agents attend within blocks of `window` neighbours plus one park-wide summary token, O(N * window)
+    - "clustered": agents exchange information through `num_clusters` learned inducing tokens, O(N * clusters)
+    agent_mask (batch, agents) marks real agents (True) in padded batches of parks with different sizes.
+    """
+    def __init__(self, hidden_dim: int, num_heads: int, attention: str = "full", window: int = 32, num_clusters: int = 16, dropout: float = 0.1):
+        super(AgentAttentionBlock, self).__init__()
+        if attention not in ("full", "local", "clustered"):
+            raise ValueError(f"Unknown critic attention {attention!r}")
+        self.attention = attention
+        self.window = window
+        self.num_heads = num_heads
+        
+        self.self_attn = nn.MultiheadAttention(hidden_dim, num_heads, dropout=dropout, batch_first=True)
+        if attention == "clustered":
+            self.inducing = nn.Parameter(torch.randn(1, num_clusters, hidden_dim))
+            self.gather_attn = nn.MultiheadAttention(hidden_dim, num_heads, dropout=dropout, batch_first=True)
+        
+        self.feed_forward = nn.Sequential(
+            nn.Linear(hidden_dim, hidden_dim * 4),
+            nn.GELU(),
+            nn.Dropout(dropout),
+            nn.Linear(hidden_dim * 4, hidden_dim),
+        )
+        self.norm1 = nn.LayerNorm(hidden_dim)
+        self.norm2 = nn.LayerNorm(hidden_dim)
+        self.dropout = nn.Dropout(dropout)
+
+    def _local(self, x, padding):
+        batch, n, hidden = x.shape
+        w = min(self.window, n)
+        pad = (-n) % w
+        blocks = (n + pad) // w
+        
+        # Park-wide mean over real agents, shared as an extra key by every block
+        real = (~padding).unsqueeze(-1).float()
+        summary = (x * real).sum(dim=1, keepdim=True) / real.sum(dim=1, keepdim=True).clamp(min=1.0)
+        
+        queries = F.pad(x, (0, 0, 0, pad)).reshape(batch * blocks, w, hidden)
+        keys = torch.cat((summary.repeat_interleave(blocks, dim=0), queries), dim=1)
+        key_padding = F.pad(padding, (0, pad), value=True).reshape(batch * blocks, w)
+        key_padding = torch.cat((torch.zeros_like(key_padding[:, :1]), key_padding), dim=1)
+        
+        out, _ = self.self_attn(queries, keys, keys, key_padding_mask=key_padding, need_weights=False)
+        return out.reshape(batch, n + pad, hidden)[:, :n]
+
+    def forward(self, x, agent_mask=None):
+        padding = ~agent_mask if agent_mask is not None else torch.zeros(x.shape[:2], dtype=torch.bool, device=x.device)
+        
+        if self.attention == "full":
+            attn, _ = self.self_attn(x, x, x, key_padding_mask=padding, need_weights=False)
+        elif self.attention == "local":
+            attn = self._local(x, padding)
+        else:
+            inducing = self.inducing.expand(x.shape[0], -1, -1)
+            clusters, _ = self.gather_attn(inducing, x, x, key_padding_mask=padding, need_weights=False)
+            attn, _ = self.self_attn(x, clusters, clusters, need_weights=False)
+        
+        x = self.norm1(x + self.dropout(attn))
+        return self.norm2(x + self.dropout(self.feed_forward(x)))
+
+class AgentTokenCritic(nn.Module):
+    """
+    Centralized critic over agent tokens: each agent's local observation is one token, attention runs
+    across agents (see AgentAttentionBlock) and a learned query pools the park into one value.
+    No weight depends on the number of agents, so one checkpoint serves parks of any size.
+    Accepts the same flat (batch, agents * obs_dim) global observation as CriticNetwork, or (batch, agents, obs_dim).
+    """
+    def __init__(self, obs_dim: int, hidden_dim: int = 128, num_layers: int = 2, num_heads: int = 4,
+                 attention: str = "full", window: int = 32, num_clusters: int = 16):
+        super(AgentTokenCritic, self).__init__()
+        self.obs_dim = obs_dim
+        
+        self.token_projection = nn.Linear(obs_dim, hidden_dim)
+        self.layers = nn.ModuleList([
+            AgentAttentionBlock(hidden_dim, num_heads, attention, window, num_clusters) for _ in range(num_layers)
+        ])
+        self.pool_query = nn.Parameter(torch.randn(1, 1, hidden_dim))
+        self.pool = nn.MultiheadAttention(hidden_dim, num_heads, batch_first=True)
+        
+        self.value_head = nn.Sequential(
+            nn.Linear(hidden_dim, hidden_dim),
+            nn.GELU(),
+            nn.Linear(hidden_dim, 1)
+        )
+
+    def forward(self, global_obs, agent_mask=None):
+        tokens = global_obs.reshape(global_obs.shape[0], -1, self.obs_dim)
+        x = self.token_projection(tokens)
+        for layer in self.layers:
+            x = layer(x, agent_mask)
+        
+        query = self.pool_query.expand(x.shape[0], -1, -1)
+        padding = ~agent_mask if agent_mask is not None else None
+        pooled, _ = self.pool(query, x, x, key_padding_mask=padding, need_weights=False)
+        return self.value_head(pooled[:, 0])
+
+def _stacked_linear(x, weight_t, bias):
+    # x: (agents, rows, in), weight_t: (agents, in, out) pre-transposed, bias: (agents, out)
+    return torch.baddbmm(bias.unsqueeze(1), x, weight_t)
+
+def _stacked_layer_norm(x, weight, bias, eps):
+    return F.layer_norm(x, weight.shape[-1:], eps=eps) * weight.unsqueeze(1) + bias.unsqueeze(1)
+
+class StackedActors:
+    """
+    Inference-only view of many ActorNetworks with their parameters stacked along a leading agent dim,
+    so every agent's policy runs in one batched forward pass (bmm per layer) instead of one call per agent.
+    Mirrors ActorNetwork.forward op by op, including dropout when the source actors are in train mode.
+    Parameters are copied on construction; rebuild after the actors change.
+    """
+    def __init__(self, actors):
+        first = actors[0]
+        stack = lambda get: torch.stack([get(a).detach() for a in actors])
+        # Linear weights are kept as contiguous (agents, in, out) so bmm needs no transposed copy
+        stack_t = lambda get: torch.stack([get(a).detach().t() for a in actors]).contiguous()
+        
+        self.training = first.training
+        # With capture_attention set, __call__ keeps per-layer (agents, batch, heads, seq, seq) attention maps
+        self.capture_attention = False
+        self.attention_weights = []
+        self.input_w = stack_t(lambda a: a.encoder.input_projection.weight)
+        self.input_b = stack(lambda a: a.encoder.input_projection.bias)
+        self.cls_token = stack(lambda a: a.encoder.cls_token[0, 0])
+        self.pos_encoding = first.encoder.pos_encoder.encoding
+        
+        self.layers = []
+        for l, layer in enumerate(first.encoder.layers):
+            at = lambda a, l=l: a.encoder.layers[l]
+            self.layers.append({
+                "num_heads": layer.self_attn.num_heads,
+                "dropout": layer.dropout.p,
+                "attn_dropout": layer.self_attn.dropout,
+                "eps": layer.norm1.eps,
+                "in_w": stack_t(lambda a: at(a).self_attn.in_proj_weight),
+                "in_b": stack(lambda a: at(a).self_attn.in_proj_bias),
+                "out_w": stack_t(lambda a: at(a).self_attn.out_proj.weight),
+                "out_b": stack(lambda a: at(a).self_attn.out_proj.bias),
+                "linear1_w": stack_t(lambda a: at(a).linear1.weight),
+                "linear1_b": stack(lambda a: at(a).linear1.bias),
+                "linear2_w": stack_t(lambda a: at(a).linear2.weight),
+                "linear2_b": stack(lambda a: at(a).linear2.bias),
+                "norm1_w": stack(lambda a: at(a).norm1.weight),
+                "norm1_b": stack(lambda a: at(a).norm1.bias),
+                "norm2_w": stack(lambda a: at(a).norm2.weight),
+                "norm2_b": stack(lambda a: at(a).norm2.bias),
+            })
+        
+        self.mean1_w = stack_t(lambda a: a.action_mean[0].weight)
+        self.mean1_b = stack(lambda a: a.action_mean[0].bias)
+        self.mean2_w = stack_t(lambda a: a.action_mean[2].weight)
+        self.mean2_b = stack(lambda a: a.action_mean[2].bias)
+        self.action_logstd = stack(lambda a: a.action_logstd[0])
+
+    def _dropout(self, x, p):
+        return F.dropout(x, p, training=self.training)
+
+    def _encoder_layer(self, x, p):
+        # Post-norm nn.TransformerEncoderLayer: x = norm1(x + SA(x)); x = norm2(x + FF(x))
+        n, rows, seq, hidden = x.shape
+        heads = p["num_heads"]
+        flat = x.reshape(n, rows * seq, hidden)
+        
+        q, k, v = _stacked_linear(flat, p["in_w"], p["in_b"]).reshape(n, rows, seq, 3, heads, hidden // heads).unbind(3)
+        scores = torch.einsum("nbqhd,nbkhd->nbhqk", q, k) / math.sqrt(hidden // heads)
+        weights = torch.softmax(scores, dim=-1)
+        if self.capture_attention:
+            self.attention_weights.append(weights)
+        attn = self._dropout(weights, p["attn_dropout"])
+        context = torch.einsum("nbhqk,nbkhd->nbqhd", attn, v).reshape(n, rows * seq, hidden)
+        sa = self._dropout(_stacked_linear(context, p["out_w"], p["out_b"]), p["dropout"])
+        flat = _stacked_layer_norm(flat + sa, p["norm1_w"], p["norm1_b"], p["eps"])
+        
+        ff = self._dropout(F.gelu(_stacked_linear(flat, p["linear1_w"], p["linear1_b"])), p["dropout"])
+        ff = self._dropout(_stacked_linear(ff, p["linear2_w"], p["linear2_b"]), p["dropout"])
+        flat = _stacked_layer_norm(flat + ff, p["norm2_w"], p["norm2_b"], p["eps"])
+        return flat.reshape(n, rows, seq, hidden)
+
+    def __call__(self, obs):
+        """obs: (agents, batch, obs_dim), row i goes through actor i. Returns mean, std: (agents, batch, action_dim)."""
+        n, rows, _ = obs.shape
+        x = _stacked_linear(obs, self.input_w, self.input_b).unsqueeze(2) # (agents, batch, 1, hidden)
+        x = x + self.pos_encoding[0, :1].to(x.device)
+        cls = self.cls_token[:, None, None, :].expand(n, rows, 1, -1)
+        x = torch.cat((cls, x), dim=2)
+        self.attention_weights = []
+        for p in self.layers:
+            x = self._encoder_layer(x, p)
+        
+        features = x[:, :, 0]
+        mean = torch.tanh(_stacked_linear(F.gelu(_stacked_linear(features, self.mean1_w, self.mean1_b)), self.mean2_w, self.mean2_b))
+        std = torch.exp(self.action_logstd).unsqueeze(1).expand_as(mean)
+        return mean, std
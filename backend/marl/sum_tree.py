@@ -0,0 +1,68 @@
+import numpy as np
+
+class SumTree:
+    """
+    Array-backed segment tree over `capacity` non-negative priorities, keeping both sums and maxima.
+    Leaves live at [size, size + capacity) of each tree array (size = capacity rounded up to a power of two),
+    so batched updates and proportional sampling cost O(batch * log capacity) instead of O(capacity).
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.size = 1
+        while self.size < capacity:
+            self.size *= 2
+        self.sums = np.zeros(2 * self.size, dtype=np.float64)
+        self.maxes = np.zeros(2 * self.size, dtype=np.float64)
+
+    @property
+    def total(self) -> float:
+        return float(self.sums[1])
+
+    @property
+    def max(self) -> float:
+        return float(self.maxes[1])
+
+    def clear(self) -> None:
+        self.sums[:] = 0.0
+        self.maxes[:] = 0.0
+
+    def get(self, indices: np.ndarray) -> np.ndarray:
+        return self.sums[self.size + np.asarray(indices)]
+
+    def update(self, indices: np.ndarray, priorities) -> None:
+        """Sets the priorities at leaf `indices` (later duplicates win) and refreshes their ancestors."""
+        nodes = self.size + np.asarray(indices, dtype=np.int64).reshape(-1)
+        self.sums[nodes] = priorities
+        self.maxes[nodes] = self.sums[nodes]
+
+        # Walk up one level at a time; every touched parent is recomputed from its two children
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            left = 2 * nodes
+            self.sums[nodes] = self.sums[left] + self.sums[left + 1]
+            self.maxes[nodes] = np.maximum(self.maxes[left], self.maxes[left + 1])
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes // 2)
+
+    def find(self, mass: np.ndarray) -> np.ndarray:
+        """Leaf index for each prefix-sum value in [0, total): the first leaf whose cumulative sum exceeds it."""
+        mass = np.array(mass, dtype=np.float64).reshape(-1)
+        nodes = np.ones(len(mass), dtype=np.int64)
+        while self.size > 1 and len(nodes) and nodes[0] < self.size:
+            left = 2 * nodes
+            left_sum = self.sums[left]
+            # Never descend into an empty subtree, even when round-off pushes the mass past the total
+            go_right = (mass >= left_sum) & (self.sums[left + 1] > 0)
+            mass -= np.where(go_right, left_sum, 0.0)
+            nodes = left + go_right
+        return nodes - self.size
+
+    def sample(self, n: int, rng: np.random.Generator = None) -> np.ndarray:
+        """
+        n leaf indices drawn proportionally to priority, stratified over n equal slices of the total mass
+        and returned in random order.
+        """
+        rng = rng if rng is not None else np.random
+        mass = (np.arange(n) + rng.random(n)) * (self.total / n)
+        return self.find(rng.permutation(mass))
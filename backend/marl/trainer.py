@@ -1,26 +1,42 @@
-import torch
 import numpy as np
 import os
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 
 from simulation.environment import IndustrialParkEnv
+from simulation.vector_env import VectorIndustrialParkEnv
+from simulation.subproc_env import SubprocVectorIndustrialParkEnv
 from marl.mappo import TransformerMAPPO
-from marl.buffer import PriorityRolloutBuffer
+from marl.buffer import RolloutStorage, GlobalStateBuffer, compute_gae_joint
+from marl.curriculum import CurriculumScheduler, CurriculumStage
+from marl.instrumentation import PhaseTimer, MetricsWriter, ProfilerWindow
+from marl.checkpoint import (AsyncCheckpointer, load_checkpoint_file, rng_state, set_rng_state,
+                             blobs_to_tensors, tensors_to_blobs)
 
 class MARLTrainer:
     def __init__(self, 
-                 env: IndustrialParkEnv,
+                 env: Union[IndustrialParkEnv, VectorIndustrialParkEnv, SubprocVectorIndustrialParkEnv],
                  model: TransformerMAPPO,
                  buffer_size: int = 2048,
                  batch_size: int = 64,
                  ppo_epochs: int = 10,
-                 save_dir: str = "checkpoints"):
+                 save_dir: str = "checkpoints",
+                 keep_checkpoints: int = 3,
+                 performance_mode: Union[bool, Dict] = False,
+                 metrics_file: Optional[str] = None,
+                 log_every: int = 50,
+                 profile_at: Optional[int] = None,
+                 profile_iterations: int = 1):
                  
+        # A single park is driven through the same batched path as a K=1 vector env
+        if isinstance(env, IndustrialParkEnv):
+            env = VectorIndustrialParkEnv([lambda park=env: park])
         self.env = env
         self.model = model
-        self.agents = env.agents
+        self.agents = env.possible_agents
+        self.num_envs = env.num_envs
         
+        # buffer_size counts ticks; each tick stores one transition per park
         self.buffer_size = buffer_size
         self.batch_size = batch_size
         self.ppo_epochs = ppo_epochs
@@ -28,99 +44,311 @@ class MARLTrainer:
         obs_dim = env.observation_space(self.agents[0]).shape[0]
         action_dim = env.action_space(self.agents[0]).shape[0]
         
-        self.buffers = {
-            a: PriorityRolloutBuffer(buffer_size, obs_dim, action_dim) for a in self.agents
-        }
+        # One preallocated block for all agents; self.buffers[agent] are views into it
+        self.storage = RolloutStorage(self.agents, buffer_size, obs_dim, action_dim, num_envs=self.num_envs)
+        self.buffers = self.storage.buffers
+        # Centralized critic input, recorded once per tick for all agents
+        self.global_states = GlobalStateBuffer(buffer_size, obs_dim * len(self.agents), num_envs=self.num_envs)
         
         self.save_dir = save_dir
-        os.makedirs(save_dir, exist_ok=True)
+        # Full-state checkpoints are written in the background; only the newest keep_checkpoints are kept
+        self.checkpointer = AsyncCheckpointer(save_dir, keep_last=keep_checkpoints, pattern="stage_*_ep_*.pt")
+        # Curriculum position (stage index, episodes done in it); load_checkpoint sets it so train() resumes there
+        self.stage = 0
+        self.episode = 0
+        self.stage_complete = False
+        self.curriculum: Optional[CurriculumScheduler] = None
+        self._resume_state: Optional[Dict] = None
+        
+        # Opt-in TransformerMAPPO.enable_performance_mode (True, or a dict of its options). The first update
+        # runs eagerly as the baseline, the second compiles, and the third measures the per-step speedup;
+        # if it is not faster than the baseline, the model falls back to eager execution.
+        self.performance_mode = performance_mode
+        self._eager_step_ms = None
+        self._performance_updates = 0
+        
+        # Instrumentation: wall time per phase, opt-in JSONL records per training iteration (appended to
+        # save_dir/metrics_file while train() runs), a console summary every log_every iterations and an
+        # opt-in torch.profiler window of profile_iterations iterations, starting at iteration profile_at
+        # or whenever profile() is called
+        self.timer = PhaseTimer()
+        self.metrics_file = metrics_file
+        self.log_every = log_every
+        self.metrics: Optional[MetricsWriter] = None
+        self.profiler = ProfilerWindow(os.path.join(save_dir, "traces"))
+        self.profile_at = profile_at
+        self.profile_iterations = profile_iterations
+        self.iteration = 0
+        self._samples_seen = model.samples_seen
         
     def collect_rollouts(self, target_steps: int):
-        """Play episodes to fill the rollout buffers"""
+        """Play target_steps ticks across all parks to fill the rollout buffers"""
         obs, _ = self.env.reset()
+        dones = np.zeros((self.num_envs, len(self.agents)), dtype=bool)
         steps = 0
         
+        phase = self.timer.phase
+        
         while steps < target_steps:
-            actions_dict, log_probs_dict, values_dict = self.model.get_actions(obs)
+            # One policy forward per tick covers every park
+            with phase("policy_forward"):
+                actions, log_probs, values = self.model.get_actions_batch(obs)
             
-            # Step environment
-            next_obs, rewards, dones, truncs, infos = self.env.step(actions_dict)
+            # Step all parks; finished parks auto-reset independently
+            with phase("env_step"):
+                next_obs, rewards, dones, truncs, infos = self.env.step(actions)
+                dones = dones | truncs
             
-            for agent in self.agents:
-                if agent in obs: # skip agents that are done early
-                    self.buffers[agent].add(
-                        obs[agent], actions_dict[agent], rewards[agent], 
-                        dones[agent], log_probs_dict[agent], values_dict[agent]
-                    )
+            with phase("buffer_add"):
+                self.global_states.add(obs)
+                self.storage.add_batch(obs, actions, rewards, dones, log_probs, values)
             
             obs = next_obs
             steps += 1
             
-            # Reset if any terminal condition
-            if any(dones.values()) or any(truncs.values()):
-                # Calculate final values for GAE before reset
-                _, _, final_values = self.model.get_actions(obs)
-                for agent in self.agents:
-                    self.buffers[agent].compute_gae(
-                        last_value=torch.tensor(final_values.get(agent, 0.0), dtype=torch.float32),
-                        last_done=True
-                    )
-                obs, _ = self.env.reset()
-                
-        # Handle truncation calculation if loop ends mid-episode
-        if not any(dones.values()) and not any(truncs.values()):
-            _, _, final_values = self.model.get_actions(obs)
-            for agent in self.agents:
-                self.buffers[agent].compute_gae(
-                    last_value=torch.tensor(final_values.get(agent, 0.0), dtype=torch.float32),
-                    last_done=False
-                )
+        # Bootstrap from the observation after the last tick; parks that just finished are cut by their done flag
+        with phase("policy_forward"):
+            _, _, final_values = self.model.get_actions_batch(obs)
+        with phase("gae"):
+            compute_gae_joint([self.buffers[a] for a in self.agents], final_values, dones)
 
-    def train(self, episodes_per_stage: List[int]):
+    def train(self, curriculum: Union[List[int], CurriculumScheduler]):
         """
-        Executes Curriculum Learning process
-        Stage 1: Base interactions
-        Stage 2: Full episodes
-        Stage 3: Stochastic Disruptions Enabled
+        Executes the Curriculum Learning process over the scheduler's stages (DEFAULT_STAGES: clean learning,
+        mild disruptions, full chaos). A list of episode counts runs those default stages with fixed budgets;
+        an adaptive CurriculumScheduler evaluates the policy as it trains and moves on to the next stage, or
+        stops after the last one, as soon as evaluation returns plateau.
         """
-        total_stages = len(episodes_per_stage)
-        print(f"Starting Curriculum Training Process ({total_stages} Stages)")
+        scheduler = curriculum if isinstance(curriculum, CurriculumScheduler) else CurriculumScheduler.fixed(curriculum)
+        self.curriculum = scheduler
+        stages = scheduler.stages
+        total_stages = len(stages)
+        start_stage, start_episode = self.stage, self.episode
+        if start_stage or start_episode:
+            print(f"Resuming Curriculum Training at stage {start_stage + 1}, after episode {start_episode}")
+        else:
+            print(f"Starting Curriculum Training Process ({total_stages} Stages)")
         
-        for stage, num_episodes in enumerate(episodes_per_stage):
-            print(f"\n--- Stage {stage + 1}/{total_stages} [{num_episodes} Episodes] ---")
-            
-            # Curriculum logic mappings
-            if stage == 0:
-                self.env.disruption_prob = 0.0 # Clean learning phase
-            elif stage == 1:
-                self.env.disruption_prob = 0.05 # Mild complexity 
-            else:
-                self.env.disruption_prob = 0.15 # Full chaos testing
-                
-            for ep in range(1, num_episodes + 1):
-                self.collect_rollouts(target_steps=self.buffer_size)
-                self.model.update(self.buffers, self.batch_size, self.ppo_epochs)
+        if self.metrics_file:
+            self.metrics = MetricsWriter(os.path.join(self.save_dir, self.metrics_file))
+        try:
+            for stage in range(start_stage, total_stages):
+                spec = stages[stage]
+                print(f"\n--- Stage {stage + 1}/{total_stages} {spec.name} [up to {spec.max_episodes} Episodes] ---")
+                self._apply_stage(spec)
+                scheduler.start_stage()
+                if stage == start_stage and self._resume_state is not None:
+                    # Same stage as the checkpoint: continue its evaluation history and park streams
+                    if self._resume_state["scheduler"] is not None:
+                        scheduler.load_state_dict(self._resume_state["scheduler"])
+                    if spec.env_fn is not None and self._resume_state["env"] is not None:
+                        self.env.restore(self._resume_state["env"])
+                self._resume_state = None
+                    
+                first = start_episode + 1 if stage == start_stage else 1
+                plateaued = False
+                for ep in range(first, spec.max_episodes + 1):
+                    self.iteration += 1
+                    if self.iteration == self.profile_at:
+                        self.profile(self.profile_iterations)
+                    self.profiler.begin(self.iteration)
+                    start = time.perf_counter()
+                    
+                    self.collect_rollouts(target_steps=self.buffer_size)
+                    self.update()
+                    self.stage, self.episode = stage, ep
+                    
+                    extra = {}
+                    if scheduler.adaptive and ep % scheduler.eval_every == 0:
+                        with self.timer.phase("evaluate"):
+                            extra["eval_return"] = self.evaluate(scheduler.eval_episodes)
+                        plateaued = scheduler.report(extra["eval_return"]) and ep >= spec.min_episodes
+                        # Without early_stop the final stage always spends its whole budget
+                        plateaued = plateaued and (stage < total_stages - 1 or scheduler.early_stop)
+                        extra["rolling_eval_return"] = scheduler.rolling_return
+                    last = plateaued or ep == spec.max_episodes
+                    self.stage_complete = last
+                    
+                    if ep % 50 == 0 or last:
+                        print(f"Stage {stage + 1} | Episode {ep} completed. Saving checkpoint...")
+                        with self.timer.phase("checkpoint"):
+                            self.save_checkpoint(f"stage_{stage+1}_ep_{ep}.pt")
+                    
+                    self._log_iteration(time.perf_counter() - start, **extra)
+                    trace = self.profiler.end(self.iteration, final=last and stage == total_stages - 1)
+                    if trace:
+                        print(f"Profiler trace: {trace}")
+                    if plateaued:
+                        print(f"Stage {stage + 1} plateaued after {ep} episodes (rolling eval return {scheduler.rolling_return:.3f})")
+                        break
                 
-                if ep % 50 == 0 or ep == num_episodes:
-                    print(f"Stage {stage + 1} | Episode {ep} completed. Saving checkpoint...")
-                    self.save_checkpoint(f"stage_{stage+1}_ep_{ep}.pt")
+                if plateaued and stage == total_stages - 1:
+                    print("Final stage plateaued, stopping early")
+            
+            # The run is over: a later train() call starts a fresh curriculum, and every checkpoint is on disk
+            self.stage, self.episode, self.stage_complete = 0, 0, False
+            self.checkpointer.wait()
+        finally:
+            if self.metrics is not None:
+                self.metrics.close()
+                self.metrics = None
+
+    def _apply_stage(self, spec: CurriculumStage) -> None:
+        """Configures the parks for a curriculum stage, swapping in the stage's env when it has one."""
+        if spec.env_fn is not None:
+            env = spec.env_fn()
+            if env.possible_agents != self.agents or env.num_envs != self.num_envs:
+                raise ValueError(f"Stage {spec.name!r} env must keep the trainer's {len(self.agents)} agents and {self.num_envs} parks")
+            self.env.close()
+            self.env = env
+        self.env.disruption_prob = spec.disruption_prob
+        if spec.max_steps is not None:
+            self.env.max_steps = spec.max_steps
+
+    def evaluate(self, episodes: int = 1) -> float:
+        """
+        Mean return of the deterministic policy: each park plays `episodes` full episodes, and the per-agent
+        episode returns are averaged. The parks are put back afterwards and the rollout buffers are left alone,
+        so evaluating does not disturb training.
+        """
+        current = self.env.snapshot()
+        returns = np.zeros((self.num_envs, len(self.agents)))
+        # No dropout, so the same weights always score the same
+        self.model.eval()
+        try:
+            for _ in range(episodes):
+                obs, _ = self.env.reset()
+                running = np.ones(self.num_envs, dtype=bool)
+                while running.any():
+                    actions, _, _ = self.model.get_actions_batch(obs, deterministic=True)
+                    obs, rewards, dones, truncs, _ = self.env.step(actions)
+                    returns[running] += rewards[running]
+                    # Finished parks auto-reset; they sit out until every park has finished this episode
+                    running &= ~(dones | truncs).any(axis=1)
+        finally:
+            self.model.train()
+            self.env.restore(current)
+        return float(returns.mean() / episodes)
+
+    def profile(self, iterations: int) -> None:
+        """Profiles the next `iterations` training iterations with torch.profiler; the trace lands in save_dir/traces."""
+        self.profiler.trigger(iterations)
 
-    def save_checkpoint(self, filename: str):
-        path = os.path.join(self.save_dir, filename)
-        state_dicts = {
-            "actors": {a: self.model.actors[a].state_dict() for a in self.agents},
-            "critic": self.model.critic.state_dict()
+    def _log_iteration(self, seconds: float, **extra) -> Dict:
+        """
+        Builds (and streams to the metrics file) one iteration's timings, throughput and update statistics;
+        every log_every-th iteration is also summarized on the console.
+        """
+        env_steps = self.buffer_size * self.num_envs
+        transitions = env_steps * len(self.agents)
+        samples = self.model.samples_seen - self._samples_seen
+        self._samples_seen = self.model.samples_seen
+        
+        record = {
+            "iteration": self.iteration,
+            "stage": self.stage + 1,
+            "episode": self.episode,
+            "seconds": seconds,
+            "phase_ms": self.timer.pop(),
+            "env_steps": env_steps,
+            "env_steps_per_sec": env_steps / seconds,
+            # Actor samples drawn by PPO per collected agent transition (about ppo_epochs)
+            "sample_reuse": samples / transitions,
+            "mean_reward": float(self.storage.views["rewards"].mean()),
+            "entropy_coef": self.model.entropy_coef,
+            **self.model.update_stats(),
+            **extra,
+        }
+        if self.metrics is not None:
+            self.metrics.write(record)
+        if self.iteration % self.log_every == 0:
+            print(f"Stage {record['stage']} | Episode {record['episode']} | {record['env_steps_per_sec']:.0f} env-steps/s | "
+                  f"reward {record['mean_reward']:.3f} | kl {record.get('approx_kl', 0.0):.4f}")
+        return record
+
+    def update(self) -> float:
+        """One PPO update on the collected rollouts; returns milliseconds per optimizer step."""
+        steps = self.model.update_steps
+        start = time.perf_counter()
+        with self.timer.phase("ppo_update"):
+            self.model.update(self.buffers, self.batch_size, self.ppo_epochs, self.global_states)
+        step_ms = (time.perf_counter() - start) * 1000.0 / max(1, self.model.update_steps - steps)
+        
+        if self.performance_mode:
+            self._track_performance(step_ms)
+        return step_ms
+
+    def _track_performance(self, step_ms: float):
+        self._performance_updates += 1
+        if self._performance_updates == 1:
+            self._eager_step_ms = step_ms
+            options = self.performance_mode if isinstance(self.performance_mode, dict) else {}
+            self.model.enable_performance_mode(**options)
+            print(f"Performance mode: eager baseline {step_ms:.2f} ms per optimizer step")
+        elif self._performance_updates == 3:
+            # Update 2 pays the one-off compilation, so update 3 is the first steady-state measurement
+            print(f"Performance mode: {self._eager_step_ms:.2f} -> {step_ms:.2f} ms per optimizer step "
+                  f"({self._eager_step_ms / step_ms:.2f}x, bf16={'on' if self.model.autocast_dtype is not None else 'off'})")
+            if step_ms >= self._eager_step_ms:
+                self.model.disable_performance_mode()
+                print("Performance mode: no speedup, falling back to eager execution")
+
+    def checkpoint_state(self) -> Dict:
+        """Full training state: weights, optimizers, entropy schedule, curriculum position, RNG and park streams."""
+        return {
+            **self.model.actor_state_dict(),
+            "critic": self.model.critic.state_dict(),
+            "training": self.model.training_state_dict(),
+            "curriculum": {"stage": self.stage, "episode": self.episode, "stage_complete": self.stage_complete,
+                           "iteration": self.iteration,
+                           "disruption_prob": self.env.disruption_prob,
+                           "scheduler": self.curriculum.state_dict() if self.curriculum is not None else None},
+            **self.stream_state(),
+        }
+
+    def stream_state(self) -> Dict:
+        """This process's global RNG state and park snapshots (streams and state of every park)."""
+        return {
+            "rng": rng_state(),
+            "env": blobs_to_tensors(self.env.snapshot()),
         }
-        torch.save(state_dicts, path)
-        print(f"Saved: {path}")
 
-    def load_checkpoint(self, filename: str):
-        path = os.path.join(self.save_dir, filename)
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Checkpoint {path} not found.")
+    def load_stream_state(self, state_dicts: Dict) -> Optional[List[bytes]]:
+        """Restores stream_state() from a checkpoint; returns the env blobs loaded (None if the parks were reseeded instead)."""
+        set_rng_state(state_dicts["rng"])
+        env_blobs = tensors_to_blobs(state_dicts["env"])
+        self.env.restore(env_blobs)
+        return env_blobs
+
+    def save_checkpoint(self, filename: str) -> str:
+        """Queues a full-state checkpoint; it is written in the background (see checkpointer.wait)."""
+        return self.checkpointer.save(self.checkpoint_state(), filename)
+
+    def load_checkpoint(self, filename: Optional[str] = None):
+        """
+        Restores a checkpoint from save_dir (the newest one without filename). Full-state checkpoints also
+        restore optimizers, RNG and park streams and the curriculum position, so train() continues the run
+        exactly; weights-only checkpoints just load the networks.
+        """
+        self.checkpointer.wait()
+        path = os.path.join(self.save_dir, filename) if filename else self.checkpointer.latest()
+        if path is None or not os.path.exists(path):
+            raise FileNotFoundError(f"Checkpoint {path or self.save_dir} not found.")
             
-        state_dicts = torch.load(path, map_location=self.model.device)
+        state_dicts = load_checkpoint_file(path, map_location=self.model.device)
         self.model.critic.load_state_dict(state_dicts["critic"])
-        for a in self.agents:
-            self.model.actors[a].load_state_dict(state_dicts["actors"][a])
+        self.model.load_actor_state_dict(state_dicts)
+        if "training" in state_dicts:
+            self.model.load_training_state_dict(state_dicts["training"])
+            curriculum = state_dicts["curriculum"]
+            self.stage, self.episode = curriculum["stage"], curriculum["episode"]
+            self.iteration = curriculum.get("iteration", 0)
+            if curriculum.get("stage_complete", False):
+                # The checkpoint closed its stage (budget spent or plateaued): resume at the next one
+                self.stage, self.episode = self.stage + 1, 0
+            self.env.disruption_prob = curriculum["disruption_prob"]
+            env_blobs = self.load_stream_state(state_dicts)
+            # train() re-applies the stage; it needs these again if the stage swaps in its own env
+            if not curriculum.get("stage_complete", False):
+                self._resume_state = {"scheduler": curriculum.get("scheduler"), "env": env_blobs}
         print(f"Loaded: {path}")
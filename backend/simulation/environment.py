@@ -1,13 +1,53 @@
 import functools
+import struct
 import numpy as np
-import random
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Optional, Union
 
 from pettingzoo import ParallelEnv
 from gymnasium.spaces import Box
 
 from simulation.factory_agent import FactoryAgent
-from simulation.resource_types import ResourceType
+from simulation.flow_log import FlowLog
+from simulation.park_state import ParkState, RESOURCES, NUM_RESOURCES
+from simulation.resource_types import ResourceFlow
+
+# snapshot() header: magic, format version, agent count, current step, disruption prob, episode live
+_SNAPSHOT_HEADER = struct.Struct("<4sHIqd?")
+_SNAPSHOT_MAGIC = b"SYMB"
+_SNAPSHOT_VERSION = 3
+# Seed record of the streams: pool size, spawn index of the first child, entropy word count, spawn key length
+_SEED_HEADER = struct.Struct("<IQII")
+_UINT64_MASK = (1 << 64) - 1
+
+def _pack_rng(generator: np.random.Generator) -> np.ndarray:
+    """PCG64 state as 6 uint64 words: state lo/hi, inc lo/hi, has_uint32, uinteger."""
+    state = generator.bit_generator.state
+    if state["bit_generator"] != "PCG64":
+        raise ValueError(f"Cannot snapshot {state['bit_generator']} streams, expected PCG64")
+    s, inc = state["state"]["state"], state["state"]["inc"]
+    return np.array([s & _UINT64_MASK, s >> 64, inc & _UINT64_MASK, inc >> 64, state["has_uint32"], state["uinteger"]], dtype=np.uint64)
+
+def _entropy_words(entropy) -> np.ndarray:
+    """SeedSequence entropy (an int or a sequence of ints) as the little-endian uint32 words it hashes."""
+    values = [entropy] if isinstance(entropy, (int, np.integer)) else list(entropy)
+    words = []
+    for value in values:
+        value = int(value)
+        words.append(value & 0xFFFFFFFF)
+        value >>= 32
+        while value:
+            words.append(value & 0xFFFFFFFF)
+            value >>= 32
+    return np.array(words, dtype=np.uint32)
+
+def _unpack_rng(generator: np.random.Generator, words: np.ndarray) -> None:
+    w = [int(x) for x in words]
+    generator.bit_generator.state = {
+        "bit_generator": "PCG64",
+        "state": {"state": w[0] | (w[1] << 64), "inc": w[2] | (w[3] << 64)},
+        "has_uint32": w[4],
+        "uinteger": w[5],
+    }
 
 class IndustrialParkEnv(ParallelEnv):
     metadata = {
@@ -15,17 +55,24 @@ class IndustrialParkEnv(ParallelEnv):
         "render_modes": ["ansi"]
     }
 
-    def __init__(self, agents: List[FactoryAgent], max_steps: int = 30, disruption_prob: float = 0.1):
+    def __init__(self, agents: List[FactoryAgent], max_steps: int = 30, disruption_prob: float = 0.1, flow_log: Optional[FlowLog] = None):
         super().__init__()
         
         self.factory_agents = {agent.agent_id: agent for agent in agents}
         self.possible_agents = [agent.agent_id for agent in agents]
+        self._agent_index = {agent_id: i for i, agent_id in enumerate(self.possible_agents)}
+        
+        # Park-level struct-of-arrays store; each FactoryAgent becomes a view over its row
+        self.park_state = ParkState.from_agents(agents)
+        # Starting park every reset returns to; trades only move cash between factories, so without it
+        # cash piles up at the producers over a few episodes and the market stops clearing
+        self._initial_state = self.park_state.to_bytes()
         self.agents = self.possible_agents[:]
         self.disruption_prob = disruption_prob
         
         # Action Space: [bid_price_mod, ask_price_mod, accept_threshold, negotiation_partner_focus, contract_duration, quality_tier]
         # Normalized values mostly from -1 to 1 or 0 to 1
-        obs_shape = 12
+        obs_shape = self.park_state.obs_dim
         action_shape = 6
         
         self._action_spaces = {
@@ -40,7 +87,14 @@ class IndustrialParkEnv(ParallelEnv):
         
         self.max_steps = max_steps
         self.current_step = 0
-        self.infos = {a: {} for a in self.possible_agents}
+        self.disrupted = np.zeros(len(self.possible_agents), dtype=bool)
+        # Trades cleared in the last step (see ParkState.clear_market); every tick's trades also
+        # stream into flow_log when one is attached
+        self.last_trades = {}
+        self.flow_log = flow_log
+        
+        # Unseeded streams until the first reset(seed=...)
+        self.seed_streams(None)
 
     @functools.lru_cache(maxsize=None)
     def observation_space(self, agent: str):
@@ -50,72 +104,296 @@ class IndustrialParkEnv(ParallelEnv):
     def action_space(self, agent: str):
         return self._action_spaces[agent]
 
-    def reset(self, seed: int = None, options: Dict = None):
+    def seed_streams(self, seed: Union[int, np.random.SeedSequence, None]) -> None:
+        """
+        Derives this env's independent Generator streams from one seed:
+        - np_random: disruption events, two uniforms per tick
+        - production_rng: (agents, resources) production noise per tick
+        - trading_rng: (agents,) order arrival times per tick, the market's tie-break between equal prices
+        - one stream per FactoryAgent for its standalone step_production/apply_action calls
+        Nothing touches the global `random` / `np.random` state, so parks never interfere.
+        Each stream draws a fixed-shape block per tick, so K ticks can be drawn in one call (see advance).
+        """
+        seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        # Kept for snapshot(): agent streams that were never drawn from are rebuilt from it on restore
+        self._stream_seed = (_entropy_words(seed_seq.entropy), tuple(seed_seq.spawn_key), seed_seq.n_children_spawned, seed_seq.pool_size)
+        events, production, trading, *agent_seqs = seed_seq.spawn(3 + len(self.possible_agents))
+        self.np_random = np.random.default_rng(events)
+        self.production_rng = np.random.default_rng(production)
+        self.trading_rng = np.random.default_rng(trading)
+        for agent_id, agent_seq in zip(self.possible_agents, agent_seqs):
+            self.factory_agents[agent_id].seed_rng(agent_seq)
+
+    @property
+    def infos(self) -> Dict[str, Dict[str, Any]]:
+        """PettingZoo-style per-agent infos, built on demand from the `disrupted` flags."""
+        return {a: {"disrupted": bool(self.disrupted[i])} for i, a in enumerate(self.possible_agents)}
+
+    def reset_array(self, seed: Union[int, np.random.SeedSequence, None] = None, options: Optional[Dict] = None):
+        """
+        Array-native reset: restores the park's starting inventory, cash and the rest of its state.
+        Returns (agents, obs_dim) observations in `possible_agents` order and infos as a dict of (agents,) arrays.
+        """
         self.agents = self.possible_agents[:]
         self.current_step = 0
+        self.park_state.load_bytes(self._initial_state)
         
+        # Without a seed the existing streams simply continue
         if seed is not None:
-            np.random.seed(seed)
-            random.seed(seed)
+            self.seed_streams(seed)
             
-        observations = {
-            agent: self.factory_agents[agent].get_state_vector()
-            for agent in self.agents
-        }
-        self.infos = {a: {"disrupted": False} for a in self.agents}
-        
+        self.disrupted[:] = False
+        self.last_trades = {}
+        return self.park_state.observations(), {"disrupted": self.disrupted.copy()}
+
+    def reset(self, seed: Union[int, np.random.SeedSequence, None] = None, options: Optional[Dict] = None):
+        obs, _ = self.reset_array(seed, options)
+        observations = {agent: obs[self._agent_index[agent]] for agent in self.agents}
         return observations, self.infos
 
-    def step(self, actions: Dict[str, np.ndarray]):
+    def step_array(self, actions: np.ndarray, rows: Optional[np.ndarray] = None):
+        """
+        Array-native step, no per-agent dicts.
+        actions: (agents, action_dim) in `possible_agents` order, or (len(rows), action_dim)
+        when only the agents at `rows` act this tick.
+        Returns obs (agents, obs_dim), rewards (agents,), dones (agents,), truncs (agents,)
+        and infos as a dict of (agents,) arrays. Agents that did not act get a zero reward.
+        """
         self.current_step += 1
-        
-        rewards = {}
-        flags_done = {}
-        flags_trunc = {}
-        observations = {}
+        num_agents = len(self.possible_agents)
         
         # Check for stochastic disruptions
-        disrupted_agents = []
-        if random.random() < self.disruption_prob:
+        self.disrupted[:] = False
+        event = self.np_random.random(2)
+        if self.agents and event[0] < self.disruption_prob:
             # Pick a random agent to suffer a supply shock / equipment failure
-            unlucky_agent = random.choice(self.agents)
-            disrupted_agents.append(unlucky_agent)
-            
-        # Phase 1: Production (Physics)
-        for agent_id in self.agents:
-            is_disrupted = agent_id in disrupted_agents
-            self.factory_agents[agent_id].step_production(is_disrupted=is_disrupted)
-            self.infos[agent_id] = {"disrupted": is_disrupted}
+            unlucky_agent = self.agents[int(event[1] * len(self.agents))]
+            self.disrupted[self._agent_index[unlucky_agent]] = True
             
-        # Phase 2: Negotiation (Actions applied conceptually)
-        for agent_id, action in actions.items():
-            self.factory_agents[agent_id].apply_action(action)
+        # Phase 1: Production (Physics), vectorized over the whole park
+        self.park_state.step_production(self.disrupted, self.production_rng.random((num_agents, NUM_RESOURCES)))
             
-            # Dummy logic, but tracking interactions for attention memory
-            # Randomly pair them for demo purposes
-            if random.random() > 0.5:
-                partner_idx = float(self.possible_agents.index(random.choice(self.possible_agents)))
-                self.factory_agents[agent_id].record_interaction(partner_idx)
-            
-            # Calculate mock rewards
-            profit_loss = np.random.normal(10, 5) # Placeholder
-            rewards[agent_id] = self.factory_agents[agent_id].calculate_reward(profit_loss, risk_factor=0.1)
+        # Phase 2: Market clearing, one batched double auction per resource over the acting agents
+        rewards = np.zeros(num_agents)
+        self.last_trades = {}
+        if rows is None:
+            rows = np.arange(num_agents)
+        if len(rows):
+            arrival = self.trading_rng.random(len(rows))
+            self.last_trades = self.park_state.clear_market(np.asarray(actions, dtype=np.float64), arrival, rows)
+            rewards[rows] = self.park_state.calculate_rewards(self.last_trades["profit"], risk_factor=0.1, rows=rows)
+            if self.flow_log is not None:
+                self.flow_log.append_trades(self.last_trades, self.current_step)
 
         # Build observations and termination flags
         is_done = self.current_step >= self.max_steps
-        for agent_id in self.agents:
-            flags_done[agent_id] = is_done
-            flags_trunc[agent_id] = False
-            observations[agent_id] = self.factory_agents[agent_id].get_state_vector()
-            
+        dones = np.full(num_agents, is_done)
+        truncs = np.zeros(num_agents, dtype=bool)
         if is_done:
             self.agents = []
 
-        return observations, rewards, flags_done, flags_trunc, self.infos
+        return self.park_state.observations(), rewards, dones, truncs, {"disrupted": self.disrupted.copy()}
+
+    def step(self, actions: Dict[str, np.ndarray]):
+        """PettingZoo dict API over step_array; only agents present in `actions` act."""
+        live = self.agents
+        acting = list(actions.keys())
+        rows = np.array([self._agent_index[a] for a in acting], dtype=np.intp)
+        action_matrix = np.stack([np.asarray(actions[a], dtype=np.float64) for a in acting]) if acting else None
+        obs, rewards, dones, truncs, _ = self.step_array(action_matrix, rows)
+        
+        observations = {a: obs[self._agent_index[a]] for a in live}
+        flags_done = {a: bool(dones[self._agent_index[a]]) for a in live}
+        flags_trunc = {a: bool(truncs[self._agent_index[a]]) for a in live}
+        agent_rewards = {a: float(rewards[r]) for a, r in zip(acting, rows)}
+        return observations, agent_rewards, flags_done, flags_trunc, self.infos
+
+    def resource_flows(self) -> List[ResourceFlow]:
+        """Trades cleared in the last step as ResourceFlow records (seller -> buyer)."""
+        trades = self.last_trades
+        if not trades:
+            return []
+        return [
+            ResourceFlow(self.possible_agents[s], self.possible_agents[b], RESOURCES[r], float(q), float(p), self.current_step)
+            for r, b, s, q, p in zip(trades["resource"], trades["buyer"], trades["seller"], trades["quantity"], trades["price"])
+        ]
+
+    def advance(self, k: int, policy: Union[np.ndarray, Callable[[np.ndarray], np.ndarray], None] = None, decimate: Optional[int] = None, chunk_size: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Fast-forwards the park k ticks without building per-step dicts or trade records
+        (cleared trades still stream into flow_log when one is attached).
+        policy: None (all-zero actions), a fixed (agents, action_dim) array, a scripted
+        (k, agents, action_dim) array, or a callable mapping (agents, obs_dim) observations to actions.
+        Noise for up to chunk_size ticks is drawn in one call per stream, consuming the streams exactly
+        as k step() calls with every agent acting would. Array policies advance a whole chunk per
+        ParkState.advance call; callables are queried every tick. The market still clears every tick.
+        Runs straight through max_steps; as in step(), no disruptions hit once the episode has ended.
+        Returns per-tick park aggregates, cumulative per-agent rewards and, with decimate=d,
+        full observations / cash / inventory every d-th tick.
+        """
+        ps = self.park_state
+        num_agents = len(self.possible_agents)
+        action_dim = self._action_spaces[self.possible_agents[0]].shape[0]
+        if chunk_size is None:
+            # Bound the pre-drawn (chunk, agents, resources) blocks to ~1M elements each
+            chunk_size = max(1, (1 << 20) // (num_agents * NUM_RESOURCES))
+        
+        if policy is None:
+            policy = np.zeros((num_agents, action_dim))
+        scripted = not callable(policy)
+        if scripted:
+            policy = np.asarray(policy, dtype=np.float64)
+            if policy.ndim == 2:
+                policy = np.broadcast_to(policy, (k, num_agents, action_dim))
+        
+        result = {
+            "ticks": self.current_step + 1 + np.arange(k),
+            "reward_mean": np.empty(k),
+            "cash_total": np.empty(k),
+            "inventory_fill": np.empty((k, NUM_RESOURCES)), # mean inventory / capacity per resource
+            "traded_volume": np.empty((k, NUM_RESOURCES)), # units cleared per resource
+            "disrupted_agent": np.full(k, -1, dtype=np.int64), # row of the disrupted agent, -1 if none
+            "cumulative_reward": np.zeros(num_agents),
+        }
+        kept = np.arange(decimate - 1, k, decimate) if decimate else np.empty(0, dtype=np.int64)
+        if decimate:
+            result["decimated_ticks"] = result["ticks"][kept]
+            result["observations"] = np.empty((len(kept), num_agents, ps.obs_dim), dtype=np.float32)
+            result["cash"] = np.empty((len(kept), num_agents))
+            result["inventory"] = np.empty((len(kept), num_agents, NUM_RESOURCES))
+        
+        inverse_capacity = 1.0 / np.where(ps.capacity > 0, ps.capacity, np.inf)
+        flow_log = self.flow_log
+        # step() only draws a victim while self.agents is live, i.e. up to and including the tick reaching max_steps
+        live_ticks = max(1, self.max_steps - self.current_step) if self.agents else 0
+        for start in range(0, k, chunk_size):
+            c = min(chunk_size, k - start)
+            # Bulk draws for the whole chunk, one call per stream
+            events = self.np_random.random((c, 2))
+            production_noise = self.production_rng.random((c, num_agents, NUM_RESOURCES))
+            arrival = self.trading_rng.random((c, num_agents))
+            
+            live = start + np.arange(c) < live_ticks
+            victims = np.where(live & (events[:, 0] < self.disruption_prob), (events[:, 1] * num_agents).astype(np.int64), -1)
+            
+            blocks = [(0, c)] if scripted else [(t, t + 1) for t in range(c)]
+            for lo, hi in blocks:
+                a, b = start + lo, start + hi
+                actions = policy[a:b] if scripted else np.asarray(policy(ps.observations()), dtype=np.float64)[None]
+                kept_here = kept[(kept >= a) & (kept < b)]
+                traj = ps.advance(
+                    victims[lo:hi], production_noise[lo:hi], actions, arrival[lo:hi], risk_factor=0.1,
+                    observe_at=kept_here - a if decimate else None,
+                    on_trades=None if flow_log is None else (
+                        lambda t, trades, first=result["ticks"][a]: flow_log.append_trades(trades, first + t)
+                    ),
+                )
+                
+                result["reward_mean"][a:b] = traj["rewards"].mean(axis=1)
+                result["cash_total"][a:b] = traj["cash"].sum(axis=1)
+                result["inventory_fill"][a:b] = np.einsum("tnr,nr->tr", traj["inventory"], inverse_capacity) / num_agents
+                result["traded_volume"][a:b] = traj["traded_volume"]
+                result["disrupted_agent"][a:b] = victims[lo:hi]
+                result["cumulative_reward"] += traj["rewards"].sum(axis=0)
+                if len(kept_here):
+                    m = kept_here // decimate
+                    result["observations"][m] = traj["observations"]
+                    result["cash"][m] = traj["cash"][kept_here - a]
+                    result["inventory"][m] = traj["inventory"][kept_here - a]
+        
+        self.current_step += k
+        self.last_trades = {}
+        last_victim = result["disrupted_agent"][-1] if k else -1
+        self.disrupted[:] = False
+        if last_victim >= 0:
+            self.disrupted[last_victim] = True
+        if self.current_step >= self.max_steps:
+            self.agents = []
+        return result
+
+    def _rng_streams(self) -> List[np.random.Generator]:
+        return [self.np_random, self.production_rng, self.trading_rng]
+
+    def _agent_seed(self, i: int) -> np.random.SeedSequence:
+        """Seed that seed_streams gave agent i, rebuilt from the recorded stream seed (same as SeedSequence.spawn)."""
+        entropy, spawn_key, first, pool_size = self._stream_seed
+        return np.random.SeedSequence([int(w) for w in entropy], spawn_key=spawn_key + (first + 3 + i,), pool_size=pool_size)
+
+    def snapshot(self) -> bytes:
+        """
+        Serializes the full mutable park state into a compact binary blob:
+        header | ParkState arrays | per-agent disrupted flags | per-agent "stream in use" flags |
+        PCG64 words of the env streams, then of every agent stream that has been drawn from |
+        seed record (the SeedSequence the streams were seeded from).
+        Agent streams never used since seeding are rebuilt from the seed record, so they cost one byte.
+        """
+        agents = [self.factory_agents[a] for a in self.possible_agents]
+        header = _SNAPSHOT_HEADER.pack(
+            _SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, len(agents),
+            self.current_step, self.disruption_prob, bool(self.agents),
+        )
+        in_use = np.array([agent._rng is not None for agent in agents], dtype=bool)
+        streams = self._rng_streams() + [agent.rng for agent, used in zip(agents, in_use) if used]
+        rng_words = np.concatenate([_pack_rng(g) for g in streams])
+        entropy, spawn_key, first, pool_size = self._stream_seed
+        seed_record = b"".join((
+            _SEED_HEADER.pack(pool_size, first, len(entropy), len(spawn_key)),
+            entropy.tobytes(), np.array(spawn_key, dtype=np.uint64).tobytes(),
+        ))
+        return b"".join((header, self.park_state.to_bytes(), self.disrupted.tobytes(), in_use.tobytes(), rng_words.tobytes(), seed_record))
+
+    def restore(self, blob: bytes) -> None:
+        """Loads a snapshot() blob taken from this env (or any env built from the same scenario) in place."""
+        magic, version, num_agents, current_step, disruption_prob, live = _SNAPSHOT_HEADER.unpack_from(blob)
+        if magic != _SNAPSHOT_MAGIC or version != _SNAPSHOT_VERSION:
+            raise ValueError("Not a park snapshot or unsupported snapshot version")
+        if num_agents != len(self.possible_agents):
+            raise ValueError(f"Snapshot has {num_agents} agents, env has {len(self.possible_agents)}")
+        
+        view = memoryview(blob)
+        offset = _SNAPSHOT_HEADER.size
+        self.park_state.load_bytes(view[offset:])
+        offset += self.park_state.nbytes
+        disrupted = np.frombuffer(view, dtype=bool, count=num_agents, offset=offset)
+        offset += num_agents
+        in_use = np.frombuffer(view, dtype=bool, count=num_agents, offset=offset)
+        offset += num_agents
+        
+        num_streams = 3 + int(in_use.sum())
+        rng_words = np.frombuffer(view, dtype=np.uint64, count=6 * num_streams, offset=offset).reshape(num_streams, 6)
+        offset += rng_words.nbytes
+        pool_size, first, num_entropy, num_keys = _SEED_HEADER.unpack_from(view, offset)
+        offset += _SEED_HEADER.size
+        entropy = np.frombuffer(view, dtype=np.uint32, count=num_entropy, offset=offset).copy()
+        offset += entropy.nbytes
+        spawn_key = tuple(int(k) for k in np.frombuffer(view, dtype=np.uint64, count=num_keys, offset=offset))
+        self._stream_seed = (entropy, spawn_key, first, pool_size)
+        
+        # Unused agent streams restart from the snapshot's seed record, not whatever seed the agent holds now
+        agents = [self.factory_agents[a] for a in self.possible_agents]
+        for i, (agent, used) in enumerate(zip(agents, in_use)):
+            if not used:
+                agent.seed_rng(self._agent_seed(i))
+        streams = self._rng_streams() + [agent.rng for agent, used in zip(agents, in_use) if used]
+        for generator, words in zip(streams, rng_words):
+            _unpack_rng(generator, words)
+        
+        self.current_step = current_step
+        self.disruption_prob = disruption_prob
+        self.agents = self.possible_agents[:] if live else []
+        self.disrupted[:] = disrupted
+
+    def apply_disruption(self, agent_id: str) -> None:
+        """Forces the supply shock a stochastic disruption causes (halved production schedule) on one agent."""
+        row = self._agent_index[agent_id]
+        schedule = self.park_state.production_schedule
+        schedule[row] = max(0.1, schedule[row] * 0.5)
+        self.disrupted[row] = True
 
     def render(self):
         print(f"--- Step {self.current_step} ---")
-        for a in self.possible_agents:
-            state = self.factory_agents[a].get_state_vector()
-            disruption_str = "[DISRUPTED] " if self.infos.get(a, {}).get("disrupted", False) else ""
+        obs = self.park_state.observations()
+        for i, a in enumerate(self.possible_agents):
+            state = obs[i]
+            disruption_str = "[DISRUPTED] " if self.disrupted[i] else ""
             print(f"{disruption_str}{a}: Cash={state[6]*10000:.2f} Rep={state[7]:.2f}")
@@ -1,104 +1,166 @@
 import numpy as np
 from enum import Enum
-from typing import Dict, Optional, Tuple, List
-from collections import deque
+from collections.abc import MutableMapping
 
 from simulation.resource_types import ResourceType
+from simulation.park_state import (
+    ParkState, RESOURCES, RESOURCE_INDEX, NUM_RESOURCES,
+    TYPE_PRODUCER, TYPE_CONSUMER, TYPE_CONVERTER,
+)
 
 class AgentType(Enum):
     PRODUCER = "producer"
     CONSUMER = "consumer"
     CONVERTER = "converter"
 
+class _ResourceRow(MutableMapping):
+    """Dict-style {ResourceType: float} access to one agent's row of a (agents, resources) ParkState array."""
+    def __init__(self, agent: "FactoryAgent", field: str):
+        self._agent = agent
+        self._field = field
+
+    def _array(self) -> np.ndarray:
+        return getattr(self._agent._state, self._field)
+
+    def __getitem__(self, resource: ResourceType) -> float:
+        return float(self._array()[self._agent._row, RESOURCE_INDEX[resource]])
+
+    def __setitem__(self, resource: ResourceType, value: float) -> None:
+        self._array()[self._agent._row, RESOURCE_INDEX[resource]] = value
+
+    def __delitem__(self, resource: ResourceType) -> None:
+        raise TypeError("Resources cannot be removed from a factory")
+
+    def __iter__(self):
+        return iter(RESOURCES)
+
+    def __len__(self) -> int:
+        return NUM_RESOURCES
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+def _row_property(field: str, cast=float):
+    """Scalar attribute backed by this agent's entry in a per-agent ParkState array."""
+    def getter(self):
+        return cast(getattr(self._state, field)[self._row])
+
+    def setter(self, value):
+        getattr(self._state, field)[self._row] = value
+
+    return property(getter, setter)
+
+AGENT_TYPE_CODES = {
+    AgentType.PRODUCER: TYPE_PRODUCER,
+    AgentType.CONSUMER: TYPE_CONSUMER,
+    AgentType.CONVERTER: TYPE_CONVERTER,
+}
+_CODE_TYPES = {code: agent_type for agent_type, code in AGENT_TYPE_CODES.items()}
+
 class FactoryAgent:
+    """
+    Thin view over one row of a ParkState.
+    A freshly created agent owns a single-row store; IndustrialParkEnv stacks all agents
+    into one park-level ParkState and rebinds each agent to its row.
+    """
+    cash = _row_property("cash")
+    reputation = _row_property("reputation") # Score from 0 to 1
+    production_schedule = _row_property("production_schedule") # Factor of normal operation
+    alpha_carbon = _row_property("alpha_carbon")
+    beta_reputation = _row_property("beta_reputation")
+    gamma_risk = _row_property("gamma_risk")
+    current_reward = _row_property("current_reward")
+    carbon_emissions = _row_property("carbon_emissions")
+
     def __init__(self, agent_id: str, name: str, agent_type: AgentType, initial_cash: float, num_agents_in_park: int = 3):
         self.agent_id = agent_id
         self.name = name
-        self.type = agent_type
-        
-        # State vector
-        self.inventory: Dict[ResourceType, float] = {r: 0.0 for r in ResourceType}
-        self.capacity: Dict[ResourceType, float] = {r: 100.0 for r in ResourceType} # max storage
-        self.cash = initial_cash
-        self.reputation = 1.0 # Score from 0 to 1
-        self.production_schedule = 1.0 # Factor of normal operation
-        
+
         # Attention Memory: Tracks the index of the last 3 agents interacted with (0 to N-1)
         # We'll use -1.0 to represent "no recent interaction"
         self.attention_memory_size = 3
-        self.attention_memory = deque([-1.0] * self.attention_memory_size, maxlen=self.attention_memory_size)
-        
-        # Simulation configs
-        self.alpha_carbon = 50.0
-        self.beta_reputation = 10.0
-        self.gamma_risk = 5.0
+        self._bind(ParkState(1, attention_memory_size=self.attention_memory_size), 0)
+
+        self.type = agent_type
+        self.cash = initial_cash
         
-        self.current_reward = 0.0
-        self.carbon_emissions = 0.0
+        # Private noise stream; IndustrialParkEnv re-derives it from the env seed on reset(seed=...)
+        self.seed_rng(None)
+
+        # State vector views
+        self.inventory = _ResourceRow(self, "inventory")
+        self.capacity = _ResourceRow(self, "capacity") # max storage
+
+    @classmethod
+    def view(cls, state: ParkState, row: int, agent_id: str, name: str) -> "FactoryAgent":
+        """Creates an agent directly over an existing ParkState row (no single-row store), for bulk park generation."""
+        agent = cls.__new__(cls)
+        agent.agent_id = agent_id
+        agent.name = name
+        agent.attention_memory_size = state.attention_memory_size
+        agent._bind(state, row)
+        agent.seed_rng(None)
+        agent.inventory = _ResourceRow(agent, "inventory")
+        agent.capacity = _ResourceRow(agent, "capacity")
+        return agent
+
+    def _bind(self, state: ParkState, row: int) -> None:
+        self._state = state
+        self._row = row
+        self._rows = slice(row, row + 1)
+
+    def seed_rng(self, seed) -> None:
+        self._rng_seed = seed
+        self._rng = None
+
+    @property
+    def rng(self) -> np.random.Generator:
+        # Built on first use, so parks that never call the standalone methods don't carry n live streams
+        if self._rng is None:
+            self._rng = np.random.default_rng(self._rng_seed)
+        return self._rng
+
+    @property
+    def type(self) -> AgentType:
+        return _CODE_TYPES[int(self._state.agent_type[self._row])]
+
+    @type.setter
+    def type(self, agent_type: AgentType) -> None:
+        self._state.agent_type[self._row] = AGENT_TYPE_CODES[agent_type]
+
+    @property
+    def attention_memory(self) -> np.ndarray:
+        # Oldest interaction first, most recent last
+        return self._state.attention_memory[self._row]
 
     def get_state_vector(self) -> np.ndarray:
         # Normalize and vectorize state for neural network
         # 6 resources + cash + reputation + prod scale (9) + attention memory (3) = 12 dims
-        inv = [self.inventory[r] / self.capacity[r] if self.capacity[r] > 0 else 0 for r in ResourceType]
-        return np.array([
-            *inv,
-            self.cash / 10000.0, # scaled
-            self.reputation,
-            self.production_schedule,
-            *self.attention_memory
-        ], dtype=np.float32)
+        return self._state.observations(self._rows)[0]
         
     def record_interaction(self, partner_agent_index: float) -> None:
         """Called by the environment when a successful negotiation occurs."""
-        self.attention_memory.append(partner_agent_index)
+        self._state.record_interactions(self._rows, partner_agent_index)
 
     def step_production(self, is_disrupted: bool = False) -> None:
         """Called every simulation tick to update inventory based on production profile."""
-        if is_disrupted:
-            # Simulate a 50% drop in production due to equipment failure or supply shock
-            self.production_schedule = max(0.1, self.production_schedule * 0.5)
-        else:
-            # Slowly recover normal production schedule
-            self.production_schedule = min(1.0, self.production_schedule + 0.1)
-        
-        import random
-        # Base generation/consumption
-        for r in ResourceType:
-            if self.type == AgentType.PRODUCER:
-                self.inventory[r] = min(self.capacity.get(r, 100.0), self.inventory[r] + random.uniform(2, 8) * self.production_schedule)
-            elif self.type == AgentType.CONSUMER:
-                self.inventory[r] = max(0.0, self.inventory[r] - random.uniform(2, 8) * self.production_schedule)
-            else:
-                 # Converter fluctuates
-                 self.inventory[r] = max(0.0, min(self.capacity.get(r, 100.0), self.inventory[r] + random.uniform(-5, 5) * self.production_schedule))
+        noise = self.rng.random((1, NUM_RESOURCES))
+        self._state.step_production(np.array([is_disrupted]), noise, self._rows)
 
     def apply_action(self, action: np.ndarray) -> None:
         """
         Translates raw ND array action to concrete effects.
         Action vector (dim 6): [bid_price_mod, ask_price_mod, accept_threshold, negotiation_partner_focus, contract_duration, quality_tier]
         """
-        import random
-        # Fake logic to simulate trading impacts on inventory and cash
-        trade_volume = (action[0] + 1.0) * 10 * self.production_schedule # 0 to 20
-        profit_loss = (action[1] * 50) - 10 # random profit
-        self.cash += profit_loss
-
-        # Randomly adjust inventory to simulate active P2P trades
-        for r in ResourceType:
-            change = random.uniform(-15, 15) * self.production_schedule
-            self.inventory[r] = max(0.0, min(self.capacity.get(r, 100.0), self.inventory[r] + change))
+        noise = self.rng.random((1, NUM_RESOURCES))
+        self._state.apply_actions(np.asarray(action)[None, :], noise, self._rows)
         
     def calculate_reward(self, profit: float, risk_factor: float) -> float:
         """
         Reward function: profit + α·carbon + β·reputation − γ·risk
         Assumes carbon_emissions is negative value if saved
         """
-        reward = profit 
-        reward -= self.alpha_carbon * self.carbon_emissions 
-        reward += self.beta_reputation * self.reputation
-        reward -= self.gamma_risk * risk_factor
-        self.current_reward = reward
-        return reward
+        return float(self._state.calculate_rewards(np.array([profit]), risk_factor, self._rows)[0])
 
 # Factory Profiles Generator
 def create_steel_mill(agent_id: str) -> FactoryAgent:
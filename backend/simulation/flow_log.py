@@ -0,0 +1,202 @@
+import os
+import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Union
+
+from simulation.park_state import RESOURCES
+from simulation.resource_types import ResourceFlow
+
+# Column layout of the log; source/target are park rows (seller -> buyer), resource a ResourceType index
+FLOW_COLUMNS = {
+    "source": np.int32,
+    "target": np.int32,
+    "resource": np.int8,
+    "quantity": np.float64,
+    "price": np.float64,
+    "timestamp": np.int64,
+}
+
+_EXTENSIONS = {"parquet": "parquet", "arrow": "arrow"}
+
+def _require_pyarrow() -> None:
+    # pyarrow is only needed for export; checked before any rows are handed to the exporter thread
+    try:
+        import pyarrow # noqa: F401
+    except ImportError as e:
+        raise ImportError("FlowLog export needs pyarrow (pip install pyarrow)") from e
+
+def _write_chunks(paths: List[str], chunks: List[Dict[str, np.ndarray]], agent_ids: Optional[List[str]], file_format: str) -> List[str]:
+    """Writes each chunk to its own file (runs on the exporter thread)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    resource_names = pa.array([r.value for r in RESOURCES])
+    names = pa.array(agent_ids) if agent_ids is not None else None
+    for path, chunk in zip(paths, chunks):
+        columns = {}
+        for name, values in chunk.items():
+            array = pa.array(values)
+            # Ids go out as dictionary columns so readers see names while files keep the int codes
+            if name in ("source", "target") and names is not None:
+                array = pa.DictionaryArray.from_arrays(array, names)
+            elif name == "resource":
+                array = pa.DictionaryArray.from_arrays(array, resource_names)
+            columns[name] = array
+        table = pa.table(columns)
+
+        # Write next to the target and rename, so readers never see a half-written file
+        partial = path + ".partial"
+        if file_format == "parquet":
+            pq.write_table(table, partial)
+        else:
+            with pa.OSFile(partial, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(partial, path)
+    return paths
+
+class FlowLog:
+    """
+    Preallocated columnar ring buffer of ResourceFlow events (see FLOW_COLUMNS).
+    Trades are appended as whole arrays per tick; once `capacity` rows are stored the oldest are overwritten.
+    columns() / segments() hand out zero-copy NumPy views for analytics.
+    flush() exports the rows appended since the previous flush to Parquet or Arrow IPC files in chunks of
+    chunk_rows, on a background thread: the caller only copies the pending rows out of the ring.
+    With spill_dir set, append() flushes on its own whenever chunk_rows rows are pending, so a long run
+    streams every trade to disk while memory stays bounded.
+    """
+    def __init__(self, capacity: int = 1 << 20, agent_ids: Optional[Sequence[str]] = None,
+                 spill_dir: Optional[str] = None, chunk_rows: Optional[int] = None, file_format: str = "parquet"):
+        if file_format not in _EXTENSIONS:
+            raise ValueError(f"Unknown flow export format {file_format!r}, expected one of {list(_EXTENSIONS)}")
+        self.capacity = capacity
+        self.agent_ids = list(agent_ids) if agent_ids is not None else None
+        self.spill_dir = spill_dir
+        self.chunk_rows = chunk_rows or max(1, capacity // 4)
+        self.file_format = file_format
+
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in FLOW_COLUMNS.items()}
+        self._total = 0 # rows ever appended
+        self._exported = 0 # rows handed to the exporter (or lost to overwrites before it)
+        self.dropped = 0 # rows overwritten before they were exported
+        self._file_index = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: List[Future] = []
+
+    def __len__(self) -> int:
+        return min(self._total, self.capacity)
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+    def append(self, source: np.ndarray, target: np.ndarray, resource: np.ndarray,
+               quantity: np.ndarray, price: np.ndarray, timestamp: Union[int, np.ndarray]) -> None:
+        """Appends a batch of flows; timestamp may be one tick for the whole batch."""
+        n = len(quantity)
+        if n == 0:
+            return
+        values = {
+            "source": source, "target": target, "resource": resource,
+            "quantity": quantity, "price": price, "timestamp": np.broadcast_to(timestamp, (n,)),
+        }
+        # A batch larger than the ring only keeps its newest rows
+        skip = max(0, n - self.capacity)
+        pos = (self._total + skip) % self.capacity
+        first = min(n - skip, self.capacity - pos)
+        for name, column in self._columns.items():
+            v = values[name]
+            column[pos:pos + first] = v[skip:skip + first]
+            column[:n - skip - first] = v[skip + first:]
+        self._total += n
+
+        if self.spill_dir is not None and self._total - self._exported >= self.chunk_rows:
+            self.flush()
+
+    def append_trades(self, trades: Dict[str, np.ndarray], timestamp: int) -> None:
+        """Appends one tick of ParkState.clear_market output (sellers are the flow source)."""
+        if trades:
+            self.append(trades["seller"], trades["buyer"], trades["resource"], trades["quantity"], trades["price"], timestamp)
+
+    def _slices(self, start: int, stop: int) -> List[slice]:
+        """Storage slices holding absolute rows [start, stop), oldest first."""
+        lo, hi = start % self.capacity, stop % self.capacity
+        if stop - start == 0:
+            return []
+        if lo < hi or hi == 0:
+            return [slice(lo, hi or self.capacity)]
+        return [slice(lo, self.capacity), slice(0, hi)]
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Zero-copy views of every stored row in storage order (chronological until the ring wraps)."""
+        return {name: column[:len(self)] for name, column in self._columns.items()}
+
+    def segments(self) -> List[Dict[str, np.ndarray]]:
+        """Stored rows in chronological order as one or two zero-copy column dicts."""
+        return [
+            {name: column[s] for name, column in self._columns.items()}
+            for s in self._slices(self._total - len(self), self._total)
+        ]
+
+    def to_flows(self, last: Optional[int] = None) -> List[ResourceFlow]:
+        """The newest `last` rows (default all stored) as ResourceFlow records, oldest first."""
+        count = len(self) if last is None else min(last, len(self))
+        flows = []
+        for s in self._slices(self._total - count, self._total):
+            c = {name: column[s] for name, column in self._columns.items()}
+            for src, dst, r, q, p, t in zip(c["source"], c["target"], c["resource"], c["quantity"], c["price"], c["timestamp"]):
+                flows.append(ResourceFlow(self._agent_id(src), self._agent_id(dst), RESOURCES[r], float(q), float(p), int(t)))
+        return flows
+
+    def _agent_id(self, row: int) -> str:
+        return self.agent_ids[row] if self.agent_ids is not None else str(int(row))
+
+    def flush(self, directory: Optional[str] = None) -> Optional[Future]:
+        """
+        Exports the rows appended since the last flush to `directory` (default spill_dir) without
+        blocking on the write. Returns a Future with the written paths, or None if nothing was pending.
+        """
+        directory = directory or self.spill_dir
+        if directory is None:
+            raise ValueError("FlowLog.flush needs a directory when no spill_dir is set")
+        _require_pyarrow()
+        start = max(self._exported, self._total - self.capacity)
+        self.dropped += start - self._exported
+        if start == self._total:
+            self._exported = start
+            return None
+
+        # Copy pending rows out of the ring now; the background write then can't race with appends
+        paths, chunks = [], []
+        for lo in range(start, self._total, self.chunk_rows):
+            hi = min(lo + self.chunk_rows, self._total)
+            parts = self._slices(lo, hi)
+            chunks.append({name: np.concatenate([column[s] for s in parts]) for name, column in self._columns.items()})
+            paths.append(os.path.join(directory, f"flows-{self._file_index:06d}.{_EXTENSIONS[self.file_format]}"))
+            self._file_index += 1
+        self._exported = self._total
+
+        os.makedirs(directory, exist_ok=True)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="flow-log")
+        future = self._executor.submit(_write_chunks, paths, chunks, self.agent_ids, self.file_format)
+        self._pending.append(future)
+        return future
+
+    def close(self) -> List[str]:
+        """Flushes what is left (when spilling), waits for every pending export and stops the exporter thread."""
+        if self.spill_dir is not None:
+            self.flush()
+        written = []
+        for future in self._pending:
+            written.extend(future.result())
+        self._pending = []
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        return written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
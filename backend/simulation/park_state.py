@@ -0,0 +1,304 @@
+import numpy as np
+from typing import Callable, Dict, List, Optional, Union
+
+from simulation.resource_types import ResourceType
+from economics.auctions import match_orders_batched
+
+RESOURCES: List[ResourceType] = list(ResourceType)
+NUM_RESOURCES = len(RESOURCES)
+RESOURCE_INDEX = {r: i for i, r in enumerate(RESOURCES)}
+
+# Integer codes for agent profiles, stored per row in ParkState.agent_type
+TYPE_PRODUCER = 0
+TYPE_CONSUMER = 1
+TYPE_CONVERTER = 2
+
+# Per-tick inventory drift is low + span * U(0, 1), looked up by agent type code:
+# producers gain U(2, 8), consumers lose U(2, 8), converters fluctuate U(-5, 5)
+_PRODUCTION_LOW = np.array([2.0, -2.0, -5.0])
+_PRODUCTION_SPAN = np.array([6.0, -6.0, 10.0])
+
+# Reference price per unit of each resource (ResourceType order); bid/ask modifiers scale it by ±50%
+BASE_PRICES = np.array([50.0, 5.0, 20.0, 80.0, 10.0, 30.0])
+
+# Factories trade towards holding this share of their storage capacity
+TARGET_FILL = 0.5
+
+Rows = Union[slice, np.ndarray]
+
+def _build_observations(inventory: np.ndarray, capacity: np.ndarray, cash: np.ndarray, reputation: np.ndarray,
+                        production_schedule: np.ndarray, attention_memory: np.ndarray) -> np.ndarray:
+    obs = np.empty((inventory.shape[0], NUM_RESOURCES + 3 + attention_memory.shape[1]), dtype=np.float32)
+    # Zero-capacity resources report an empty fill ratio
+    obs[:, :NUM_RESOURCES] = inventory / np.where(capacity > 0, capacity, np.inf)
+    obs[:, NUM_RESOURCES] = cash / 10000.0 # scaled
+    obs[:, NUM_RESOURCES + 1] = reputation
+    obs[:, NUM_RESOURCES + 2] = production_schedule
+    obs[:, NUM_RESOURCES + 3:] = attention_memory
+    return obs
+
+
+class ParkState:
+    """
+    Struct-of-arrays state for every factory in a park.
+    Row i of each array belongs to agent i, resource columns follow ResourceType order.
+    All physics (production, trading impacts, rewards, observations) runs as array ops
+    over a set of rows, so one call updates the whole park.
+    """
+    # Array fields that make up the full per-agent state (used for stacking/copying rows)
+    FIELDS = (
+        "inventory", "capacity", "cash", "reputation", "production_schedule",
+        "attention_memory", "agent_type", "alpha_carbon", "beta_reputation",
+        "gamma_risk", "current_reward", "carbon_emissions",
+    )
+
+    def __init__(self, num_agents: int, attention_memory_size: int = 3):
+        n = num_agents
+        self.num_agents = n
+        self.attention_memory_size = attention_memory_size
+
+        self.inventory = np.zeros((n, NUM_RESOURCES), dtype=np.float64)
+        self.capacity = np.full((n, NUM_RESOURCES), 100.0, dtype=np.float64) # max storage
+        self.cash = np.zeros(n, dtype=np.float64)
+        self.reputation = np.ones(n, dtype=np.float64) # Score from 0 to 1
+        self.production_schedule = np.ones(n, dtype=np.float64) # Factor of normal operation
+
+        # Attention Memory: index of the last interaction partners, oldest first (-1.0 = none)
+        self.attention_memory = np.full((n, attention_memory_size), -1.0, dtype=np.float64)
+
+        self.agent_type = np.full(n, TYPE_CONVERTER, dtype=np.int8)
+
+        # Reward coefficients
+        self.alpha_carbon = np.full(n, 50.0, dtype=np.float64)
+        self.beta_reputation = np.full(n, 10.0, dtype=np.float64)
+        self.gamma_risk = np.full(n, 5.0, dtype=np.float64)
+
+        self.current_reward = np.zeros(n, dtype=np.float64)
+        self.carbon_emissions = np.zeros(n, dtype=np.float64)
+
+    @classmethod
+    def from_agents(cls, agents: list) -> "ParkState":
+        """Stacks the current rows of FactoryAgents into one park store and rebinds them to it."""
+        # Agents already laid out as rows 0..n-1 of one store (e.g. generated parks) reuse it as is
+        shared = agents[0]._state if agents else None
+        if shared is not None and shared.num_agents == len(agents) and all(
+            a._state is shared and a._row == i for i, a in enumerate(agents)
+        ):
+            return shared
+
+        state = cls(len(agents), attention_memory_size=agents[0].attention_memory_size if agents else 3)
+        for field in cls.FIELDS:
+            setattr(state, field, np.stack([getattr(a._state, field)[a._row] for a in agents]))
+        for i, agent in enumerate(agents):
+            agent._bind(state, i)
+        return state
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, field).nbytes for field in self.FIELDS)
+
+    def to_bytes(self) -> bytes:
+        """Raw concatenation of every FIELDS array (fixed layout for a given agent count)."""
+        return b"".join(getattr(self, field).tobytes() for field in self.FIELDS)
+
+    def load_bytes(self, buffer) -> None:
+        """Copies a to_bytes() payload back in place, so FactoryAgent views stay bound."""
+        offset = 0
+        for field in self.FIELDS:
+            array = getattr(self, field)
+            array[...] = np.frombuffer(buffer, dtype=array.dtype, count=array.size, offset=offset).reshape(array.shape)
+            offset += array.nbytes
+
+    @property
+    def obs_dim(self) -> int:
+        # resources + cash + reputation + prod scale + attention memory
+        return NUM_RESOURCES + 3 + self.attention_memory_size
+
+    def step_production(self, disrupted: np.ndarray, noise: np.ndarray, rows: Rows = slice(None)) -> None:
+        """
+        Advances production for the given rows.
+        disrupted: bool per row; noise: U(0, 1) draws shaped (rows, resources).
+        """
+        sched = self.production_schedule[rows]
+        # Disruption halves output (floor 0.1), otherwise production slowly recovers
+        sched = np.where(disrupted, np.maximum(0.1, sched * 0.5), np.minimum(1.0, sched + 0.1))
+        self.production_schedule[rows] = sched
+
+        kind = self.agent_type[rows]
+        delta = _PRODUCTION_LOW[kind][:, None] + _PRODUCTION_SPAN[kind][:, None] * noise
+        self.inventory[rows] = np.clip(self.inventory[rows] + delta * sched[:, None], 0.0, self.capacity[rows])
+
+    def apply_actions(self, actions: np.ndarray, noise: np.ndarray, rows: Rows = slice(None)) -> None:
+        """
+        Approximate trading impacts of (rows, action_dim) actions for factories simulated on their own
+        (FactoryAgent.apply_action); parks clear a real market instead, see clear_market.
+        Action vector (dim 6): [bid_price_mod, ask_price_mod, accept_threshold, negotiation_partner_focus, contract_duration, quality_tier]
+        noise: U(0, 1) draws shaped (rows, resources) for simulated P2P inventory changes.
+        """
+        self.cash[rows] += actions[:, 1] * 50 - 10
+
+        change = (noise * 30.0 - 15.0) * self.production_schedule[rows][:, None]
+        self.inventory[rows] = np.clip(self.inventory[rows] + change, 0.0, self.capacity[rows])
+
+    def clear_market(self, actions: np.ndarray, arrival: np.ndarray, rows: Rows = slice(None)) -> Dict[str, np.ndarray]:
+        """
+        Market phase for the given rows: every factory quotes each resource from its (rows, action_dim) actions,
+        all resources clear at once in a batched double auction and trades settle into inventory and cash.
+        - bid / ask price: BASE_PRICES * (1 + 0.5 * bid_price_mod / ask_price_mod)
+        - quantity: contract_duration in [-1, 1] sets the share (0..1) of the gap to TARGET_FILL * capacity
+          quoted this tick, buying below target and selling above; buys are capped by available cash
+        - arrival: U(0, 1) per row, time priority between equal prices
+        The largest counterparty (by traded value) of each trading row is pushed into its attention memory.
+        Returns trades (resource, buyer and seller park rows, quantity, price) and per-row trading profit:
+        (bid - price) * quantity for the buyer and (price - ask) * quantity for the seller of each trade.
+        """
+        ids = np.arange(self.num_agents)[rows]
+        actions = np.clip(actions, -1.0, 1.0)
+        inventory = self.inventory[ids]
+        
+        gap = TARGET_FILL * self.capacity[ids] - inventory
+        gap *= (actions[:, 4:5] + 1.0) / 2.0
+        bid_price = BASE_PRICES * (1.0 + 0.5 * actions[:, 0:1])
+        ask_price = BASE_PRICES * (1.0 + 0.5 * actions[:, 1:2])
+        bid_quantity = np.maximum(gap, 0.0)
+        ask_quantity = np.maximum(-gap, 0.0)
+        
+        # Scale every buy order of a factory down together when it cannot pay for all of them
+        spend = (bid_quantity * bid_price).sum(axis=1)
+        budget = np.maximum(self.cash[ids], 0.0)
+        bid_quantity *= np.minimum(1.0, budget / np.where(spend > 0, spend, np.inf))[:, None]
+        
+        # One order book per resource: (resources, rows)
+        matched = match_orders_batched(bid_price.T, bid_quantity.T, ask_price.T, ask_quantity.T, arrival)
+        resource, quantity, price = matched["book"], matched["quantity"], matched["price"]
+        buyer_bid = bid_price[matched["buyer"], resource]
+        seller_ask = ask_price[matched["seller"], resource]
+        buyer, seller = ids[matched["buyer"]], ids[matched["seller"]]
+        value = quantity * price
+        
+        np.add.at(self.inventory, (buyer, resource), quantity)
+        np.subtract.at(self.inventory, (seller, resource), quantity)
+        cash_flow = np.bincount(seller, value, self.num_agents) - np.bincount(buyer, value, self.num_agents)
+        self.cash += cash_flow
+        
+        # Gains from trade against each side's own quote: buyers pay below their bid, sellers get above their ask.
+        # Every cleared trade adds (bid - ask) * quantity of surplus to the park, so the total is not zero-sum
+        profit = (np.bincount(buyer, (buyer_bid - price) * quantity, self.num_agents)
+                  + np.bincount(seller, (price - seller_ask) * quantity, self.num_agents))
+        
+        # Main trading partner this tick, keeping the highest-value trade per factory
+        party = np.concatenate([buyer, seller])
+        counterparty = np.concatenate([seller, buyer])
+        order = np.lexsort((np.concatenate([value, value]), party))
+        party, counterparty = party[order], counterparty[order]
+        last = np.append(party[1:] != party[:-1], True) if len(party) else np.zeros(0, dtype=bool)
+        self.record_interactions(party[last], counterparty[last].astype(np.float64))
+        
+        return {
+            "resource": resource,
+            "buyer": buyer,
+            "seller": seller,
+            "quantity": quantity,
+            "price": price,
+            "profit": profit[ids],
+        }
+
+    def calculate_rewards(self, profit: np.ndarray, risk_factor: Union[float, np.ndarray], rows: Rows = slice(None)) -> np.ndarray:
+        """Reward function: profit + α·carbon + β·reputation − γ·risk"""
+        reward = (
+            profit
+            - self.alpha_carbon[rows] * self.carbon_emissions[rows]
+            + self.beta_reputation[rows] * self.reputation[rows]
+            - self.gamma_risk[rows] * risk_factor
+        )
+        self.current_reward[rows] = reward
+        return reward
+
+    def record_interactions(self, rows: Rows, partner_indices: np.ndarray) -> None:
+        """Pushes partner indices into the attention memory of the given rows."""
+        memory = self.attention_memory[rows]
+        memory[:, :-1] = memory[:, 1:]
+        memory[:, -1] = partner_indices
+        self.attention_memory[rows] = memory
+
+    def observations(self, rows: Rows = slice(None)) -> np.ndarray:
+        """Normalized (rows, obs_dim) float32 observation matrix."""
+        return _build_observations(
+            self.inventory[rows], self.capacity[rows], self.cash[rows], self.reputation[rows],
+            self.production_schedule[rows], self.attention_memory[rows],
+        )
+
+    def advance(self, victims: np.ndarray, production_noise: np.ndarray, actions: np.ndarray, arrival: np.ndarray,
+                risk_factor: float, observe_at: Optional[np.ndarray] = None,
+                on_trades: Optional[Callable[[int, Dict[str, np.ndarray]], None]] = None) -> Dict[str, np.ndarray]:
+        """
+        Runs c ticks of step_production -> clear_market -> calculate_rewards for every row with all noise pre-drawn:
+        victims (c,) disrupted row or -1; production_noise (c, agents, resources), overwritten;
+        actions (c, agents, action_dim); arrival (c, agents).
+        The production schedule and the reward terms that don't depend on trading are solved for the whole
+        block at once; inventory and the market clear tick by tick.
+        Returns (c, ...) trajectories of inventory, cash, production_schedule, rewards and traded volume per
+        resource, plus observations at the block-local ticks in observe_at. The store is left at the last tick.
+        on_trades(t, trades) receives each tick's clear_market output, e.g. to stream it into a FlowLog.
+        """
+        c = production_noise.shape[0]
+        
+        # Production schedule recovers +0.1 per tick (cap 1.0); each disruption halves it (floor 0.1)
+        start_schedule = self.production_schedule.copy()
+        schedule = np.minimum(1.0, start_schedule[None, :] + 0.1 * np.arange(1, c + 1)[:, None])
+        for t in np.flatnonzero(victims >= 0):
+            v = victims[t]
+            previous = schedule[t - 1, v] if t > 0 else start_schedule[v]
+            schedule[t:, v] = np.minimum(1.0, max(0.1, previous * 0.5) + 0.1 * np.arange(c - t))
+        
+        # Noise block is consumed in place: it becomes the per-tick production deltas
+        kind = self.agent_type
+        production = production_noise
+        production *= _PRODUCTION_SPAN[kind][:, None]
+        production += _PRODUCTION_LOW[kind][:, None]
+        production *= schedule[:, :, None]
+        
+        inventory = np.empty_like(production)
+        cash = np.empty((c, self.num_agents))
+        profit = np.empty((c, self.num_agents))
+        traded_volume = np.empty((c, NUM_RESOURCES))
+        observe = set() if observe_at is None else set(int(t) for t in observe_at)
+        observations = []
+        
+        current = self.inventory
+        capacity = self.capacity
+        for t in range(c):
+            np.add(current, production[t], out=current)
+            np.maximum(current, 0.0, out=current)
+            np.minimum(current, capacity, out=current)
+            self.production_schedule[:] = schedule[t]
+            
+            market = self.clear_market(actions[t], arrival[t])
+            if on_trades is not None:
+                on_trades(t, market)
+            inventory[t] = current
+            cash[t] = self.cash
+            profit[t] = market["profit"]
+            traded_volume[t] = np.bincount(market["resource"], market["quantity"], NUM_RESOURCES)
+            if t in observe:
+                observations.append(self.observations())
+        
+        rewards = profit
+        rewards -= self.alpha_carbon * self.carbon_emissions
+        rewards += self.beta_reputation * self.reputation
+        rewards -= self.gamma_risk * risk_factor
+        self.current_reward[:] = rewards[-1]
+        
+        if observe_at is not None:
+            observations = np.stack(observations) if observations else np.empty((0, self.num_agents, self.obs_dim), dtype=np.float32)
+        else:
+            observations = None
+        
+        return {
+            "inventory": inventory,
+            "cash": cash,
+            "production_schedule": schedule,
+            "rewards": rewards,
+            "traded_volume": traded_volume,
+            "observations": observations,
+        }
@@ -1,6 +1,17 @@
-from simulation.factory_agent import create_steel_mill, create_chem_corp, create_cement_works
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from simulation.factory_agent import FactoryAgent, AgentType, AGENT_TYPE_CODES, create_steel_mill, create_chem_corp, create_cement_works
+from simulation.park_state import ParkState, NUM_RESOURCES
 from simulation.environment import IndustrialParkEnv
 
+# Default share of each factory profile in generated parks
+DEFAULT_PROFILE_MIX = {
+    AgentType.PRODUCER: 0.4,
+    AgentType.CONSUMER: 0.3,
+    AgentType.CONVERTER: 0.3,
+}
+
 def setup_guindy_industrial_park() -> IndustrialParkEnv:
     """
     Creates the 'Guindy Industrial Park' preset scenario with 3 factories:
@@ -19,3 +30,37 @@ def setup_guindy_industrial_park() -> IndustrialParkEnv:
     
     env = IndustrialParkEnv(agents=agents, max_steps=30)
     return env
+
+def generate_industrial_park(num_factories: int,
+                             profile_mix: Optional[Dict[AgentType, float]] = None,
+                             capacity_range: Tuple[float, float] = (100.0, 1000.0),
+                             cash_mean: float = 5000.0,
+                             cash_std: float = 1000.0,
+                             max_steps: int = 30,
+                             disruption_prob: float = 0.1,
+                             seed: Optional[int] = None) -> IndustrialParkEnv:
+    """
+    Parametric park generator for scaling experiments (10 to 10,000+ factories).
+    - profile_mix: relative weights of producer / consumer / converter factories
+    - capacity_range: per-resource storage capacity drawn log-uniformly from [low, high]
+    - cash_mean / cash_std: normally distributed starting cash, floored at 10% of the mean
+    The whole park is drawn as arrays straight into one ParkState; agents are views over its rows.
+    """
+    rng = np.random.default_rng(seed)
+    mix = profile_mix or DEFAULT_PROFILE_MIX
+    profiles = list(mix.keys())
+    weights = np.array([mix[p] for p in profiles], dtype=np.float64)
+
+    kinds = rng.choice(len(profiles), size=num_factories, p=weights / weights.sum())
+
+    state = ParkState(num_factories)
+    state.agent_type[:] = np.array([AGENT_TYPE_CODES[p] for p in profiles], dtype=np.int8)[kinds]
+    low, high = capacity_range
+    state.capacity[:] = np.round(np.exp(rng.uniform(np.log(low), np.log(high), size=(num_factories, NUM_RESOURCES))))
+    state.cash[:] = np.maximum(0.1 * cash_mean, rng.normal(cash_mean, cash_std, size=num_factories))
+
+    agents = [
+        FactoryAgent.view(state, i, f"agent_{profiles[k].value}_{i}", f"{profiles[k].value.capitalize()}-{i}")
+        for i, k in enumerate(kinds)
+    ]
+    return IndustrialParkEnv(agents=agents, max_steps=max_steps, disruption_prob=disruption_prob)
@@ -0,0 +1,174 @@
+import os
+import multiprocessing as mp
+import numpy as np
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, List, Optional, Tuple
+
+from simulation.environment import IndustrialParkEnv
+from simulation.vector_env import VectorIndustrialParkEnv, buffer_specs, infos_from_buffers
+
+def _shard_worker(remote, parent_remote, env_fns, start: int, stop: int, shm_names: Dict[str, str], specs) -> None:
+    parent_remote.close()
+    # Workers share the parent's resource tracker, so only the parent unlinks the blocks (in close())
+    blocks = {name: SharedMemory(name=shm_name) for name, shm_name in shm_names.items()}
+    # This worker only ever touches rows [start, stop) of each shared array
+    views = {
+        name: np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)[start:stop]
+        for name, (shape, dtype) in specs.items()
+    }
+    shard = VectorIndustrialParkEnv(env_fns, buffers=views, park_offset=start)
+
+    try:
+        while True:
+            cmd, data = remote.recv()
+            reply = None
+            if cmd == "step":
+                shard.step_in_place(views["actions"])
+            elif cmd == "reset":
+                shard.reset_in_place(data)
+            elif cmd == "set_attr":
+                setattr(shard, *data)
+            elif cmd == "snapshot":
+                reply = shard.snapshot()
+            elif cmd == "restore":
+                shard.restore(data)
+            elif cmd == "close":
+                break
+            remote.send(reply)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        del shard, views
+        for shm in blocks.values():
+            shm.close()
+        remote.close()
+
+class SubprocVectorIndustrialParkEnv:
+    """
+    Drop-in for VectorIndustrialParkEnv that shards the K parks across worker processes.
+    Actions, observations, rewards, done flags and infos live in multiprocessing.shared_memory
+    arrays; the pipes only carry short command strings, so nothing per-step is pickled.
+    """
+    def __init__(self, env_fns: List[Callable[[], IndustrialParkEnv]], num_workers: Optional[int] = None, context: Optional[str] = None):
+        self.num_envs = len(env_fns)
+        num_workers = min(num_workers or os.cpu_count() or 1, self.num_envs)
+
+        # Metadata comes from a local probe instance; the parks themselves only live in the workers
+        probe = env_fns[0]()
+        self.possible_agents = probe.possible_agents[:]
+        self.agents = self.possible_agents[:]
+        self.num_agents = len(self.possible_agents)
+        self._observation_space = {a: probe.observation_space(a) for a in self.possible_agents}
+        self._action_space = {a: probe.action_space(a) for a in self.possible_agents}
+        self.obs_dim = self._observation_space[self.possible_agents[0]].shape[0]
+        self.action_dim = self._action_space[self.possible_agents[0]].shape[0]
+        self._disruption_prob = probe.disruption_prob
+        self._max_steps = probe.max_steps
+        del probe
+
+        specs = buffer_specs(self.num_envs, self.num_agents, self.obs_dim, self.action_dim)
+        self._blocks = {
+            name: SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+            for name, (shape, dtype) in specs.items()
+        }
+        self.buffers = {
+            name: np.ndarray(shape, dtype=dtype, buffer=self._blocks[name].buf)
+            for name, (shape, dtype) in specs.items()
+        }
+        for array in self.buffers.values():
+            array.fill(0)
+
+        ctx = mp.get_context(context)
+        shm_names = {name: shm.name for name, shm in self._blocks.items()}
+        bounds = np.linspace(0, self.num_envs, num_workers + 1).astype(int)
+        self._shards = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        self.remotes, self.processes = [], []
+        for start, stop in self._shards:
+            remote, work_remote = ctx.Pipe()
+            process = ctx.Process(
+                target=_shard_worker,
+                args=(work_remote, remote, env_fns[start:stop], int(start), int(stop), shm_names, specs),
+                daemon=True,
+            )
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+        self.num_workers = len(self.processes)
+        self.closed = False
+
+    def observation_space(self, agent: str):
+        return self._observation_space[agent]
+
+    def action_space(self, agent: str):
+        return self._action_space[agent]
+
+    def _broadcast(self, cmd: str, data=None) -> None:
+        for remote in self.remotes:
+            remote.send((cmd, data))
+        for remote in self.remotes:
+            remote.recv()
+
+    @property
+    def disruption_prob(self) -> float:
+        return self._disruption_prob
+
+    @disruption_prob.setter
+    def disruption_prob(self, value: float) -> None:
+        self._disruption_prob = value
+        self._broadcast("set_attr", ("disruption_prob", value))
+
+    @property
+    def max_steps(self) -> int:
+        return self._max_steps
+
+    @max_steps.setter
+    def max_steps(self, value: int) -> None:
+        self._max_steps = value
+        self._broadcast("set_attr", ("max_steps", value))
+
+    def reset(self, seed: Optional[int] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        self._broadcast("reset", seed)
+        return self.buffers["obs"].copy(), infos_from_buffers(self.buffers)
+
+    def step(self, actions: np.ndarray):
+        """Same contract as VectorIndustrialParkEnv.step."""
+        self.buffers["actions"][:] = actions
+        self._broadcast("step")
+        b = self.buffers
+        return b["obs"].copy(), b["rewards"].copy(), b["dones"].copy(), b["truncs"].copy(), infos_from_buffers(self.buffers)
+
+    def snapshot(self) -> List[bytes]:
+        """Same as VectorIndustrialParkEnv.snapshot; each worker serializes its own shard."""
+        for remote in self.remotes:
+            remote.send(("snapshot", None))
+        return [blob for remote in self.remotes for blob in remote.recv()]
+
+    def restore(self, blobs: List[bytes]) -> None:
+        for remote, (start, stop) in zip(self.remotes, self._shards):
+            remote.send(("restore", blobs[start:stop]))
+        for remote in self.remotes:
+            remote.recv()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self.buffers = {}
+        for shm in self._blocks.values():
+            shm.close()
+            shm.unlink()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        if not getattr(self, "closed", True):
+            self.close()
@@ -0,0 +1,127 @@
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+from simulation.environment import IndustrialParkEnv
+
+def buffer_specs(num_envs: int, num_agents: int, obs_dim: int, action_dim: int) -> Dict[str, Tuple[tuple, type]]:
+    """Shapes and dtypes of the per-step arrays a vector env reads actions from and writes results into."""
+    return {
+        "actions": ((num_envs, num_agents, action_dim), np.float32),
+        "obs": ((num_envs, num_agents, obs_dim), np.float32),
+        "rewards": ((num_envs, num_agents), np.float32),
+        "dones": ((num_envs, num_agents), np.bool_),
+        "truncs": ((num_envs, num_agents), np.bool_),
+        "disrupted": ((num_envs, num_agents), np.bool_),
+        "final_obs": ((num_envs, num_agents, obs_dim), np.float32),
+        "final_mask": ((num_envs,), np.bool_),
+    }
+
+def infos_from_buffers(buffers: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Copies the info arrays out of the step buffers in gymnasium vector-env layout."""
+    return {
+        "disrupted": buffers["disrupted"].copy(),
+        "final_observation": buffers["final_obs"].copy(),
+        "_final_observation": buffers["final_mask"].copy(),
+    }
+
+class VectorIndustrialParkEnv:
+    """
+    Runs K independent IndustrialParkEnv instances in lockstep.
+    Observations come back as a (K, agents, obs_dim) array in `possible_agents` order,
+    rewards/dones as (K, agents). Each park is reset on its own as soon as it finishes.
+    Infos follow the gymnasium vector-env layout: a dict of arrays with "disrupted" (K, agents),
+    and "final_observation" (K, agents, obs_dim) valid where the "_final_observation" (K,) mask is set.
+    """
+    def __init__(self, env_fns: List[Callable[[], IndustrialParkEnv]], buffers: Optional[Dict[str, np.ndarray]] = None, park_offset: int = 0):
+        self.envs = [fn() for fn in env_fns]
+        self.num_envs = len(self.envs)
+        # Global index of envs[0]; keeps per-park seeds stable when parks are split across shards
+        self.park_offset = park_offset
+
+        first = self.envs[0]
+        self.possible_agents = first.possible_agents[:]
+        self.agents = self.possible_agents[:]
+        self.num_agents = len(self.possible_agents)
+        self.obs_dim = first.observation_space(self.possible_agents[0]).shape[0]
+        self.action_dim = first.action_space(self.possible_agents[0]).shape[0]
+
+        # Output arrays overwritten in place every step; callers may pass views into shared memory
+        if buffers is None:
+            specs = buffer_specs(self.num_envs, self.num_agents, self.obs_dim, self.action_dim)
+            buffers = {name: np.zeros(shape, dtype=dtype) for name, (shape, dtype) in specs.items()}
+        self.buffers = buffers
+
+    def observation_space(self, agent: str):
+        return self.envs[0].observation_space(agent)
+
+    def action_space(self, agent: str):
+        return self.envs[0].action_space(agent)
+
+    @property
+    def disruption_prob(self) -> float:
+        return self.envs[0].disruption_prob
+
+    @disruption_prob.setter
+    def disruption_prob(self, value: float) -> None:
+        for env in self.envs:
+            env.disruption_prob = value
+
+    @property
+    def max_steps(self) -> int:
+        return self.envs[0].max_steps
+
+    @max_steps.setter
+    def max_steps(self, value: int) -> None:
+        for env in self.envs:
+            env.max_steps = value
+
+    def park_seed(self, seed: Optional[int], k: int) -> Optional[np.random.SeedSequence]:
+        """Seed for local park k: the (park_offset + k)-th child of SeedSequence(seed)."""
+        if seed is None:
+            return None
+        return np.random.SeedSequence(seed, spawn_key=(self.park_offset + k,))
+
+    def reset_in_place(self, seed: Optional[int] = None) -> None:
+        """Resets every park into self.buffers, deriving an independent stream per park from seed."""
+        self.buffers["disrupted"][:] = False
+        self.buffers["final_mask"][:] = False
+        for k, env in enumerate(self.envs):
+            self.buffers["obs"][k], _ = env.reset_array(seed=self.park_seed(seed, k))
+
+    def step_in_place(self, actions: np.ndarray) -> None:
+        """Steps every park with (K, agents, action_dim) actions, writing results into self.buffers."""
+        b = self.buffers
+        for k, env in enumerate(self.envs):
+            b["obs"][k], b["rewards"][k], b["dones"][k], b["truncs"][k], info = env.step_array(actions[k])
+            b["disrupted"][k] = info["disrupted"]
+
+            # Independent auto-reset: this park starts a new episode, others keep going
+            finished = b["dones"][k].any() or b["truncs"][k].any()
+            b["final_mask"][k] = finished
+            if finished:
+                b["final_obs"][k] = b["obs"][k]
+                b["obs"][k], _ = env.reset_array()
+
+    def reset(self, seed: Optional[int] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        self.reset_in_place(seed)
+        return self.buffers["obs"].copy(), infos_from_buffers(self.buffers)
+
+    def step(self, actions: np.ndarray):
+        """
+        actions: (K, agents, action_dim) array.
+        Returns obs (K, agents, obs_dim), rewards (K, agents), dones (K, agents), truncs (K, agents), infos (dict of arrays).
+        """
+        self.step_in_place(actions)
+        b = self.buffers
+        return b["obs"].copy(), b["rewards"].copy(), b["dones"].copy(), b["truncs"].copy(), infos_from_buffers(self.buffers)
+
+    def snapshot(self) -> List[bytes]:
+        """Per-park IndustrialParkEnv.snapshot() blobs (state and RNG streams), in park order."""
+        return [env.snapshot() for env in self.envs]
+
+    def restore(self, blobs: List[bytes]) -> None:
+        for env, blob in zip(self.envs, blobs):
+            env.restore(blob)
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from economics.auctions import Bid, DoubleAuction, match_orders_batched
+
+def reference_fills(bid_price, bid_quantity, ask_price, ask_quantity, arrival):
+    """DoubleAuction fills of one order book, orders submitted in arrival order (its tie-break)."""
+    auction = DoubleAuction()
+    for j in np.argsort(arrival, kind="stable"):
+        if bid_quantity[j] > 0:
+            auction.submit_bid(Bid(int(j), float(bid_quantity[j]), float(bid_price[j]), is_buy=True))
+        if ask_quantity[j] > 0:
+            auction.submit_bid(Bid(int(j), float(ask_quantity[j]), float(ask_price[j]), is_buy=False))
+    return [(m["buyer"], m["seller"], m["quantity"], m["price"]) for m in auction.match_orders()]
+
+def random_books(rng, books, orders, ticks):
+    # Integer prices on a coarse grid so equal prices, and with them the arrival tie-break, are common
+    prices = lambda: rng.integers(1, ticks + 1, size=(books, orders)).astype(np.float64)
+    quantities = lambda: np.where(rng.random((books, orders)) < 0.3, 0.0, rng.uniform(0.1, 10.0, size=(books, orders)))
+    return prices(), quantities(), prices(), quantities()
+
+@pytest.mark.parametrize("orders,ticks,with_arrival", [(1, 3, False), (5, 4, False), (12, 20, True), (30, 6, True)])
+def test_batched_matching_equals_double_auction(orders, ticks, with_arrival):
+    rng = np.random.default_rng(orders)
+    books = 500
+    bid_price, bid_quantity, ask_price, ask_quantity = random_books(rng, books, orders, ticks)
+    arrival = rng.random((books, orders)) if with_arrival else None
+
+    matched = match_orders_batched(bid_price, bid_quantity, ask_price, ask_quantity, arrival)
+    for k in range(books):
+        expected = reference_fills(bid_price[k], bid_quantity[k], ask_price[k], ask_quantity[k],
+                                   np.arange(orders) if arrival is None else arrival[k])
+        mine = matched["book"] == k
+        got = list(zip(matched["buyer"][mine], matched["seller"][mine], matched["quantity"][mine], matched["price"][mine]))
+        assert len(got) == len(expected), f"book {k}"
+        for (b, s, q, p), (eb, es, eq, ep) in zip(got, expected):
+            assert (b, s) == (eb, es)
+            assert q == pytest.approx(eq)
+            assert p == ep
+
+def test_batched_matching_empty_and_uncrossed_books():
+    empty = np.zeros((2, 3))
+    matched = match_orders_batched(np.ones((2, 3)), empty, np.ones((2, 3)), empty)
+    assert all(len(v) == 0 for v in matched.values())
+
+    # Best bid below best ask: nothing trades
+    matched = match_orders_batched(np.full((1, 2), 4.0), np.ones((1, 2)), np.full((1, 2), 5.0), np.ones((1, 2)))
+    assert len(matched["quantity"]) == 0
@@ -0,0 +1,113 @@
+import numpy as np
+
+from simulation.flow_log import FlowLog
+from simulation.scenarios import generate_industrial_park
+from simulation.what_if import disrupt, evaluate_branches
+
+def make_park(**kwargs):
+    env = generate_industrial_park(6, seed=0, **kwargs)
+    env.reset(seed=5)
+    return env
+
+def step_through(env, policy, ticks):
+    """Reference for advance(): a plain step_array loop with every agent acting."""
+    rewards, victims, cash, observations = [], [], [], []
+    for t in range(ticks):
+        actions = policy[t] if policy.ndim == 3 else policy
+        obs, reward, _, _, info = env.step_array(actions)
+        rewards.append(reward)
+        hit = np.flatnonzero(info["disrupted"])
+        victims.append(hit[0] if len(hit) else -1)
+        cash.append(env.park_state.cash.copy())
+        observations.append(obs)
+    return np.array(rewards), np.array(victims), np.array(cash), np.array(observations)
+
+def assert_same_park(env, other):
+    """Same park arrays (up to float reordering in advance's bulk production) and identical RNG streams."""
+    for field in env.park_state.FIELDS:
+        assert np.allclose(getattr(env.park_state, field), getattr(other.park_state, field)), field
+    for stream, other_stream in zip(env._rng_streams(), other._rng_streams()):
+        assert stream.bit_generator.state == other_stream.bit_generator.state
+    assert env.current_step == other.current_step
+    assert env.agents == other.agents
+
+def test_advance_matches_step_loop_past_episode_end():
+    rng = np.random.default_rng(0)
+    ticks = 25
+    policy = rng.uniform(-1, 1, size=(ticks, 6, 6))
+    # Starts mid-episode and runs past max_steps, where step() stops drawing disruptions
+    stepped, advanced = make_park(max_steps=15, disruption_prob=0.5), make_park(max_steps=15, disruption_prob=0.5)
+    step_through(stepped, policy[:3], 3)
+    step_through(advanced, policy[:3], 3)
+
+    rewards, victims, cash, observations = step_through(stepped, policy[3:], ticks - 3)
+    result = advanced.advance(ticks - 3, policy=policy[3:], decimate=4, chunk_size=5)
+
+    assert np.allclose(result["cumulative_reward"], rewards.sum(axis=0))
+    assert np.allclose(result["reward_mean"], rewards.mean(axis=1))
+    assert np.array_equal(result["disrupted_agent"], victims)
+    assert (victims[12:] == -1).all()
+    assert np.allclose(result["cash_total"], cash.sum(axis=1))
+    assert np.allclose(result["cash"], cash[3::4])
+    assert np.allclose(result["observations"], observations[3::4])
+    assert np.array_equal(result["ticks"], np.arange(4, ticks + 1))
+    assert_same_park(advanced, stepped)
+
+def test_advance_with_callable_policy():
+    rng = np.random.default_rng(1)
+    weights = rng.normal(size=(12, 6))
+    policy = lambda obs: np.tanh(obs @ weights)
+
+    stepped, advanced = make_park(max_steps=40), make_park(max_steps=40)
+    total = np.zeros(6)
+    for _ in range(20):
+        total += stepped.step_array(policy(stepped.park_state.observations()))[1]
+    result = advanced.advance(20, policy=policy)
+    assert np.allclose(result["cumulative_reward"], total)
+    assert_same_park(advanced, stepped)
+
+def test_snapshot_restore_round_trip():
+    rng = np.random.default_rng(1)
+    policy = rng.uniform(-1, 1, size=(20, 6, 6))
+    env = make_park(max_steps=40, disruption_prob=0.5)
+    step_through(env, policy[:5], 5)
+    blob = env.snapshot()
+    expected = step_through(env, policy[5:], 15)
+
+    env.seed_streams(123)
+    env.restore(blob)
+    assert env.snapshot() == blob
+    for ours, theirs in zip(step_through(env, policy[5:], 15), expected):
+        assert np.array_equal(ours, theirs)
+
+def test_restore_after_seeded_branches_keeps_flow_log_clean():
+    log = FlowLog(agent_ids=None)
+    env = make_park(max_steps=40, disruption_prob=0.3)
+    env.flow_log = log
+    policy = np.random.default_rng(2).uniform(-1, 1, size=(6, 6))
+    step_through(env, policy, 3)
+    logged = len(log)
+    blob = env.snapshot()
+    # Agent streams are still untouched here, so restore has to reseed them from the snapshot, not the branch seed
+    agent_draws = [env.factory_agents[a].rng.random() for a in env.possible_agents]
+    env.restore(blob)
+
+    evaluate_branches(env, [{}, {2: disrupt(env.possible_agents[0])}], horizon=8, policy=policy, seeds=[7, 8])
+    assert env.snapshot() == blob
+    assert len(log) == logged
+    assert [env.factory_agents[a].rng.random() for a in env.possible_agents] == agent_draws
+
+def test_market_keeps_clearing_across_episodes():
+    # Trades only move cash between factories, so the park has to start over on reset or the buyers go broke
+    env = make_park(max_steps=30)
+    rng = np.random.default_rng(3)
+    volumes = []
+    for _ in range(15):
+        env.reset_array()
+        volume = 0.0
+        for _ in range(env.max_steps):
+            env.step_array(rng.uniform(-1, 1, size=(6, 6)))
+            volume += env.last_trades["quantity"].sum()
+        volumes.append(volume)
+    # A dying market decays towards zero rather than hitting it exactly, so compare against the first episode
+    assert min(volumes) > 0.1 * volumes[0]
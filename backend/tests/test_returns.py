@@ -0,0 +1,91 @@
+import numpy as np
+import torch
+
+from marl.buffer import PriorityRolloutBuffer, compute_gae_joint, compute_vtrace
+
+STEPS, PARKS = 40, 3
+
+def random_rollout(rng, agents=1):
+    rewards, values = rng.standard_normal((2, STEPS, PARKS, agents))
+    dones = (rng.random((STEPS, PARKS, agents)) < 0.1).astype(np.float64) # episodes end mid-buffer
+    return rewards, values, dones
+
+def fill_buffer(rewards, values, dones):
+    buffer = PriorityRolloutBuffer(STEPS, 4, 2, num_envs=PARKS)
+    buffer.rewards[:] = torch.as_tensor(rewards, dtype=torch.float32)
+    buffer.values[:] = torch.as_tensor(values, dtype=torch.float32)
+    buffer.dones[:] = torch.as_tensor(dones, dtype=torch.float32)
+    buffer.step = STEPS
+    return buffer
+
+def reference_gae(rewards, values, dones, last_value, last_done, gamma, lam):
+    """One park's advantages with the original scalar backward loop."""
+    advantages = np.zeros(len(rewards))
+    last_gae_lam = 0.0
+    for step in reversed(range(len(rewards))):
+        if step == len(rewards) - 1:
+            next_non_terminal, next_value = 1.0 - last_done, last_value
+        else:
+            next_non_terminal, next_value = 1.0 - dones[step], values[step + 1]
+        delta = rewards[step] + gamma * next_value * next_non_terminal - values[step]
+        last_gae_lam = delta + gamma * lam * next_non_terminal * last_gae_lam
+        advantages[step] = last_gae_lam
+    return advantages
+
+def reference_vtrace(rewards, values, dones, last_value, log_rhos, gamma, rho_bar, c_bar):
+    """One park's V-trace targets straight from the definition: vs_s = V_s + sum_t (prod_{i<t} gamma c_i) rho_t delta_t."""
+    steps = len(rewards)
+    rhos = np.exp(log_rhos)
+    next_values = np.append(values[1:], last_value)
+    deltas = np.minimum(rhos, rho_bar) * (rewards + gamma * (1.0 - dones) * next_values - values)
+    vs = values.copy()
+    for s in range(steps):
+        trace = 1.0
+        for t in range(s, steps):
+            vs[s] += trace * deltas[t]
+            trace *= gamma * (1.0 - dones[t]) * min(rhos[t], c_bar)
+    next_vs = np.append(vs[1:], last_value)
+    advantages = np.minimum(rhos, rho_bar) * (rewards + gamma * (1.0 - dones) * next_vs - values)
+    return vs, advantages
+
+def test_gae_matches_reference_loop():
+    rng = np.random.default_rng(0)
+    rewards, values, dones = random_rollout(rng)
+    last_value = rng.standard_normal(PARKS)
+    last_done = np.array([0.0, 1.0, 0.0])
+    buffer = fill_buffer(rewards, values, dones)
+    buffer.compute_gae(last_value, last_done)
+
+    for k in range(PARKS):
+        expected = reference_gae(rewards[:, k, 0], values[:, k, 0], dones[:, k, 0], last_value[k], last_done[k],
+                                 buffer.gamma, buffer.gae_lambda)
+        assert np.allclose(buffer.advantages[:, k, 0].numpy(), expected, atol=1e-4)
+        assert np.allclose(buffer.returns[:, k, 0].numpy(), expected + values[:, k, 0], atol=1e-4)
+
+def test_joint_gae_matches_per_agent_gae():
+    rng = np.random.default_rng(1)
+    rewards, values, dones = random_rollout(rng, agents=4)
+    last_values = rng.standard_normal((PARKS, 4))
+    last_dones = rng.random((PARKS, 4)) < 0.5
+    joint = [fill_buffer(rewards[..., i:i + 1], values[..., i:i + 1], dones[..., i:i + 1]) for i in range(4)]
+    compute_gae_joint(joint, last_values, last_dones)
+
+    for i, buffer in enumerate(joint):
+        single = fill_buffer(rewards[..., i:i + 1], values[..., i:i + 1], dones[..., i:i + 1])
+        single.compute_gae(last_values[:, i], last_dones[:, i])
+        assert torch.allclose(buffer.advantages, single.advantages)
+
+def test_vtrace_matches_reference_loop():
+    rng = np.random.default_rng(2)
+    rewards, values, dones = (a[..., 0] for a in random_rollout(rng))
+    last_value = rng.standard_normal(PARKS)
+    log_rhos = rng.normal(0.0, 0.5, size=(STEPS, PARKS)) # ratios on both sides of the truncation
+    as_tensor = lambda a: torch.as_tensor(a, dtype=torch.float64)
+    vs, advantages = compute_vtrace(as_tensor(rewards), as_tensor(values), as_tensor(dones), as_tensor(last_value),
+                                    as_tensor(log_rhos), gamma=0.9, rho_bar=1.0, c_bar=0.8)
+
+    for k in range(PARKS):
+        expected_vs, expected_advantages = reference_vtrace(rewards[:, k], values[:, k], dones[:, k], last_value[k],
+                                                            log_rhos[:, k], 0.9, 1.0, 0.8)
+        assert np.allclose(vs[:, k].numpy(), expected_vs)
+        assert np.allclose(advantages[:, k].numpy(), expected_advantages)
@@ -0,0 +1,26 @@
+import functools
+import numpy as np
+
+from simulation.scenarios import generate_industrial_park
+from simulation.vector_env import VectorIndustrialParkEnv
+from simulation.subproc_env import SubprocVectorIndustrialParkEnv
+
+def test_subproc_shards_match_vector_env():
+    env_fns = [functools.partial(generate_industrial_park, 4, max_steps=10, disruption_prob=0.3, seed=1)] * 5
+    reference = VectorIndustrialParkEnv(env_fns)
+    rng = np.random.default_rng(0)
+
+    with SubprocVectorIndustrialParkEnv(env_fns, num_workers=2) as sharded:
+        expected, _ = reference.reset(seed=3)
+        got, _ = sharded.reset(seed=3)
+        assert np.array_equal(got, expected)
+
+        # Long enough for every park to finish and auto-reset twice
+        for _ in range(25):
+            actions = rng.uniform(-1, 1, size=(5, 4, 6)).astype(np.float32)
+            expected = reference.step(actions)
+            got = sharded.step(actions)
+            for e, g in zip(expected[:4], got[:4]):
+                assert np.array_equal(g, e)
+            for key in ("disrupted", "final_observation", "_final_observation"):
+                assert np.array_equal(got[4][key], expected[4][key])
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from marl.sum_tree import SumTree
+
+def test_update_keeps_sums_and_maxima():
+    tree = SumTree(5)
+    assert tree.size == 8
+    tree.update(np.arange(5), [1.0, 2.0, 3.0, 4.0, 5.0])
+    assert tree.total == pytest.approx(15.0)
+    assert tree.max == 5.0
+
+    # Later duplicates win; lowering the maximum propagates up
+    tree.update([4, 4, 0], [0.5, 2.5, 7.0])
+    assert tree.get([0, 4]).tolist() == [7.0, 2.5]
+    assert tree.total == pytest.approx(7.0 + 2.0 + 3.0 + 4.0 + 2.5)
+    assert tree.max == 7.0
+    tree.update([0], [0.0])
+    assert tree.max == 4.0
+
+    tree.clear()
+    assert tree.total == 0.0 and tree.max == 0.0
+
+def test_single_leaf_tree():
+    tree = SumTree(1)
+    tree.update([0], [3.0])
+    assert tree.total == 3.0
+    assert tree.find([0.0, 2.9, 3.0]).tolist() == [0, 0, 0]
+
+def test_find_matches_cumulative_sums():
+    rng = np.random.default_rng(0)
+    priorities = rng.uniform(0.0, 2.0, size=37)
+    tree = SumTree(len(priorities))
+    tree.update(np.arange(len(priorities)), priorities)
+
+    mass = rng.uniform(0.0, tree.total, size=1000)
+    expected = np.searchsorted(np.cumsum(priorities), mass, side="right")
+    assert np.array_equal(tree.find(mass), expected)
+
+def test_find_skips_zero_priority_leaves():
+    tree = SumTree(6)
+    tree.update(np.arange(6), [0.0, 1.0, 0.0, 0.0, 2.0, 0.0])
+    # Boundaries land on the next non-empty leaf, never on an empty one
+    assert tree.find([0.0, 0.5, 1.0, 2.999]).tolist() == [1, 1, 4, 4]
+
+def test_find_at_total_stays_on_last_non_empty_leaf():
+    tree = SumTree(6)
+    tree.update(np.arange(6), [1.0, 0.0, 2.0, 0.0, 0.0, 0.0])
+    # Mass at (or past, through round-off) the total must not fall into the zero tail or the padding
+    assert tree.find([tree.total, tree.total + 1e-9]).tolist() == [2, 2]
+
+def test_sample_is_proportional_and_never_picks_zero_priority():
+    priorities = np.array([0.0, 1.0, 3.0, 0.0, 6.0])
+    tree = SumTree(len(priorities))
+    tree.update(np.arange(len(priorities)), priorities)
+
+    rng = np.random.default_rng(1)
+    drawn = np.concatenate([tree.sample(100, rng) for _ in range(200)])
+    counts = np.bincount(drawn, minlength=len(priorities))
+    assert counts[0] == 0 and counts[3] == 0
+    # Stratified sampling: each batch of 100 hits every leaf within one draw of its share
+    assert np.allclose(counts / counts.sum(), priorities / priorities.sum(), atol=0.01)
+
+    batch = tree.sample(100, rng)
+    assert len(batch) == 100
+    assert abs(np.bincount(batch, minlength=5)[4] - 60) <= 1